@@ -2,27 +2,25 @@ import time
 import pandas as pd
 import re
 from datetime import datetime
-from selenium import webdriver
+from urllib.parse import quote_plus
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import logging
 from urllib.parse import urljoin, urlparse
+from scraper_base import MarketplaceScraper
+from armazenamento import ProductStore
+from produto import com_vendedor, records_to_frame
+
+class AmazonScraperV2(MarketplaceScraper):
+    marketplace = 'amazon'
 
-class AmazonScraperV2:
     def __init__(self, headless=True, debug=False):
         """
         Inicializa o scraper da Amazon versão 2
         """
-        self.debug = debug
-        self.setup_logging()
-        self.driver = None
-        self.headless = headless
-        self.setup_driver()
+        super().__init__(headless=headless, debug=debug)
         
     def setup_logging(self):
         """Configura o sistema de logging"""
@@ -35,26 +33,18 @@ class AmazonScraperV2:
             ]
         )
         self.logger = logging.getLogger(__name__)
-        
-    def setup_driver(self):
-        """Configura o driver do Chrome"""
-        try:
-            chrome_options = Options()
-            if self.headless:
-                chrome_options.add_argument("--headless")
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument("--disable-gpu")
-            chrome_options.add_argument("--window-size=1920,1080")
-            chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-            
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            self.logger.info("Driver do Chrome configurado com sucesso")
-            
-        except Exception as e:
-            self.logger.error(f"Erro ao configurar driver: {e}")
-            raise
+    
+    def build_search_url(self, search_term):
+        """Monta a URL de busca da Amazon para um termo"""
+        return f"https://www.amazon.com.br/s?k={quote_plus(search_term)}"
+    
+    def iter_listing(self, search_term, max_pages=3):
+        """Itera sobre os produtos da listagem de busca da Amazon"""
+        yield from self.scrape_product_listing(self.build_search_url(search_term), max_pages)
+    
+    def fetch_details(self, product):
+        """Coleta os detalhes da página individual do produto"""
+        return self.scrape_product_details(product['url'])
     
     def scrape_product_listing(self, search_url, max_pages=3):
         """
@@ -151,6 +141,7 @@ class AmazonScraperV2:
             
             return {
                 'asin': asin,
+                'product_id': asin,
                 'title': title,
                 'url': product_url,
                 'price': price,
@@ -703,75 +694,10 @@ class AmazonScraperV2:
             self.logger.warning(f"Erro ao extrair informações de frete: {e}")
             return None
     
-    def is_valid_seller_name(self, text):
-        """Valida se o texto é um nome de vendedor válido"""
-        if not text or text.strip() == "":
-            return False
-        
-        text = text.strip()
-        
-        if self.debug:
-            self.logger.info(f"Validando nome de vendedor: '{text}'")
-        
-        # Filtrar textos que claramente não são nomes de vendedores
-        invalid_keywords = [
-            'avaliação', 'review', 'rating', 'estrela', 'star',
-            'avaliações', 'reviews', 'disponível', 'available',
-            'preço', 'price', 'frete', 'shipping', 'entrega', 'delivery',
-            'mais vendidos', 'best sellers', 'escolha da amazon',
-            'amazon choice', 'patrocinado', 'sponsored',
-            'pesquisas relacionadas', 'related searches',
-            'anterior', 'próximo', 'next', 'previous',
-            'departamentos', 'departments', 'categoria', 'category',
-            'ver mais', 'see more', 'ver ofertas', 'see offers',
-            'produtos similares', 'similar products',
-            'outras opções', 'other options',
-            # Termos genéricos que não são nomes
-            'vendido por', 'enviado por', 'sold by', 'shipped by'
-        ]
-        
-        text_lower = text.lower()
-        for keyword in invalid_keywords:
-            if keyword in text_lower:
-                if self.debug:
-                    self.logger.info(f"Nome rejeitado por palavra-chave: '{keyword}'")
-                return False
-        
-        # Verificar se tem pelo menos 2 caracteres
-        if len(text) < 2:
-            if self.debug:
-                self.logger.info("Nome rejeitado por ser muito curto")
-            return False
-        
-        # Verificar se não é um número puro
-        try:
-            float(text.replace(',', '.'))
-            if self.debug:
-                self.logger.info("Nome rejeitado por ser apenas número")
-            return False
-        except ValueError:
-            pass
-        
-        # Verificar se não contém apenas caracteres especiais
-        if not any(c.isalnum() for c in text):
-            if self.debug:
-                self.logger.info("Nome rejeitado por não conter caracteres alfanuméricos")
-            return False
-        
-        # Verificar se não é muito longo (provavelmente não é nome de vendedor)
-        if len(text) > 100:
-            if self.debug:
-                self.logger.info("Nome rejeitado por ser muito longo")
-            return False
-        
-        if self.debug:
-            self.logger.info(f"Nome de vendedor válido: '{text}'")
-        
-        return True
-    
     def scrape_complete_products(self, search_url, max_pages=3):
         """
-        Scraping completo: listagem + detalhes de cada produto
+        Scraping completo: listagem + detalhes de cada produto (ProductRecord),
+        só com os produtos que têm vendedor
         """
         self.logger.info("Iniciando scraping completo")
         
@@ -792,23 +718,13 @@ class AmazonScraperV2:
                     self.logger.info(f"Detalhes extraídos: {details}")
                 
                 # Combinar dados básicos com detalhes
-                complete_product = {**product, **details}
-                
-                # Verificar se tem vendedor válido antes de adicionar
-                has_seller = (
-                    (complete_product.get('seller_detailed') and 
-                     str(complete_product.get('seller_detailed')).strip() and 
-                     str(complete_product.get('seller_detailed')).lower() not in ['nan', 'none', 'null', '']) or
-                    (complete_product.get('seller') and 
-                     str(complete_product.get('seller')).strip() and 
-                     str(complete_product.get('seller')).lower() not in ['nan', 'none', 'null', ''])
-                )
+                complete_product = self.normalize_product(product, details=details)
                 
-                if has_seller:
+                if complete_product.has_seller:
                     complete_products.append(complete_product)
                 else:
                     if self.debug:
-                        self.logger.info(f"Produto sem vendedor filtrado: {complete_product.get('title', 'N/A')[:50]}")
+                        self.logger.info(f"Produto sem vendedor filtrado: {(complete_product.title or 'N/A')[:50]}")
                 
                 # Pausa entre produtos para evitar bloqueio
                 time.sleep(2)
@@ -816,52 +732,32 @@ class AmazonScraperV2:
                 if self.debug:
                     self.logger.warning(f"Produto sem URL: {product['title'][:50]}")
                 # Só adiciona se tiver vendedor mesmo sem URL
-                has_seller = (
-                    (product.get('seller_detailed') and 
-                     str(product.get('seller_detailed')).strip() and 
-                     str(product.get('seller_detailed')).lower() not in ['nan', 'none', 'null', '']) or
-                    (product.get('seller') and 
-                     str(product.get('seller')).strip() and 
-                     str(product.get('seller')).lower() not in ['nan', 'none', 'null', ''])
-                )
+                product = self.normalize_product(product)
                 
-                if has_seller:
+                if product.has_seller:
                     complete_products.append(product)
                 else:
                     if self.debug:
-                        self.logger.info(f"Produto sem vendedor e sem URL filtrado: {product.get('title', 'N/A')[:50]}")
+                        self.logger.info(f"Produto sem vendedor e sem URL filtrado: {(product.title or 'N/A')[:50]}")
         
         return complete_products
     def save_to_csv(self, products, filename="resultados/produtos_amazon_v2.csv"):
-        """Salva os produtos em CSV, filtrando produtos sem vendedor"""
+        """Salva os produtos (ProductRecord) em CSV, filtrando produtos sem vendedor"""
         if not products:
             self.logger.warning("Nenhum produto para salvar")
             return
         
         # Filtrar produtos sem vendedor
-        products_with_seller = []
-        for product in products:
-            # Verificar se tem vendedor válido (seller_detailed ou seller)
-            has_seller = (
-                (product.get('seller_detailed') and 
-                 str(product.get('seller_detailed')).strip() and 
-                 str(product.get('seller_detailed')).lower() not in ['nan', 'none', 'null', '']) or
-                (product.get('seller') and 
-                 str(product.get('seller')).strip() and 
-                 str(product.get('seller')).lower() not in ['nan', 'none', 'null', ''])
-            )
-            
-            if has_seller:
-                products_with_seller.append(product)
-            else:
-                if self.debug:
-                    self.logger.info(f"Produto sem vendedor filtrado: {product.get('title', 'N/A')[:50]}")
+        products_with_seller, without_seller = com_vendedor(products)
+        if self.debug:
+            for product in without_seller:
+                self.logger.info(f"Produto sem vendedor filtrado: {(product.title or 'N/A')[:50]}")
         
         if not products_with_seller:
             self.logger.warning("Nenhum produto com vendedor para salvar")
             return
         
-        df = pd.DataFrame(products_with_seller)
+        df = records_to_frame(products_with_seller)
         df.to_csv(filename, index=False, encoding='utf-8')
         self.logger.info(f"Produtos salvos em {filename}")
         
@@ -869,15 +765,7 @@ class AmazonScraperV2:
         self.logger.info(f"Total de produtos processados: {len(products)}")
         self.logger.info(f"Produtos com vendedor salvos: {len(df)}")
         self.logger.info(f"Produtos sem vendedor filtrados: {len(products) - len(df)}")
-        
-        if 'seller_detailed' in df.columns:
-            identified_sellers = df['seller_detailed'].notna().sum()
-            self.logger.info(f"Vendedores identificados: {identified_sellers}")
-    def close(self):
-        """Fecha o driver"""
-        if self.driver:
-            self.driver.quit()
-            self.logger.info("Driver fechado")
+        self.logger.info(f"Vendedores identificados: {df['seller'].nunique()}")
 
 def main():
     """Função principal para testar o scraper"""
@@ -892,6 +780,10 @@ def main():
         
         # Salvar resultados
         scraper.save_to_csv(products)
+        if products:
+            store = ProductStore()
+            store.salvar_execucao(records_to_frame(products))
+            store.close()
         
         # Mostrar resultados
         if products:
@@ -900,11 +792,10 @@ def main():
             
             for i, product in enumerate(products[:5]):  # Mostrar apenas os primeiros 5
                 print(f"\n--- Produto {i+1} ---")
-                print(f"Título: {product.get('title', 'N/A')}")
-                print(f"Preço: R$ {product.get('price', 'N/A')}")
-                print(f"Vendedor (listagem): {product.get('seller', 'N/A')}")
-                print(f"Vendedor (detalhado): {product.get('seller_detailed', 'N/A')}")
-                print(f"URL: {product.get('url', 'N/A')}")
+                print(f"Título: {product.title or 'N/A'}")
+                print(f"Preço: R$ {product.price if product.price is not None else 'N/A'}")
+                print(f"Vendedor: {product.seller or 'N/A'}")
+                print(f"URL: {product.url or 'N/A'}")
     
     except Exception as e:
         print(f"Erro durante o scraping: {e}")
@@ -1,130 +1,373 @@
-import pandas as pd
+import os
+import json
+import argparse
+import logging
+from collections import Counter
 import numpy as np
+import pandas as pd
+from regras_heuristicas import text_column, price_column
+from vocabulario import KeywordMatcher
+from catalogo import load_catalog_index
+from anomalias_preco import PriceAnomalyDetector
+from ingestao import ler_em_blocos
+
+# Colunas com contagem de valores no perfil (as que existirem)
+VALUE_COUNT_COLUMNS = ['marketplace', 'brand', 'cartridge_type', 'model', 'sales_format', 'seller', 'search_term']
+
+# Quantos valores mais frequentes de cada coluna entram no perfil
+TOP_VALUES = 20
+
+# Exemplos de anúncios com palavra-chave suspeita guardados no perfil
+KEYWORD_EXAMPLES = 20
+
+# Histograma de preços (para mediana e quantis sem guardar os preços):
+# faixas de R$ 1 até R$ 5.000; acima disso tudo cai na última faixa
+PRICE_BIN = 1.0
+PRICE_BINS = 5000
+
+QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+
+# Hashes guardados por coluna para contar valores distintos: contagem
+# exata até esse número de valores, estimativa (erro típico ~1,6%) acima
+DISTINCT_SKETCH_SIZE = 4096
+
+DEFAULT_CHUNKSIZE = 50000
+
+
+def merge_dtypes(previous, current):
+    """
+    Tipo de uma coluna depois de mais um bloco, como seria na leitura do
+    arquivo inteiro: int64 + float64 dá float64 e número + texto dá texto;
+    outras combinações viram 'misto'
+    """
+    if previous is None or previous == current:
+        return current
+    numeric = {'int64', 'float64'}
+    if previous in numeric and current in numeric:
+        return 'float64'
+    for text_type in ('str', 'object'):
+        if text_type in (previous, current) and {previous, current} - {text_type} <= numeric:
+            return text_type
+    return 'misto'
+
+
+class PriceAccumulator:
+    """Estatísticas de preço acumuladas bloco a bloco (momentos + histograma)"""
+
+    def __init__(self):
+        self.count = 0
+        self.missing = 0
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.minimum = np.inf
+        self.maximum = -np.inf
+        self.histogram = np.zeros(PRICE_BINS, dtype=np.int64)
+
+    def update(self, prices):
+        prices = np.asarray(prices, dtype=np.float64)
+        valid = prices[~np.isnan(prices)]
+        self.missing += len(prices) - len(valid)
+        if len(valid) == 0:
+            return
+        self.count += len(valid)
+        self.total += valid.sum()
+        self.total_squares += np.square(valid).sum()
+        self.minimum = min(self.minimum, valid.min())
+        self.maximum = max(self.maximum, valid.max())
+        bins = np.clip((valid / PRICE_BIN).astype(np.int64), 0, PRICE_BINS - 1)
+        self.histogram += np.bincount(bins, minlength=PRICE_BINS)
+
+    def quantile(self, q):
+        """Quantil aproximado (centro da faixa do histograma, erro <= PRICE_BIN / 2)"""
+        position = np.searchsorted(np.cumsum(self.histogram), q * self.count, side='left')
+        return float(min((position + 0.5) * PRICE_BIN, self.maximum))
+
+    def to_dict(self):
+        if self.count == 0:
+            return {'count': 0, 'missing': int(self.missing)}
+        mean = self.total / self.count
+        variance = max(self.total_squares / self.count - mean * mean, 0.0)
+        stats = {
+            'count': int(self.count),
+            'missing': int(self.missing),
+            'mean': round(mean, 4),
+            'std': round(float(np.sqrt(variance * self.count / max(self.count - 1, 1))), 4),
+            'min': float(self.minimum),
+            'max': float(self.maximum)
+        }
+        stats.update({f"p{int(q * 100):02d}": round(self.quantile(q), 2) for q in QUANTILES})
+        return stats
+
+
+class DistinctCounter:
+    """
+    Número de valores distintos com memória fixa (sketch KMV, "k minimum
+    values"): guarda só os `size` menores hashes de 64 bits vistos. Com
+    menos de `size` valores distintos a contagem é exata; acima disso é
+    estimada por (size - 1) / (maior hash guardado / 2^64).
+    """
+
+    def __init__(self, size=DISTINCT_SKETCH_SIZE):
+        self.size = size
+        self.hashes = np.empty(0, dtype=np.uint64)
+
+    def update(self, hashes):
+        smallest = np.unique(hashes)[:self.size]
+        self.hashes = np.union1d(self.hashes, smallest)[:self.size]
+
+    @property
+    def exact(self):
+        return len(self.hashes) < self.size
+
+    def count(self):
+        if self.exact:
+            return len(self.hashes)
+        return int(round((self.size - 1) / (float(self.hashes[-1]) / 2.0 ** 64)))
+
+
+class DatasetProfile:
+    """
+    Perfil de uma base de anúncios calculado por blocos.
+
+    Cada bloco do CSV atualiza contadores (linhas, ausentes, valores
+    distintos, valores mais frequentes), as estatísticas de preço (geral e
+    por família), as ocorrências de palavras-chave suspeitas e a cobertura
+    do catálogo; nada da base fica em memória além desses acumuladores,
+    e os valores distintos de cada coluna são contados com um
+    DistinctCounter de tamanho fixo.
+    """
+
+    def __init__(self, catalog_index=None, price_detector=None):
+        self.catalog_index = catalog_index
+        self.price_detector = price_detector or PriceAnomalyDetector()
+        self.keyword_matcher = KeywordMatcher(['suspicious_keywords'])
+        self.logger = logging.getLogger(__name__)
+
+        self.rows = 0
+        self.chunks = 0
+        self.dtypes = {}
+        self.missing = Counter()
+        self.distinct = {}
+        self.value_counts = {}
+        self.price = PriceAccumulator()
+
+        self.keyword_rows = 0
+        self.keyword_hits = Counter()
+        self.keyword_examples = []
+
+        self.catalog_match = Counter()
+        self.family_listings = Counter()
+        self.family_matched = Counter()
+        self.family_prices = {}
+        self.msrp_anomalies = Counter()
+
+    def update(self, chunk):
+        """Acrescenta um bloco (DataFrame) ao perfil"""
+        chunk = chunk.reset_index(drop=True)
+        self.rows += len(chunk)
+        self.chunks += 1
+
+        for column in chunk.columns:
+            values = chunk[column]
+            if values.notna().any() or column not in self.dtypes:
+                # Bloco só com ausentes é lido como float64 e não diz nada do tipo
+                self.dtypes[column] = merge_dtypes(self.dtypes.get(column), str(values.dtype))
+            self.missing[column] += int(values.isna().sum())
+            # Hash do texto do valor: o mesmo valor lido como int em um bloco e float em outro conta uma vez
+            present = values.dropna()
+            if pd.api.types.is_float_dtype(present):
+                whole = present == present.round()
+                present = present.astype(object).where(~whole, present[whole].astype(np.int64).astype(object))
+            hashes = pd.util.hash_array(present.astype(object).map(str).to_numpy())
+            self.distinct.setdefault(column, DistinctCounter()).update(hashes)
+
+        for column in VALUE_COUNT_COLUMNS:
+            if column in chunk.columns:
+                counts = chunk[column].map(str).value_counts()
+                self.value_counts.setdefault(column, Counter()).update(counts.to_dict())
+
+        self.price.update(price_column(chunk).to_numpy(dtype=np.float64))
+        self.update_keywords(chunk)
+        if self.catalog_index is not None:
+            self.update_catalog(chunk)
+
+    def update_keywords(self, chunk):
+        """Palavras-chave suspeitas no título ou na descrição"""
+        titles = text_column(chunk, 'title', lower=False)
+        found = self.keyword_matcher.presence(titles) | self.keyword_matcher.presence(
+            text_column(chunk, 'description', lower=False)
+        )
+        hit_rows = found.any(axis=1)
+        self.keyword_rows += int(hit_rows.sum())
+        for keyword_id, count in enumerate(found.sum(axis=0)):
+            if count:
+                self.keyword_hits[self.keyword_matcher.keywords[keyword_id]] += int(count)
+
+        for position in np.flatnonzero(hit_rows)[:KEYWORD_EXAMPLES - len(self.keyword_examples)]:
+            self.keyword_examples.append({
+                'title': titles.iloc[position],
+                'keywords': [self.keyword_matcher.keywords[i] for i in np.flatnonzero(found[position])]
+            })
+
+    def update_catalog(self, chunk):
+        """Associação ao catálogo, preços por família e faixa do preço sugerido"""
+        chunk = self.catalog_index.attach(chunk)
+        families, _, msrp_low, msrp_high = self.price_detector.msrp_anomalies(chunk, self.catalog_index)
+
+        self.catalog_match.update(chunk['catalog_match'].fillna('sem associação').value_counts().to_dict())
+        known = families.notna().to_numpy()
+        self.family_listings.update(families[known].value_counts().to_dict())
+        self.family_listings['sem família'] += int((~known).sum())
+        self.family_matched.update(chunk.loc[chunk['catalog_pn'].notna(), 'catalog_family'].value_counts().to_dict())
+
+        price = price_column(chunk).to_numpy(dtype=np.float64)
+        family_values = families.to_numpy()
+        for family in pd.unique(family_values[known]):
+            in_family = family_values == family
+            self.family_prices.setdefault(family, PriceAccumulator()).update(price[in_family])
+            self.msrp_anomalies[(family, 'baixo')] += int(msrp_low[in_family].sum())
+            self.msrp_anomalies[(family, 'alto')] += int(msrp_high[in_family].sum())
+
+    def catalog_profile(self):
+        """Cobertura do catálogo: itens, anúncios e preços por família"""
+        catalog = self.catalog_index.catalog
+        families = {}
+        for family, items in catalog.groupby('Familia')['suggested_price']:
+            families[family] = {
+                'catalog_items': int(len(items)),
+                'suggested_price_min': float(items.min()),
+                'suggested_price_max': float(items.max()),
+                'listings': int(self.family_listings.get(family, 0)),
+                'listings_matched_to_item': int(self.family_matched.get(family, 0)),
+                'price': self.family_prices[family].to_dict() if family in self.family_prices else {'count': 0},
+                'msrp_below': int(self.msrp_anomalies.get((family, 'baixo'), 0)),
+                'msrp_above': int(self.msrp_anomalies.get((family, 'alto'), 0))
+            }
+        return {
+            'catalog_items': int(len(catalog)),
+            'families_with_listings': int(sum(1 for family in families.values() if family['listings'])),
+            'listings_without_family': int(self.family_listings.get('sem família', 0)),
+            'match_method': dict(sorted(self.catalog_match.items())),
+            'msrp_factors': [self.price_detector.low_factor, self.price_detector.high_factor],
+            'families': families
+        }
+
+    def to_dict(self):
+        """Perfil em formato serializável (JSON)"""
+        profile = {
+            'rows': int(self.rows),
+            'chunks': int(self.chunks),
+            'columns': {
+                column: {
+                    'dtype': dtype,
+                    'missing': int(self.missing[column]),
+                    'distinct': self.distinct[column].count(),
+                    'distinct_estimated': not self.distinct[column].exact
+                }
+                for column, dtype in self.dtypes.items()
+            },
+            'value_counts': {
+                column: dict(counts.most_common(TOP_VALUES))
+                for column, counts in self.value_counts.items()
+            },
+            'price': self.price.to_dict(),
+            'suspicious_keywords': {
+                'rows': int(self.keyword_rows),
+                'hits': dict(self.keyword_hits.most_common()),
+                'examples': self.keyword_examples
+            }
+        }
+        if self.catalog_index is not None:
+            profile['catalog'] = self.catalog_profile()
+        return profile
+
+
+def perfilar_dados(data_file, catalog_file='data/catalogo.csv', chunksize=DEFAULT_CHUNKSIZE, price_detector=None):
+    """
+    Lê `data_file` em blocos de `chunksize` linhas (bases conhecidas vêm
+    tipadas do cache de ingestao.py) e retorna o perfil (dict)
+    """
+    catalog_index = load_catalog_index(catalog_file) if catalog_file and os.path.exists(catalog_file) else None
+    profile = DatasetProfile(catalog_index, price_detector)
+    for chunk in ler_em_blocos(data_file, chunksize):
+        profile.update(chunk)
+    result = profile.to_dict()
+    result['source'] = {'data_file': data_file, 'catalog_file': catalog_file, 'chunksize': chunksize}
+    return result
+
+
+def imprimir_perfil(profile):
+    """Resumo legível do perfil"""
+    print("=== PERFIL DOS DADOS ===\n")
+    print(f"Registros: {profile['rows']} (em {profile['chunks']} blocos)")
+
+    print("\n1. COLUNAS:")
+    print("-" * 50)
+    columns = pd.DataFrame(profile['columns']).T
+    print(columns.to_string())
+
+    print("\n2. VALORES MAIS FREQUENTES:")
+    print("-" * 50)
+    for column, counts in profile['value_counts'].items():
+        top = ', '.join(f"{value} ({count})" for value, count in list(counts.items())[:5])
+        print(f"  {column}: {top}")
+
+    print("\n3. PREÇOS:")
+    print("-" * 50)
+    print('  ' + ', '.join(f"{key}={value}" for key, value in profile['price'].items()))
+
+    keywords = profile['suspicious_keywords']
+    print("\n4. PALAVRAS-CHAVE SUSPEITAS:")
+    print("-" * 50)
+    print(f"  Anúncios com palavra-chave suspeita: {keywords['rows']}")
+    for keyword, count in keywords['hits'].items():
+        print(f"    {keyword}: {count}")
+
+    if 'catalog' in profile:
+        catalog = profile['catalog']
+        low_factor, high_factor = catalog['msrp_factors']
+        print("\n5. COBERTURA DO CATÁLOGO:")
+        print("-" * 50)
+        print(f"  Associação: {catalog['match_method']}")
+        print(f"  Anúncios sem família: {catalog['listings_without_family']}")
+        rows = {
+            family: {
+                'itens': stats['catalog_items'],
+                'anuncios': stats['listings'],
+                'associados': stats['listings_matched_to_item'],
+                'mediana': stats['price'].get('p50'),
+                f"< {low_factor*100:.0f}%": stats['msrp_below'],
+                f"> {high_factor*100:.0f}%": stats['msrp_above']
+            }
+            for family, stats in catalog['families'].items()
+        }
+        table = pd.DataFrame.from_dict(rows, orient='index')
+        print(table.sort_values('anuncios', ascending=False, kind='stable').to_string())
+
+
+def main():
+    """Perfil de uma base de anúncios (por blocos), com saída em JSON"""
+    parser = argparse.ArgumentParser(description="Perfil da base de anúncios")
+    parser.add_argument('--dados', default='data/base_dados.csv', help="CSV com os anúncios")
+    parser.add_argument('--catalogo', default='data/catalogo.csv', help="CSV do catálogo")
+    parser.add_argument('--blocos', type=int, default=DEFAULT_CHUNKSIZE, help="Linhas lidas por bloco")
+    parser.add_argument('--saida', default=None, help="Arquivo JSON com o perfil")
+    parser.add_argument('--silencioso', action='store_true', help="Não imprime o resumo")
+    args = parser.parse_args()
+
+    profile = perfilar_dados(args.dados, args.catalogo, args.blocos)
+
+    if not args.silencioso:
+        imprimir_perfil(profile)
+
+    if args.saida:
+        out_dir = os.path.dirname(args.saida)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(profile, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"\nPerfil salvo em {args.saida}")
+
 
-# Carregar os dados
-print("=== ANÁLISE DOS DADOS EXISTENTES ===\n")
-
-# Analisar base_dados.csv
-print("1. ANÁLISE DA BASE DE DADOS (base_dados.csv):")
-print("-" * 50)
-df_base = pd.read_csv('data/base_dados.csv')
-print(f"Total de registros: {len(df_base)}")
-print(f"Colunas: {list(df_base.columns)}")
-print(f"\nPrimeiras 3 linhas:")
-print(df_base.head(3))
-print(f"\nTipos de dados:")
-print(df_base.dtypes)
-print(f"\nValores únicos por coluna:")
-for col in df_base.columns:
-    unique_count = df_base[col].nunique()
-    print(f"  {col}: {unique_count} valores únicos")
-
-print(f"\nEstatísticas de preços:")
-print(df_base['price'].describe())
-
-print(f"\nDistribuição de marcas:")
-print(df_base['brand'].value_counts())
-
-print(f"\nDistribuição de tipos de cartucho:")
-print(df_base['cartridge_type'].value_counts())
-
-# Analisar catalogo.csv
-print("\n\n2. ANÁLISE DO CATÁLOGO (catalogo.csv):")
-print("-" * 50)
-df_catalogo = pd.read_csv('data/catalogo.csv')
-print(f"Total de registros: {len(df_catalogo)}")
-print(f"Colunas: {list(df_catalogo.columns)}")
-print(f"\nPrimeiras 5 linhas:")
-print(df_catalogo.head())
-
-print(f"\nFamílias de produtos:")
-print(df_catalogo['Familia'].value_counts())
-
-print(f"\nEstatísticas de preços sugeridos:")
-# Converter preço sugerido para float (aceitando vírgula decimal)
-df_catalogo['Preço_Sugerido_Float'] = pd.to_numeric(
-    df_catalogo['Preço Sugerido'].astype(str).str.replace('.', '', regex=False).str.replace(',', '.', regex=False),
-    errors='coerce'
-)
-print(df_catalogo['Preço_Sugerido_Float'].describe())
-
-# Análise de compatibilidade
-print(f"\n\n3. ANÁLISE DE COMPATIBILIDADE:")
-print("-" * 50)
-
-# Verificar produtos HP 667 na base de dados (model é int64 no CSV)
-hp667_base = df_base[df_base['model'] == 667]
-print(f"Produtos HP 667 na base de dados: {len(hp667_base)}")
-
-# Verificar produtos HP 667 no catálogo
-hp667_catalogo = df_catalogo[df_catalogo['Familia'] == 'HP 667']
-print(f"Produtos HP 667 no catálogo: {len(hp667_catalogo)}")
-
-print(f"\nProdutos HP 667 no catálogo:")
-print(hp667_catalogo[['PN', 'Produto', 'Preço Sugerido']])
-
-# Análise de preços
-print(f"\n\n4. ANÁLISE DE PREÇOS:")
-print("-" * 50)
-hp667_prices = hp667_base['price'].astype(float)
-hp667_suggested = hp667_catalogo['Preço_Sugerido_Float']
-
-print(f"Preços HP 667 na base de dados:")
-if len(hp667_prices) > 0:
-    print(hp667_prices.describe())
-else:
-    print("(sem registros para HP 667 na base)")
-
-print(f"\nPreços sugeridos HP 667 no catálogo:")
-if len(hp667_suggested) > 0:
-    print(hp667_suggested.describe())
-else:
-    print("(sem registros no catálogo para HP 667)")
-
-# Identificar possíveis anomalias de preço
-print(f"\n\n5. POSSÍVEIS ANOMALIAS DE PREÇO:")
-print("-" * 50)
-
-# Tornar a detecção mais sensível: abaixo de 80% do mínimo sugerido ou acima de 130% do máximo sugerido
-LOW_FACTOR = 0.80
-HIGH_FACTOR = 1.30
-
-anomaly_count = 0
-if len(hp667_base) > 0 and len(hp667_suggested) > 0:
-    min_sugg = hp667_suggested.min()
-    max_sugg = hp667_suggested.max()
-    low_thr = min_sugg * LOW_FACTOR if pd.notna(min_sugg) else None
-    high_thr = max_sugg * HIGH_FACTOR if pd.notna(max_sugg) else None
-
-    for idx, row in hp667_base.iterrows():
-        try:
-            price = float(row['price']) if pd.notna(row['price']) else None
-        except Exception:
-            price = None
-        if price is None:
-            continue
-        # Comparar com thresholds sensíveis
-        if low_thr is not None and price < low_thr:
-            print(f"PREÇO SUSPEITO (baixo): {row['title']} - R$ {price:.2f} (< {LOW_FACTOR*100:.0f}% do mínimo sugerido {min_sugg:.2f})")
-            anomaly_count += 1
-        elif high_thr is not None and price > high_thr:
-            print(f"PREÇO SUSPEITO (alto): {row['title']} - R$ {price:.2f} (> {HIGH_FACTOR*100:.0f}% do máximo sugerido {max_sugg:.2f})")
-            anomaly_count += 1
-
-    if anomaly_count == 0:
-        print("Nenhuma anomalia detectada com thresholds 70%/150%.")
-else:
-    print("(sem base suficiente para detectar anomalias de preço)")
-
-print(f"\n\n6. ANÁLISE DE DESCRIÇÕES SUSPEITAS:")
-print("-" * 50)
-suspicious_keywords = ['genérico', 'cópia', 'compatível', 'recondicionado', 'usado', 'refurbished']
-
-for idx, row in df_base.iterrows():
-    description = str(row['description']).lower()
-    title = str(row['title']).lower()
-    
-    for keyword in suspicious_keywords:
-        if keyword in description or keyword in title:
-            print(f"PRODUTO SUSPEITO (palavra-chave '{keyword}'): {row['title']}")
-            break
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import os
+import json
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+from regras_heuristicas import text_column, price_column
+from catalogo import MULTI_UNIT_PATTERN, load_catalog_index
+from vocabulario import fold_text
+from ingestao import carregar_base_dados
+
+# Colunas acrescentadas por PriceAnomalyDetector.detect
+ANOMALY_COLUMNS = [
+    'price_family', 'price_multi_unit', 'family_median', 'family_mad',
+    'price_robust_z', 'price_anomaly', 'price_anomaly_rule'
+]
+
+# Fator que torna o MAD comparável ao desvio padrão em dados normais
+_MAD_SCALE = 0.6745
+
+
+class PriceAnomalyDetector:
+    """
+    Detecção de preços anômalos em todas as famílias do catálogo.
+
+    Cada anúncio é comparado de duas formas, em uma única passada
+    vetorizada:
+
+    - **Faixa do preço sugerido (msrp)**: abaixo de `low_factor` x o preço
+      sugerido do item associado ou acima de `high_factor` x esse preço;
+      sem item associado, os limites são o menor e o maior preço sugerido
+      da família. Kits ficam fora dessa comparação (o catálogo é por unidade).
+    - **Estatística robusta da família (mad)**: z robusto
+      0,6745 * (preço - mediana) / MAD, calculado por família e por tipo
+      de anúncio (unidade ou kit); |z| acima de `z_threshold` é anomalia.
+      Grupos com menos de `min_group_size` anúncios ou MAD zero ficam sem z.
+    """
+
+    def __init__(self, low_factor=0.8, high_factor=1.3, z_threshold=3.5, min_group_size=5):
+        self.low_factor = low_factor
+        self.high_factor = high_factor
+        self.z_threshold = z_threshold
+        self.min_group_size = min_group_size
+        self.logger = logging.getLogger(__name__)
+
+    @classmethod
+    def from_config(cls, config):
+        """Cria o detector a partir da seção price_anomaly do config.json"""
+        params = {
+            key: value for key, value in config.get('price_anomaly', {}).items()
+            if key in ('low_factor', 'high_factor', 'z_threshold', 'min_group_size')
+        }
+        return cls(**params)
+
+    def msrp_bands(self, catalog_index, families, suggested_price):
+        """
+        Limites (mínimo, máximo) de preço sugerido de cada anúncio: o do
+        item associado ou, sem item, o menor e o maior da família
+        """
+        family_prices = catalog_index.catalog.groupby('Familia')['suggested_price'].agg(['min', 'max'])
+        bands = family_prices.reindex(families.to_numpy())
+        low = bands['min'].to_numpy(dtype=np.float64, copy=True)
+        high = bands['max'].to_numpy(dtype=np.float64, copy=True)
+        has_item = ~np.isnan(suggested_price)
+        low[has_item] = suggested_price[has_item]
+        high[has_item] = suggested_price[has_item]
+        return low, high
+
+    def msrp_anomalies(self, df, catalog_index):
+        """
+        Parte da detecção que só depende de cada anúncio (pode ser feita
+        por blocos): família, kit e se o preço está abaixo/acima da faixa do
+        preço sugerido. `df` já deve ter passado por CatalogIndex.attach.
+        """
+        families = catalog_index.families(df)
+        titles = text_column(df, 'title', lower=False)
+        codes, uniques = pd.factorize(titles)
+        multi_unit = np.array([bool(MULTI_UNIT_PATTERN.search(fold_text(title))) for title in uniques], dtype=bool)
+        multi_unit = multi_unit[codes] if len(df) else np.zeros(0, dtype=bool)
+
+        price = price_column(df).to_numpy(dtype=np.float64)
+        suggested_price = pd.to_numeric(df['suggested_price'], errors='coerce').to_numpy(dtype=np.float64)
+        band_low, band_high = self.msrp_bands(catalog_index, families, suggested_price)
+        band_low[multi_unit] = np.nan
+        band_high[multi_unit] = np.nan
+        with np.errstate(invalid='ignore'):
+            msrp_low = price < band_low * self.low_factor
+            msrp_high = price > band_high * self.high_factor
+        return families, multi_unit, msrp_low, msrp_high
+
+    def detect(self, df, catalog_index):
+        """
+        Acrescenta a `df` a família (price_family), se o anúncio é kit
+        (price_multi_unit), a mediana e o MAD do grupo, o z robusto e
+        price_anomaly ('baixo'/'alto') com a regra que disparou
+        (price_anomaly_rule: 'msrp', 'mad' ou 'msrp+mad')
+        """
+        if 'catalog_pn' not in df.columns:
+            df = catalog_index.attach(df)
+
+        families, multi_unit, msrp_low, msrp_high = self.msrp_anomalies(df, catalog_index)
+        price = price_column(df).to_numpy(dtype=np.float64)
+
+        # Mediana e MAD por (família, kit)
+        groups = pd.DataFrame({'family': families.to_numpy(), 'multi_unit': multi_unit, 'price': price})
+        grouped = groups.groupby(['family', 'multi_unit'], sort=False, dropna=True)['price']
+        median = grouped.transform('median').to_numpy(dtype=np.float64)
+        groups['deviation'] = np.abs(price - median)
+        mad = groups.groupby(['family', 'multi_unit'], sort=False, dropna=True)['deviation'].transform('median')
+        mad = mad.to_numpy(dtype=np.float64)
+        size = grouped.transform('count').to_numpy(dtype=np.float64)
+
+        robust_z = np.full(len(df), np.nan)
+        valid = (size >= self.min_group_size) & (mad > 0) & ~np.isnan(price)
+        robust_z[valid] = _MAD_SCALE * (price[valid] - median[valid]) / mad[valid]
+        with np.errstate(invalid='ignore'):
+            mad_low = robust_z < -self.z_threshold
+            mad_high = robust_z > self.z_threshold
+
+        low = msrp_low | mad_low
+        high = ~low & (msrp_high | mad_high)
+        msrp = np.where(low, msrp_low, msrp_high)
+        by_mad = np.where(low, mad_low, mad_high)
+
+        df['price_family'] = families.to_numpy()
+        df['price_multi_unit'] = multi_unit
+        df['family_median'] = median
+        df['family_mad'] = mad
+        df['price_robust_z'] = robust_z
+        df['price_anomaly'] = np.select([low, high], ['baixo', 'alto'], default=None)
+        df['price_anomaly_rule'] = np.select(
+            [msrp & by_mad, msrp, by_mad], ['msrp+mad', 'msrp', 'mad'], default=None
+        )
+        df.loc[~(low | high), 'price_anomaly_rule'] = None
+
+        self.logger.info(
+            f"Anomalias de preço: {int(low.sum())} abaixo e {int(high.sum())} acima do esperado "
+            f"em {len(df)} anúncios"
+        )
+        return df
+
+
+def resumo_familias(df):
+    """
+    Resumo por família: anúncios, mediana, MAD, faixa do preço sugerido
+    e quantidade de anomalias abaixo/acima
+    """
+    if len(df) == 0:
+        return pd.DataFrame()
+    price = price_column(df)
+    summary = pd.DataFrame({
+        'family': df['price_family'],
+        'price': price,
+        'suggested_price': pd.to_numeric(df['suggested_price'], errors='coerce'),
+        'baixo': df['price_anomaly'] == 'baixo',
+        'alto': df['price_anomaly'] == 'alto'
+    })
+    return summary.groupby('family').agg(
+        anuncios=('price', 'size'),
+        mediana=('price', 'median'),
+        mad=('price', lambda values: (values - values.median()).abs().median()),
+        sugerido_min=('suggested_price', 'min'),
+        sugerido_max=('suggested_price', 'max'),
+        anomalias_baixo=('baixo', 'sum'),
+        anomalias_alto=('alto', 'sum')
+    )
+
+
+def main():
+    """Detecta preços anômalos em um CSV de anúncios, família por família"""
+    parser = argparse.ArgumentParser(description="Anomalias de preço por família do catálogo")
+    parser.add_argument('--config', default='config.json', help="Configuração (seção price_anomaly)")
+    parser.add_argument('--catalogo', default='data/catalogo.csv', help="CSV do catálogo")
+    parser.add_argument('--dados', default='data/base_dados.csv', help="CSV com os anúncios")
+    parser.add_argument('--saida', default=None, help="CSV com as colunas de anomalia acrescentadas")
+    args = parser.parse_args()
+
+    config = {}
+    if os.path.exists(args.config):
+        with open(args.config, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+
+    detector = PriceAnomalyDetector.from_config(config)
+    df = detector.detect(carregar_base_dados(args.dados), load_catalog_index(args.catalogo))
+
+    print(f"\n=== ANOMALIAS DE PREÇO ({len(df)} anúncios) ===")
+    print(f"Faixa: < {detector.low_factor*100:.0f}% / > {detector.high_factor*100:.0f}% do preço sugerido; "
+          f"|z robusto| > {detector.z_threshold}")
+    print(resumo_familias(df).to_string())
+
+    anomalies = df[df['price_anomaly'].notna()]
+    print(f"\nAnúncios com preço anômalo: {len(anomalies)}")
+    for _, row in anomalies.iterrows():
+        print(f"  [{row['price_anomaly']}/{row['price_anomaly_rule']}] {row['title']} - R$ {row['price']:.2f}")
+
+    if args.saida:
+        out_dir = os.path.dirname(args.saida)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        df.to_csv(args.saida, index=False, encoding='utf-8')
+        print(f"\nResultado salvo em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
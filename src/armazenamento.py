@@ -0,0 +1,491 @@
+import os
+import sqlite3
+import argparse
+import threading
+import logging
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from historico_execucoes import RUN_ID_FORMAT
+from produto import seller_name
+
+# Máximo de parâmetros por consulta (limite conservador do SQLite)
+_SQLITE_MAX_PARAMS = 900
+
+# Marketplace de arquivos antigos sem a coluna, pelo domínio da URL
+# (sem domínio conhecido, assume-se a Amazon, o único marketplace de início)
+MARKETPLACE_DOMAINS = {'mercadolivre.com': 'mercadolivre', 'amazon.com': 'amazon'}
+DEFAULT_MARKETPLACE = 'amazon'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    row_id INTEGER PRIMARY KEY,
+    product_key TEXT NOT NULL UNIQUE,
+    marketplace TEXT NOT NULL,
+    product_id TEXT,
+    asin TEXT,
+    title TEXT,
+    url TEXT,
+    description TEXT,
+    specifications TEXT,
+    catalog_pn TEXT,
+    catalog_family TEXT,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_products_asin ON products (asin);
+
+CREATE TABLE IF NOT EXISTS sellers (
+    seller_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS offers (
+    offer_id INTEGER PRIMARY KEY,
+    product_key TEXT NOT NULL REFERENCES products (product_key),
+    seller_id INTEGER NOT NULL REFERENCES sellers (seller_id),
+    last_price REAL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    UNIQUE (product_key, seller_id)
+);
+CREATE INDEX IF NOT EXISTS idx_offers_seller ON offers (seller_id);
+
+CREATE TABLE IF NOT EXISTS observations (
+    observation_id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    product_key TEXT NOT NULL REFERENCES products (product_key),
+    seller_id INTEGER REFERENCES sellers (seller_id),
+    price REAL,
+    suggested_price REAL,
+    rating REAL,
+    review_count TEXT,
+    availability TEXT,
+    search_term TEXT,
+    scraped_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_observations_product ON observations (product_key, scraped_at);
+CREATE INDEX IF NOT EXISTS idx_observations_seller ON observations (seller_id);
+CREATE INDEX IF NOT EXISTS idx_observations_scraped_at ON observations (scraped_at);
+CREATE INDEX IF NOT EXISTS idx_observations_run ON observations (run_id);
+
+CREATE TABLE IF NOT EXISTS predictions (
+    prediction_id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    product_key TEXT NOT NULL REFERENCES products (product_key),
+    model_version TEXT,
+    ai_prediction TEXT,
+    ai_confidence REAL,
+    risk_score REAL,
+    risk_level TEXT,
+    predicted_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_product ON predictions (product_key, predicted_at);
+CREATE INDEX IF NOT EXISTS idx_predictions_run ON predictions (run_id, product_key);
+
+-- Índice de texto (rowid = products.row_id); acentos e maiúsculas são ignorados
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5 (
+    title, description, seller, specifications,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '3 5'
+);
+"""
+
+# Pesos do bm25 por coluna do índice de texto (title, description, seller, specifications)
+FTS_WEIGHTS = (10.0, 1.0, 5.0, 1.0)
+
+
+def _column(df, column, default=None):
+    """Coluna de `df` como lista de valores Python (None para ausentes)"""
+    if column not in df.columns:
+        return [default] * len(df)
+    values = df[column]
+    if values.dtype == np.float32:
+        # Esquema compacto: volta ao decimal mais curto (49.9, não 49.900001525878906)
+        values = pd.to_numeric(values.astype(str), errors='coerce')
+    values = values.astype(object)
+    return values.where(values.notna(), default).tolist()
+
+
+def _text(values):
+    """Valores como texto, mantendo None"""
+    return [None if value is None else str(value) for value in values]
+
+
+def _number(values):
+    """Valores como float, com None para ausentes/inválidos"""
+    numbers = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+    return [None if np.isnan(number) else float(number) for number in numbers]
+
+
+def _marketplaces(df):
+    """Marketplace de cada linha: a coluna marketplace ou o domínio da URL"""
+    marketplaces = _column(df, 'marketplace')
+    urls = _column(df, 'url')
+    for position, (marketplace, url) in enumerate(zip(marketplaces, urls)):
+        if marketplace is None:
+            found = [name for domain, name in MARKETPLACE_DOMAINS.items() if url and domain in str(url)]
+            marketplaces[position] = found[0] if found else DEFAULT_MARKETPLACE
+    return marketplaces
+
+
+class ProductStore:
+    """
+    Base SQLite com produtos, vendedores, ofertas, observações e predições.
+
+    - products: um registro por anúncio (marketplace + id do anúncio), com
+      título, URL, descrição e o item do catálogo mais recentes
+    - sellers: um registro por nome de vendedor
+    - offers: um registro por (produto, vendedor), com o último preço
+    - observations: preço/vendedor de cada produto em cada execução
+    - predictions: predição e risco de cada produto em cada execução
+
+    Cada execução é gravada em uma única transação; as consultas
+    retornam DataFrames e usam os índices por produto/ASIN, vendedor e
+    data da coleta.
+    """
+
+    def __init__(self, filename="resultados/produtos.sqlite"):
+        out_dir = os.path.dirname(filename)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        self.filename = filename
+        self.logger = logging.getLogger(__name__)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        has_fts = self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'products_fts'"
+        ).fetchone() is not None
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+        if not has_fts:
+            # Base criada antes do índice de texto: indexa o que já existe
+            self.reindexar()
+
+    @staticmethod
+    def product_keys(df):
+        """
+        Chave de cada anúncio: marketplace:product_id (ou asin, em arquivos
+        antigos da Amazon, ou a URL sem parâmetros de rastreamento quando
+        não há id); None quando o anúncio não tem nenhum dos três
+        """
+        marketplaces = _marketplaces(df)
+        ids = _column(df, 'product_id')
+        asins = _column(df, 'asin')
+        urls = [str(url).split('#')[0].split('?')[0] if url else url for url in _column(df, 'url')]
+        keys = []
+        for marketplace, product_id, asin, url in zip(marketplaces, ids, asins, urls):
+            identifier = product_id or asin or url
+            keys.append(f"{marketplace}:{identifier}" if identifier else None)
+        return keys
+
+    def _seller_ids(self, names, seen_at):
+        """Cadastra os vendedores novos; retorna {nome: seller_id}"""
+        unique_names = [name for name in dict.fromkeys(names) if name]
+        self.connection.executemany(
+            "INSERT INTO sellers (name, first_seen, last_seen) VALUES (?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET last_seen = MAX(last_seen, excluded.last_seen)",
+            [(name, seen_at, seen_at) for name in unique_names]
+        )
+        ids = {}
+        for start in range(0, len(unique_names), _SQLITE_MAX_PARAMS):
+            batch = unique_names[start:start + _SQLITE_MAX_PARAMS]
+            placeholders = ','.join('?' * len(batch))
+            ids.update(self.connection.execute(
+                f"SELECT name, seller_id FROM sellers WHERE name IN ({placeholders})", batch
+            ))
+        return ids
+
+    def salvar_execucao(self, df, run_id=None, model_version=None, run_at=None):
+        """
+        Grava os produtos de uma execução (coleta e, se houver, predição e
+        risco) em uma única transação; retorna o run_id. Produtos sem
+        product_id, asin e URL não têm chave e ficam de fora (com aviso).
+        """
+        run_at = run_at or datetime.now()
+        run_id = run_id or run_at.strftime(RUN_ID_FORMAT)
+        run_at_text = run_at.strftime('%Y-%m-%d %H:%M:%S')
+
+        keys = self.product_keys(df)
+        keyed = np.array([key is not None for key in keys], dtype=bool)
+        if not keyed.all():
+            self.logger.warning(
+                f"Execução {run_id}: {int((~keyed).sum())} produtos sem product_id, asin ou URL não foram gravados"
+            )
+            df = df.loc[keyed]
+            keys = [key for key in keys if key is not None]
+        if len(df) == 0:
+            return run_id
+
+        marketplaces = _marketplaces(df)
+        product_ids = _text(_column(df, 'product_id'))
+        asins = _text(_column(df, 'asin'))
+        # Na Amazon o id do anúncio é o ASIN
+        asins = [
+            asin or (product_id if marketplace == 'amazon' else None)
+            for asin, product_id, marketplace in zip(asins, product_ids, marketplaces)
+        ]
+        scraped_at = _text(_column(df, 'scraped_at', run_at_text))
+        # Vendedor da página de detalhes ou, sem ele, o da listagem (como em ProductRecord)
+        sellers = []
+        for detailed, seller in zip(_column(df, 'seller_detailed'), _column(df, 'seller')):
+            name = seller_name(detailed, seller)
+            sellers.append(name if name else None)
+        prices = _number(_column(df, 'price_detailed')) if 'price_detailed' in df.columns else [None] * len(df)
+        prices = [
+            detailed if detailed is not None else price
+            for detailed, price in zip(prices, _number(_column(df, 'price')))
+        ]
+
+        products = list(zip(
+            keys, marketplaces, product_ids, asins,
+            _text(_column(df, 'title')), _text(_column(df, 'url')),
+            _text(_column(df, 'description')), _text(_column(df, 'specifications')),
+            _text(_column(df, 'catalog_pn')), _text(_column(df, 'catalog_family')),
+            scraped_at, scraped_at
+        ))
+
+        with self.lock, self.connection:
+            self.connection.executemany("""
+                INSERT INTO products (product_key, marketplace, product_id, asin, title, url, description,
+                                      specifications, catalog_pn, catalog_family, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (product_key) DO UPDATE SET
+                    title = COALESCE(excluded.title, title),
+                    url = COALESCE(excluded.url, url),
+                    description = COALESCE(excluded.description, description),
+                    specifications = COALESCE(excluded.specifications, specifications),
+                    catalog_pn = COALESCE(excluded.catalog_pn, catalog_pn),
+                    catalog_family = COALESCE(excluded.catalog_family, catalog_family),
+                    first_seen = MIN(first_seen, excluded.first_seen),
+                    last_seen = MAX(last_seen, excluded.last_seen)
+            """, products)
+
+            seller_ids = self._seller_ids(sellers, run_at_text)
+            seller_column = [seller_ids.get(seller) for seller in sellers]
+
+            self.connection.executemany("""
+                INSERT INTO offers (product_key, seller_id, last_price, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (product_key, seller_id) DO UPDATE SET
+                    last_price = CASE WHEN excluded.last_seen >= last_seen THEN excluded.last_price ELSE last_price END,
+                    first_seen = MIN(first_seen, excluded.first_seen),
+                    last_seen = MAX(last_seen, excluded.last_seen)
+            """, [
+                (key, seller_id, price, seen, seen)
+                for key, seller_id, price, seen in zip(keys, seller_column, prices, scraped_at)
+                if seller_id is not None
+            ])
+
+            self.connection.executemany("""
+                INSERT INTO observations (run_id, product_key, seller_id, price, suggested_price, rating,
+                                          review_count, availability, search_term, scraped_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, list(zip(
+                [run_id] * len(df), keys, seller_column, prices,
+                _number(_column(df, 'suggested_price')), _number(_column(df, 'rating')),
+                _text(_column(df, 'review_count')), _text(_column(df, 'availability')),
+                _text(_column(df, 'search_term')), scraped_at
+            )))
+
+            self._index_products(list(dict.fromkeys(keys)))
+
+            if 'ai_prediction' in df.columns:
+                self.connection.executemany("""
+                    INSERT INTO predictions (run_id, product_key, model_version, ai_prediction, ai_confidence,
+                                             risk_score, risk_level, predicted_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, list(zip(
+                    [run_id] * len(df), keys, [model_version] * len(df),
+                    _text(_column(df, 'ai_prediction')), _number(_column(df, 'ai_confidence')),
+                    _number(_column(df, 'risk_score')), _text(_column(df, 'risk_level')),
+                    [run_at_text] * len(df)
+                )))
+
+        self.logger.info(f"Execução {run_id} gravada em {self.filename} ({len(df)} produtos)")
+        return run_id
+
+    def _index_products(self, product_keys):
+        """
+        Atualiza o índice de texto dos produtos informados (chamado dentro
+        da transação de salvar_execucao); o campo seller reúne todos os
+        vendedores com oferta do produto
+        """
+        for start in range(0, len(product_keys), _SQLITE_MAX_PARAMS):
+            batch = product_keys[start:start + _SQLITE_MAX_PARAMS]
+            placeholders = ','.join('?' * len(batch))
+            self.connection.execute(f"""
+                DELETE FROM products_fts WHERE rowid IN (
+                    SELECT row_id FROM products WHERE product_key IN ({placeholders})
+                )
+            """, batch)
+            self.connection.execute(f"""
+                INSERT INTO products_fts (rowid, title, description, seller, specifications)
+                SELECT p.row_id, p.title, p.description,
+                       (SELECT group_concat(s.name, ' | ') FROM offers f JOIN sellers s ON s.seller_id = f.seller_id
+                        WHERE f.product_key = p.product_key),
+                       p.specifications
+                FROM products p
+                WHERE p.product_key IN ({placeholders})
+            """, batch)
+
+    def reindexar(self):
+        """Reconstrói o índice de texto de todos os produtos"""
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM products_fts")
+            keys = [row[0] for row in self.connection.execute("SELECT product_key FROM products")]
+            self._index_products(keys)
+        if keys:
+            self.logger.info(f"Índice de texto reconstruído ({len(keys)} produtos)")
+
+    def buscar(self, match, limit=20, risk_levels=None, marketplace=None):
+        """
+        Busca no índice de texto (sintaxe MATCH do FTS5) e retorna os
+        produtos em ordem de relevância (bm25, com mais peso para título e
+        vendedor), com o último preço, a última predição e o risco
+        """
+        conditions = ["products_fts MATCH ?"]
+        params = [match]
+        if marketplace:
+            conditions.append("p.marketplace = ?")
+            params.append(marketplace)
+        if risk_levels:
+            conditions.append(f"pr.risk_level IN ({','.join('?' * len(risk_levels))})")
+            params.extend(risk_levels)
+        params.append(limit)
+        return self.query(f"""
+            SELECT p.product_key, p.marketplace, p.title, p.url,
+                   products_fts.seller AS sellers,
+                   snippet(products_fts, 1, '[', ']', '...', 12) AS trecho,
+                   bm25(products_fts, {', '.join(map(str, FTS_WEIGHTS))}) AS rank,
+                   f.last_price, p.last_seen,
+                   pr.ai_prediction, pr.ai_confidence, pr.risk_score, pr.risk_level
+            FROM products_fts
+            JOIN products p ON p.row_id = products_fts.rowid
+            LEFT JOIN offers f ON f.offer_id = (
+                SELECT offer_id FROM offers WHERE product_key = p.product_key ORDER BY last_seen DESC LIMIT 1
+            )
+            LEFT JOIN predictions pr ON pr.prediction_id = (
+                SELECT prediction_id FROM predictions WHERE product_key = p.product_key
+                ORDER BY predicted_at DESC, prediction_id DESC LIMIT 1
+            )
+            WHERE {' AND '.join(conditions)}
+            ORDER BY rank
+            LIMIT ?
+        """, params)
+
+    def query(self, sql, params=()):
+        """Executa uma consulta e retorna um DataFrame"""
+        with self.lock:
+            return pd.read_sql_query(sql, self.connection, params=params)
+
+    def historico_precos(self, asin=None, product_key=None):
+        """Preço e vendedor de um produto (ASIN ou chave) em cada coleta"""
+        if product_key is None and asin is None:
+            raise ValueError("Informe asin ou product_key")
+        condition, value = ('p.product_key = ?', product_key) if product_key is not None else ('p.asin = ?', asin)
+        return self.query(f"""
+            SELECT o.scraped_at, o.run_id, p.product_key, p.title, s.name AS seller, o.price, o.suggested_price
+            FROM products p
+            JOIN observations o ON o.product_key = p.product_key
+            LEFT JOIN sellers s ON s.seller_id = o.seller_id
+            WHERE {condition}
+            ORDER BY o.scraped_at
+        """, (value,))
+
+    def ofertas_vendedor(self, seller):
+        """Ofertas de um vendedor, com o último preço e a última predição de cada produto"""
+        return self.query("""
+            SELECT s.name AS seller, p.product_key, p.title, f.last_price, f.first_seen, f.last_seen,
+                   (SELECT pr.ai_prediction FROM predictions pr WHERE pr.product_key = p.product_key
+                    ORDER BY pr.predicted_at DESC, pr.prediction_id DESC LIMIT 1) AS ai_prediction
+            FROM sellers s
+            JOIN offers f ON f.seller_id = s.seller_id
+            JOIN products p ON p.product_key = f.product_key
+            WHERE s.name = ?
+            ORDER BY f.last_seen DESC
+        """, (seller,))
+
+    def observacoes(self, since=None, until=None):
+        """Observações (com produto e vendedor) coletadas no intervalo, inclusive"""
+        return self.query("""
+            SELECT o.scraped_at, o.run_id, p.product_key, p.marketplace, p.title, s.name AS seller, o.price
+            FROM observations o
+            JOIN products p ON p.product_key = o.product_key
+            LEFT JOIN sellers s ON s.seller_id = o.seller_id
+            WHERE o.scraped_at >= ? AND o.scraped_at <= ?
+            ORDER BY o.scraped_at
+        """, (since or '', until or '9999'))
+
+    def resultados_execucao(self, run_id=None):
+        """Produtos, preços, predições e risco de uma execução (padrão: a mais recente)"""
+        run_id = run_id or self.ultima_execucao()
+        return self.query("""
+            SELECT o.run_id, p.marketplace, p.product_id, p.asin, p.title, p.url, s.name AS seller,
+                   o.price, o.suggested_price, o.rating, o.review_count, o.scraped_at,
+                   pr.ai_prediction, pr.ai_confidence, pr.risk_score, pr.risk_level
+            FROM observations o
+            JOIN products p ON p.product_key = o.product_key
+            LEFT JOIN sellers s ON s.seller_id = o.seller_id
+            LEFT JOIN predictions pr ON pr.run_id = o.run_id AND pr.product_key = o.product_key
+            WHERE o.run_id = ?
+            ORDER BY o.observation_id
+        """, (run_id,))
+
+    def ultima_execucao(self):
+        """run_id gravado por último"""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT run_id FROM observations ORDER BY observation_id DESC LIMIT 1"
+            ).fetchone()
+        return row[0] if row else None
+
+    def contagens(self):
+        """Número de registros de cada tabela"""
+        with self.lock:
+            return {
+                table: self.connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ('products', 'sellers', 'offers', 'observations', 'predictions')
+            }
+
+    def close(self):
+        """Fecha a conexão com o banco"""
+        with self.lock:
+            self.connection.close()
+
+
+def main():
+    """Importa CSVs de resultados para a base SQLite e consulta históricos de preço"""
+    parser = argparse.ArgumentParser(description="Base SQLite de produtos, ofertas e predições")
+    parser.add_argument('--base', default='resultados/produtos.sqlite', help="Arquivo SQLite")
+    parser.add_argument('--importar', nargs='+', default=None,
+                        help="CSVs a importar (ex.: resultados/resultados_deteccao_pirataria.csv)")
+    parser.add_argument('--asin', default=None, help="Mostra o histórico de preços do ASIN")
+    parser.add_argument('--vendedor', default=None, help="Mostra as ofertas do vendedor")
+    args = parser.parse_args()
+
+    store = ProductStore(args.base)
+    try:
+        for filename in args.importar or []:
+            df = pd.read_csv(filename)
+            mtime = datetime.fromtimestamp(os.path.getmtime(filename))
+            name = os.path.splitext(os.path.basename(filename))[0]
+            run_id = store.salvar_execucao(df, run_id=f"importado_{name}_{mtime.strftime(RUN_ID_FORMAT)}", run_at=mtime)
+            print(f"{filename}: {len(df)} produtos importados (execução {run_id})")
+
+        if args.asin:
+            print(store.historico_precos(asin=args.asin).to_string(index=False))
+        if args.vendedor:
+            print(store.ofertas_vendedor(args.vendedor).to_string(index=False))
+
+        print(f"\nRegistros: {store.contagens()}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import re
+import argparse
+import pandas as pd
+from armazenamento import ProductStore
+from vocabulario import fold_text
+
+# Terminações de plural/flexão removidas dos termos da busca simples; o
+# radical vira prefixo, então "recarregáveis" encontra "recarregável"
+# ("recarregav*") e "cartuchos" encontra "cartucho"
+PORTUGUESE_SUFFIXES = ['oes', 'aes', 'ais', 'eis', 'ois', 'is', 'ns', 'es', 's']
+
+# Tamanho mínimo do radical (termos curtos são buscados inteiros)
+MIN_STEM = 4
+
+# Colunas do índice que podem ser usadas como filtro (ex.: seller:tec)
+FTS_COLUMNS = ['title', 'description', 'seller', 'specifications']
+
+_TERM = re.compile(r'(?:(\w+):)?("[^"]*"|\S+)')
+
+
+def radical(word):
+    """Radical de uma palavra normalizada (sem plural), para busca por prefixo"""
+    for suffix in PORTUGUESE_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            return word[:-len(suffix)]
+    return word
+
+
+def montar_consulta(texto):
+    """
+    Converte uma busca simples em consulta FTS5.
+
+    Cada palavra é normalizada (sem acentos), reduzida ao radical e
+    buscada por prefixo; todas as palavras precisam aparecer. Trechos
+    entre aspas são buscados como frase exata, "-palavra" exclui e
+    "coluna:palavra" restringe a uma coluna (title, description, seller,
+    specifications).
+    """
+    include = []
+    exclude = []
+    for column, term in _TERM.findall(texto):
+        negate = term.startswith('-') and len(term) > 1
+        if negate:
+            term = term[1:]
+        if term.startswith('"'):
+            words = re.findall(r'\w+', fold_text(term))
+            expression = f'"{" ".join(words)}"' if words else None
+        else:
+            words = re.findall(r'\w+', fold_text(term))
+            expression = ' '.join(f'"{radical(word)}"*' for word in words) if words else None
+        if expression is None:
+            continue
+        if column in FTS_COLUMNS:
+            expression = f"{column}:({expression})"
+        (exclude if negate else include).append(expression)
+
+    if not include:
+        raise ValueError("A busca precisa de pelo menos uma palavra a incluir")
+    query = ' AND '.join(include)
+    for expression in exclude:
+        query = f"({query}) NOT {expression}"
+    return query
+
+
+def buscar(store, texto, limit=20, risk_levels=None, marketplace=None, raw=False):
+    """Busca simples (ou consulta FTS5 pronta, com raw=True) na base de produtos"""
+    match = texto if raw else montar_consulta(texto)
+    return store.buscar(match, limit=limit, risk_levels=risk_levels, marketplace=marketplace)
+
+
+def main():
+    """Busca textual nos produtos coletados, com o risco de cada resultado"""
+    parser = argparse.ArgumentParser(description="Busca nos produtos coletados (título, descrição, vendedor, especificações)")
+    parser.add_argument('busca', help='Palavras a buscar (ex.: "recarregável", seller:tec, "-kit")')
+    parser.add_argument('--base', default='resultados/produtos.sqlite', help="Arquivo SQLite")
+    parser.add_argument('--limite', type=int, default=20, help="Número máximo de resultados")
+    parser.add_argument('--risco', nargs='+', default=None, help="Filtra pelo nível de risco (ex.: ALTO MÉDIO)")
+    parser.add_argument('--marketplace', default=None, help="Filtra pelo marketplace")
+    parser.add_argument('--fts', action='store_true', help="Usa a busca como consulta FTS5 sem conversão")
+    parser.add_argument('--reindexar', action='store_true', help="Reconstrói o índice de texto antes da busca")
+    parser.add_argument('--saida', default=None, help="CSV com os resultados")
+    args = parser.parse_args()
+
+    store = ProductStore(args.base)
+    try:
+        if args.reindexar:
+            store.reindexar()
+        results = buscar(store, args.busca, args.limite, args.risco, args.marketplace, raw=args.fts)
+    finally:
+        store.close()
+
+    if len(results) == 0:
+        print("Nenhum produto encontrado")
+        return
+
+    results['trecho'] = results['trecho'].str.replace(r'\s+', ' ', regex=True)
+    with pd.option_context('display.max_colwidth', 60, 'display.width', 200):
+        print(results[['risk_level', 'ai_prediction', 'last_price', 'title', 'sellers', 'trecho']].to_string(index=False))
+    print(f"\n{len(results)} produtos")
+
+    if args.saida:
+        results.to_csv(args.saida, index=False, encoding='utf-8')
+        print(f"Resultados salvos em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+import logging
+import numpy as np
+from datetime import datetime
+from regras_heuristicas import text_column
+from features_produto import FEATURE_INPUT_COLUMNS
+
+# Separador entre os campos do anúncio na chave (não ocorre em textos de anúncio)
+_KEY_SEPARATOR = '\x1f'
+
+# Máximo de parâmetros por consulta (limite conservador do SQLite)
+_SQLITE_MAX_PARAMS = 900
+
+
+class PredictionCache:
+    """
+    Cache persistente (SQLite) das predições do modelo.
+
+    A chave é um hash da versão das predições e dos campos do anúncio que
+    alimentam o modelo; um anúncio que volta sem mudanças em uma nova
+    coleta reaproveita a predição já calculada. Trocar de modelo ou editar
+    o catálogo muda a versão (PiracyDetectionClassifier.prediction_version)
+    e, portanto, todas as chaves.
+    """
+
+    def __init__(self, filename="resultados/cache_predicoes.sqlite"):
+        out_dir = os.path.dirname(filename)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        self.filename = filename
+        self.logger = logging.getLogger(__name__)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS predictions (
+                key TEXT PRIMARY KEY,
+                model_version TEXT NOT NULL,
+                ai_prediction TEXT NOT NULL,
+                ai_confidence REAL NOT NULL,
+                ai_probabilities TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            )
+        """)
+        self.connection.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def make_keys(self, df, model_version):
+        """
+        Calcula a chave de cada linha: hash de (versão do modelo, título,
+        descrição, vendedor, preço, preço sugerido)
+        """
+        fields = [text_column(df, column, lower=False) for column in FEATURE_INPUT_COLUMNS]
+        prefix = f"{model_version}{_KEY_SEPARATOR}"
+        return [
+            hashlib.blake2b((prefix + _KEY_SEPARATOR.join(values)).encode('utf-8'), digest_size=16).hexdigest()
+            for values in zip(*fields)
+        ]
+
+    def get_many(self, keys):
+        """
+        Busca as chaves no cache; retorna {chave: (predição, confiança, probabilidades)}
+        """
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self.lock:
+            for start in range(0, len(unique_keys), _SQLITE_MAX_PARAMS):
+                batch = unique_keys[start:start + _SQLITE_MAX_PARAMS]
+                placeholders = ','.join('?' * len(batch))
+                rows = self.connection.execute(
+                    f"SELECT key, ai_prediction, ai_confidence, ai_probabilities "
+                    f"FROM predictions WHERE key IN ({placeholders})",
+                    batch
+                )
+                for key, prediction, confidence, probabilities in rows:
+                    found[key] = (prediction, confidence, json.loads(probabilities))
+        return found
+
+    def put_many(self, keys, model_version, predictions, confidences, probabilities):
+        """Grava (ou substitui) as predições das chaves informadas"""
+        created_at = datetime.now().isoformat()
+        rows = [
+            (key, model_version, str(prediction), float(confidence), json.dumps(list(map(float, probs))), created_at)
+            for key, prediction, confidence, probs in zip(keys, predictions, confidences, probabilities)
+        ]
+        with self.lock:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            self.connection.commit()
+
+    def lookup(self, df, model_version):
+        """
+        Separa as linhas de `df` em acertos e faltas do cache.
+
+        Retorna (keys, cached, miss_positions): `cached` é o resultado de
+        get_many e `miss_positions` são as posições da primeira ocorrência
+        de cada chave ausente (linhas repetidas são pontuadas uma vez só).
+        """
+        keys = self.make_keys(df, model_version)
+        cached = self.get_many(keys)
+
+        seen = set()
+        miss_positions = []
+        for position, key in enumerate(keys):
+            if key not in cached and key not in seen:
+                seen.add(key)
+                miss_positions.append(position)
+
+        n_hits = sum(key in cached for key in keys)
+        self.hits += n_hits
+        self.misses += len(keys) - n_hits
+        self.logger.info(f"Cache de predições: {n_hits}/{len(keys)} linhas reaproveitadas")
+        return keys, cached, np.array(miss_positions, dtype=np.int64)
+
+    def remover_versoes_antigas(self, model_version):
+        """Apaga as predições de outras versões do modelo; retorna quantas foram removidas"""
+        with self.lock:
+            cursor = self.connection.execute(
+                "DELETE FROM predictions WHERE model_version != ?", (str(model_version),)
+            )
+            self.connection.commit()
+        return cursor.rowcount
+
+    def stats(self):
+        """Acertos e faltas desde a abertura do cache"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+    def close(self):
+        """Fecha a conexão com o banco"""
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,262 @@
+import os
+import re
+import hashlib
+import argparse
+import logging
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from regras_heuristicas import text_column, price_column
+from vocabulario import fold_text
+from ingestao import carregar_catalogo, parse_price
+
+# Sufixos regionais do PN (3YM79AB / 3YM79AL são o mesmo cartucho)
+PN_SUFFIXES = ['AB', 'AL', 'HB', 'WB', 'PL']
+
+# Cores canônicas e as formas como aparecem nos anúncios e no catálogo
+# ('prelo' é a grafia de uma linha do catálogo)
+COLOR_SYNONYMS = {
+    'preto': ['preto', 'preta', 'black', 'prelo'],
+    'colorido': ['colorido', 'color', 'tricolor', 'tri-color', 'tri color'],
+    'ciano': ['ciano', 'cyan'],
+    'magenta': ['magenta'],
+    'amarelo': ['amarelo', 'yellow']
+}
+
+# Anúncios com mais de uma unidade: o preço sugerido é por unidade
+# ('+' junta itens, "02 cartucho ..." é quantidade)
+MULTI_UNIT_PATTERN = re.compile(r'(?<![a-z0-9])(kit|combo|\d+\s?x|\d+\s?un|\d+\s?unidades)(?![a-z])|\+|^0\d\s')
+
+# Campos do anúncio onde se procura o PN, em ordem de prioridade
+PN_SOURCES = ['title', 'model', 'description']
+
+# Colunas acrescentadas por CatalogIndex.attach
+CATALOG_COLUMNS = ['catalog_pn', 'catalog_family', 'catalog_match', 'suggested_price', 'price_ratio']
+
+
+def parse_prices(values):
+    """Preços no formato brasileiro em float, com parse_price (valores já numéricos ficam como estão)"""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+    return pd.to_numeric(values.map(parse_price, na_action='ignore'), errors='coerce').astype(float)
+
+
+class CatalogIndex:
+    """
+    Índice do catálogo oficial (data/catalogo.csv) para obter o preço
+    sugerido de cada anúncio.
+
+    O anúncio é associado a um item do catálogo pelo PN (sem o sufixo
+    regional) encontrado no título, no modelo ou na descrição; sem PN, pela
+    família (número do cartucho), XL e cor citados no título. Kits e
+    anúncios ambíguos (vários PNs, cores ou tamanhos) ficam sem associação.
+    """
+
+    def __init__(self, catalog):
+        self.logger = logging.getLogger(__name__)
+        catalog = catalog.copy()
+        catalog['pn_base'] = catalog['PN'].str.upper().str.slice(0, -2)
+        catalog['suggested_price'] = parse_prices(catalog['Preço Sugerido'])
+        catalog = catalog.drop_duplicates('pn_base').reset_index(drop=True)
+
+        # Tokens de PN e de modelo (667, 667xl, gt53...) em uma regex cada
+        bases = sorted(catalog['pn_base'].str.lower(), key=len, reverse=True)
+        suffixes = '|'.join(suffix.lower() for suffix in PN_SUFFIXES)
+        self.pn_pattern = re.compile(rf"(?<![a-z0-9])({'|'.join(bases)})(?:{suffixes})?(?![a-z0-9])")
+
+        models = set()
+        self.family_by_model = {}
+        for product, family in zip(catalog['Produto'], catalog['Familia']):
+            product_models = re.findall(r'(?<![a-z0-9])(gt\s?\d{2}|\d{2,3}b?)(?=\s?xl|[^a-z0-9]|$)', fold_text(product))
+            models.update(product_models)
+            for model in product_models:
+                self.family_by_model.setdefault(model.replace(' ', ''), family)
+        self.model_pattern = re.compile(
+            rf"(?<![a-z0-9])({'|'.join(sorted(models, key=len, reverse=True))})(\s?xl)?(?![a-z0-9])"
+        )
+        self.color_patterns = {
+            color: re.compile(rf"(?<![a-z])({'|'.join(re.escape(word) for word in words)})(?![a-z])")
+            for color, words in COLOR_SYNONYMS.items()
+        }
+
+        # Chave de família de cada item: (modelo, XL, cor); itens sem cor única ficam sem chave
+        family_keys = [self.family_key(product) for product in catalog['Produto']]
+        self.catalog = catalog.set_index('pn_base')
+        self.by_family = {}
+        for pn_base, key in zip(catalog['pn_base'], family_keys):
+            if key is not None:
+                self.by_family.setdefault(key, pn_base)
+
+    @classmethod
+    def from_csv(cls, filename="data/catalogo.csv"):
+        return cls(carregar_catalogo(filename))
+
+    def find_pn(self, text):
+        """PN (base, sem sufixo) citado no texto, se houver exatamente um"""
+        found = set(self.pn_pattern.findall(fold_text(text)))
+        return found.pop().upper() if len(found) == 1 else None
+
+    def family_key(self, text):
+        """
+        (modelo, XL, cor) citados no texto, ou None quando faltam ou
+        aparecem vários (ex.: kit preto + colorido)
+        """
+        text = fold_text(text)
+        models = {(model.replace(' ', ''), bool(xl)) for model, xl in self.model_pattern.findall(text)}
+        if len(models) != 1:
+            return None
+        colors = [color for color, pattern in self.color_patterns.items() if pattern.search(text)]
+        if len(colors) > 1:
+            return None
+        model, xl = models.pop()
+        return model, xl, colors[0] if colors else None
+
+    def family_of(self, title, model=''):
+        """
+        Família do catálogo do modelo citado no título (ou no campo
+        modelo); também vale para kits, que ficam sem item associado
+        """
+        for text in (title, model):
+            families = {
+                self.family_by_model.get(found.replace(' ', ''))
+                for found, _ in self.model_pattern.findall(fold_text(text))
+            }
+            families.discard(None)
+            if len(families) == 1:
+                return families.pop()
+        return None
+
+    def families(self, df):
+        """
+        Família de cada anúncio: a do item associado (catalog_family, se já
+        calculada) ou a do modelo citado; cada título distinto é
+        processado uma única vez
+        """
+        fields = pd.DataFrame({column: text_column(df, column, lower=False) for column in ['title', 'model']}, index=df.index)
+        codes = fields.groupby(['title', 'model'], sort=False).ngroup().to_numpy()
+        unique_fields = fields.loc[~fields.duplicated().to_numpy()]
+        found = np.array([self.family_of(*values) for values in unique_fields.itertuples(index=False, name=None)], dtype=object)
+        families = pd.Series(found[codes] if len(df) else [], index=df.index, dtype=object)
+        if 'catalog_family' in df.columns:
+            families = df['catalog_family'].astype(object).where(df['catalog_family'].notna(), families)
+        return families
+
+    def match(self, title, model='', description=''):
+        """
+        Retorna (pn_base, método) do item do catálogo correspondente, ou
+        (None, None)
+        """
+        if MULTI_UNIT_PATTERN.search(fold_text(title)):
+            return None, None
+
+        for text in (title, model, description):
+            pn_base = self.find_pn(text)
+            if pn_base is not None and pn_base in self.catalog.index:
+                return pn_base, 'pn'
+
+        key = self.family_key(title)
+        if key is not None:
+            pn_base = self.by_family.get(key) or self.by_family.get(key[:2] + (None,))
+            if pn_base is not None:
+                return pn_base, 'familia'
+        return None, None
+
+    def lookup(self, df):
+        """
+        DataFrame (pn_base, catalog_match) alinhado a `df`; cada combinação
+        distinta de título/modelo/descrição é procurada uma única vez
+        """
+        fields = pd.DataFrame({column: text_column(df, column, lower=False) for column in PN_SOURCES}, index=df.index)
+        codes = fields.groupby(PN_SOURCES, sort=False).ngroup().to_numpy()
+        unique_fields = fields.loc[~fields.duplicated().to_numpy()]
+        matches = [self.match(*values) for values in unique_fields.itertuples(index=False, name=None)]
+        matches = pd.DataFrame(matches, columns=['pn_base', 'catalog_match'])
+        return matches.iloc[codes].set_index(df.index)
+
+    def suggested_prices(self, df):
+        """Preço sugerido do item associado a cada anúncio (NaN sem associação)"""
+        matches = self.lookup(df)
+        return self.catalog['suggested_price'].reindex(matches['pn_base']).to_numpy(dtype=np.float64)
+
+    def attach(self, df):
+        """
+        Acrescenta a `df` o item do catálogo (catalog_pn, catalog_family,
+        catalog_match), o preço sugerido e price_ratio (preço / preço
+        sugerido). Um suggested_price já presente em `df` é mantido.
+        """
+        matches = self.lookup(df)
+        entries = self.catalog.reindex(matches['pn_base'])
+
+        df['catalog_pn'] = entries['PN'].to_numpy()
+        df['catalog_family'] = entries['Familia'].to_numpy()
+        df['catalog_match'] = matches['catalog_match'].to_numpy()
+
+        suggested_price = entries['suggested_price'].to_numpy(dtype=np.float64)
+        if 'suggested_price' in df.columns:
+            existing = pd.to_numeric(df['suggested_price'], errors='coerce').to_numpy(dtype=np.float64)
+            suggested_price = np.where(np.isnan(existing), suggested_price, existing)
+        df['suggested_price'] = suggested_price
+
+        price = price_column(df).to_numpy(dtype=np.float64)
+        valid = ~np.isnan(suggested_price) & (suggested_price != 0)
+        ratio = np.full(len(df), np.nan)
+        np.divide(price, suggested_price, out=ratio, where=valid)
+        df['price_ratio'] = ratio
+
+        self.logger.info(f"Catálogo: {int(valid.sum())}/{len(df)} produtos com preço sugerido")
+        return df
+
+
+@lru_cache(maxsize=None)
+def _load_index(filename, mtime):
+    return CatalogIndex.from_csv(filename)
+
+
+@lru_cache(maxsize=None)
+def _file_digest(filename, mtime, size):
+    with open(filename, 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=8).hexdigest()
+
+
+def catalog_version(filename="data/catalogo.csv"):
+    """
+    Hash do conteúdo do catálogo (calculado uma vez por mtime/tamanho);
+    muda sempre que o arquivo é editado
+    """
+    stat = os.stat(filename)
+    return _file_digest(os.path.abspath(filename), stat.st_mtime_ns, stat.st_size)
+
+
+def load_catalog_index(filename="data/catalogo.csv"):
+    """
+    Índice do catálogo, construído uma vez por processo (reconstruído se o
+    arquivo mudar)
+    """
+    return _load_index(os.path.abspath(filename), os.path.getmtime(filename))
+
+
+def main():
+    """Associa os anúncios de um CSV ao catálogo e mostra a cobertura"""
+    parser = argparse.ArgumentParser(description="Preço sugerido pelo catálogo oficial")
+    parser.add_argument('--catalogo', default='data/catalogo.csv', help="CSV do catálogo")
+    parser.add_argument('--dados', default='data/base_dados.csv', help="CSV com os anúncios")
+    parser.add_argument('--saida', default=None, help="CSV com as colunas do catálogo acrescentadas")
+    args = parser.parse_args()
+
+    df = load_catalog_index(args.catalogo).attach(pd.read_csv(args.dados))
+
+    print(f"\n=== CATÁLOGO ({len(df)} anúncios) ===")
+    print(df['catalog_match'].fillna('sem associação').value_counts().to_string())
+    print("\nRazão preço / preço sugerido por família:")
+    print(df.groupby('catalog_family')['price_ratio'].describe()[['count', 'min', '50%', 'max']].to_string())
+
+    if args.saida:
+        out_dir = os.path.dirname(args.saida)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        df.to_csv(args.saida, index=False, encoding='utf-8')
+        print(f"\nResultado salvo em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,83 @@
 import pandas as pd
 import numpy as np
+import joblib
+import sklearn
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.linear_model import LogisticRegression
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
-from sklearn.preprocessing import StandardScaler
+from sklearn.preprocessing import StandardScaler, MaxAbsScaler
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
 import re
-import pickle
+import os
 import logging
+import argparse
 from datetime import datetime
+from regras_heuristicas import HeuristicLabeler
+from cache_predicoes import PredictionCache
+from armazenamento import ProductStore
+from ingestao import carregar_base_dados, schema_for
+from risco import RiskAnalyzer
+from esquema import set_probabilities, PROBABILITY_PREFIX, PRODUCT_SCHEMA
+from features_produto import NumericFeatureBuilder, FEATURE_COLUMNS, FEATURE_INPUT_COLUMNS, DEFAULT_CATALOG_FILE, combined_text
+
+# Versão do formato do artefato salvo por save_model (3: price_ratio com o
+# catálogo no construtor de features, em treino e predição)
+MODEL_FORMAT_VERSION = 3
+
+# Coluna de texto na entrada do pipeline (título + descrição + vendedor)
+TEXT_COLUMN = 'text'
+
+# Famílias/configurações de modelo disponíveis (ver comparar_modelos.py).
+# MultinomialNB exige features não negativas, por isso usa MaxAbsScaler
+# no bloco numérico (todas as features numéricas são >= 0).
+MODEL_CANDIDATES = {
+    'random_forest_100': {
+        'model': lambda: RandomForestClassifier(n_estimators=100, random_state=42)
+    },
+    'random_forest_50_depth20': {
+        'model': lambda: RandomForestClassifier(n_estimators=50, max_depth=20, random_state=42)
+    },
+    'random_forest_200': {
+        'model': lambda: RandomForestClassifier(n_estimators=200, random_state=42)
+    },
+    'logistic_regression': {
+        'model': lambda: LogisticRegression(max_iter=1000)
+    },
+    'logistic_regression_c10': {
+        'model': lambda: LogisticRegression(C=10.0, max_iter=1000)
+    },
+    'multinomial_nb': {
+        'model': lambda: MultinomialNB(),
+        'numeric_scaler': MaxAbsScaler
+    }
+}
+
+DEFAULT_MODEL = 'random_forest_100'
 
 class PiracyDetectionClassifier:
-    def __init__(self):
+    def __init__(self, model_name=DEFAULT_MODEL):
         """
         Inicializa o classificador de detecção de pirataria
         """
+        if model_name not in MODEL_CANDIDATES:
+            raise ValueError(f"Modelo desconhecido: {model_name}")
+        self.model_name = model_name
         self.setup_logging()
-        self.vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
-        self.scaler = StandardScaler()
-        self.model = None
-        self.feature_names = []
+        self.heuristics = HeuristicLabeler()
+        self.feature_builder = NumericFeatureBuilder()
+        self.pipeline = self.build_pipeline()
+        self.set_pipeline_steps()
+        self.feature_names = list(FEATURE_COLUMNS)
+        self.model_version = None
         self.is_trained = False
+        self.cache = None
+        # Pontuador externo com predict_proba(df) (ex.: execucao_paralela.ParallelScorer)
+        self.scorer = None
+        self.risk_analyzer = RiskAnalyzer()
         
     def setup_logging(self):
         """Configura o sistema de logging"""
@@ -42,163 +97,85 @@ class PiracyDetectionClassifier:
         """
         self.logger.info("Criando dados de treinamento...")
         
-        # Aplicar regras heurísticas para criar labels
-        df['label'] = df.apply(self.apply_heuristic_rules, axis=1)
-        
-        # Criar features
-        df['features'] = df.apply(self.create_features, axis=1)
+        # Aplicar regras heurísticas (vetorizadas) para criar labels
+        # (as features numéricas são calculadas de forma colunar no treino)
+        df['label'] = self.heuristics.label(df)
         
         return df
     
     def apply_heuristic_rules(self, row):
         """
-        Aplica regras heurísticas para classificar produtos
-        """
-        title = str(row.get('title', '')).lower()
-        description = str(row.get('description', '')).lower()
-        seller = str(row.get('seller', '')).lower()
-        price = row.get('price', 0)
-        
-        # Palavras-chave suspeitas
-        suspicious_keywords = [
-            'genérico', 'cópia', 'compatível', 'recondicionado', 'usado',
-            'refurbished', 'remanufactured', 'compatible', 'generic',
-            'não original', 'alternativo', 'substituto', 'imitação',
-            'falso', 'fake', 'replica', 'copia', 'compativel'
-        ]
-        
-        # Palavras-chave de originalidade
-        original_keywords = [
-            'original', 'oficial', 'genuíno', 'autêntico', 'lacrado',
-            'novo', 'novo lacrado', 'garantia', 'nota fiscal'
-        ]
-        
-        # Vendedores confiáveis
-        trusted_sellers = [
-            'amazon', 'amazon.com.br', 'hp', 'hp brasil', 'oficial'
-        ]
-        
-        # Vendedores suspeitos
-        suspicious_sellers = [
-            'marketplace', 'terceiros', 'vendedor externo', 'loja genérica'
-        ]
-        
-        score = 0
-        
-        # Verificar palavras-chave suspeitas
-        for keyword in suspicious_keywords:
-            if keyword in title or keyword in description:
-                score += 2
-        
-        # Verificar palavras-chave de originalidade
-        for keyword in original_keywords:
-            if keyword in title or keyword in description:
-                score -= 1
-        
-        # Verificar vendedor
-        if any(trusted in seller for trusted in trusted_sellers):
-            score -= 1
-        elif any(suspicious in seller for suspicious in suspicious_sellers):
-            score += 2
-        
-        # Verificar preço (se muito baixo, pode ser suspeito)
-        if price and price < 30:  # Preço muito baixo
-            score += 1
-        elif price and price > 200:  # Preço muito alto
-            score += 0.5
-        
-        # Verificar descrição vazia ou muito curta
-        if len(description) < 50:
-            score += 1
-        
-        # Classificar baseado no score
-        if score >= 2:
-            return 'SUSPEITO'
-        elif score <= -1:
-            return 'ORIGINAL'
-        else:
-            return 'COMPATIVEL'
+        Aplica regras heurísticas para classificar um único produto
+        (para DataFrames, use self.heuristics.label)
+        """
+        return self.heuristics.label(pd.DataFrame([row]))[0]
     
     def create_features(self, row):
         """
-        Cria features para o modelo de ML
-        """
-        title = str(row.get('title', ''))
-        description = str(row.get('description', ''))
-        seller = str(row.get('seller', ''))
-        price = row.get('price', 0)
-        
-        # Combinar texto
-        text = f"{title} {description} {seller}"
-        
-        # Features numéricas
-        features = {
-            'price': price if price else 0,
-            'title_length': len(title),
-            'description_length': len(description),
-            'has_price': 1 if price else 0,
-            'price_ratio': self.calculate_price_ratio(row),
-            'word_count': len(text.split()),
-            'has_suspicious_words': self.count_suspicious_words(text),
-            'has_original_words': self.count_original_words(text),
-            'seller_trust_score': self.calculate_seller_trust(seller)
-        }
-        
-        return features
+        Cria as features numéricas de um único produto
+        (para DataFrames, use self.feature_builder.build)
+        """
+        values = self.feature_builder.build(pd.DataFrame([row]))[0]
+        return {name: float(value) for name, value in zip(FEATURE_COLUMNS, values)}
     
     def calculate_price_ratio(self, row):
         """
         Calcula a razão entre preço atual e preço sugerido (se disponível)
         """
-        price = row.get('price', 0)
-        suggested_price = row.get('suggested_price', 0)
-        
-        if price and suggested_price:
-            return price / suggested_price
-        return 1.0
+        return self.create_features(row)['price_ratio']
     
     def count_suspicious_words(self, text):
         """
         Conta palavras suspeitas no texto
         """
-        suspicious_words = [
-            'genérico', 'cópia', 'compatível', 'recondicionado', 'usado',
-            'refurbished', 'remanufactured', 'compatible', 'generic',
-            'não original', 'alternativo', 'substituto', 'imitação'
-        ]
-        
-        text_lower = text.lower()
-        count = sum(1 for word in suspicious_words if word in text_lower)
-        return count
+        return int(self.feature_builder.count_suspicious_words([text])[0])
     
     def count_original_words(self, text):
         """
         Conta palavras que indicam originalidade
         """
-        original_words = [
-            'original', 'oficial', 'genuíno', 'autêntico', 'lacrado',
-            'novo', 'garantia', 'nota fiscal', 'certificado'
-        ]
-        
-        text_lower = text.lower()
-        count = sum(1 for word in original_words if word in text_lower)
-        return count
+        return int(self.feature_builder.count_original_words([text])[0])
     
     def calculate_seller_trust(self, seller):
         """
         Calcula score de confiança do vendedor
         """
-        seller_lower = seller.lower()
-        
-        trusted_sellers = ['amazon', 'hp', 'oficial']
-        suspicious_sellers = ['marketplace', 'terceiros', 'vendedor externo']
-        
-        if any(trusted in seller_lower for trusted in trusted_sellers):
-            return 1.0
-        elif any(suspicious in seller_lower for suspicious in suspicious_sellers):
-            return 0.0
-        else:
-            return 0.5
+        return float(self.feature_builder.seller_trust([seller])[0])
+    
+    def build_pipeline(self, model_name=None):
+        """
+        Monta a cadeia completa de transformação + modelo:
+        TF-IDF na coluna de texto, scaler nas features numéricas
+        (na ordem de FEATURE_COLUMNS) e o classificador, com saída esparsa
+        """
+        candidate = MODEL_CANDIDATES[model_name or self.model_name]
+        numeric_scaler = candidate.get('numeric_scaler', StandardScaler)
+        features = ColumnTransformer(
+            [
+                ('text', TfidfVectorizer(max_features=1000, stop_words='english'), TEXT_COLUMN),
+                ('numeric', numeric_scaler(), list(FEATURE_COLUMNS))
+            ],
+            sparse_threshold=1.0
+        )
+        return Pipeline([('features', features), ('model', candidate['model']())])
+    
+    def set_pipeline_steps(self):
+        """Expõe vetorizador, scaler e modelo do pipeline como atributos"""
+        features = self.pipeline.named_steps['features']
+        transformers = getattr(features, 'named_transformers_', None)
+        if transformers is None:
+            transformers = {name: transformer for name, transformer, _ in features.transformers}
+        self.vectorizer = transformers['text']
+        self.scaler = transformers['numeric']
+        self.model = self.pipeline.named_steps['model']
+    
+    def build_model_input(self, df):
+        """
+        Monta a entrada do pipeline: coluna de texto + features numéricas
+        """
+        X = pd.DataFrame(self.feature_builder.build(df), columns=FEATURE_COLUMNS, index=df.index)
+        X.insert(0, TEXT_COLUMN, combined_text(df))
+        return X
     
     def treinar_modelo(self, df):
         """
@@ -210,40 +187,44 @@ class PiracyDetectionClassifier:
         df_training = self.create_training_data(df.copy())
         
         # Separar features e labels
-        X_text = df_training.apply(lambda row: f"{row.get('title', '')} {row.get('description', '')} {row.get('seller', '')}", axis=1)
-        X_numeric = pd.DataFrame([f for f in df_training['features']])
+        X = self.build_model_input(df_training)
         y = df_training['label']
         
-        # Vetorizar texto
-        X_text_vectorized = self.vectorizer.fit_transform(X_text)
-        
-        # Combinar features
-        X_combined = np.hstack([X_text_vectorized.toarray(), X_numeric.values])
-        
         # Dividir dados
         X_train, X_test, y_train, y_test = train_test_split(
-            X_combined, y, test_size=0.2, random_state=42, stratify=y
+            X, y, test_size=0.2, random_state=42, stratify=y
         )
         
-        # Normalizar features numéricas
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
-        
-        # Treinar modelo (usando Random Forest)
-        self.model = RandomForestClassifier(n_estimators=100, random_state=42)
-        self.model.fit(X_train_scaled, y_train)
+        # Treinar pipeline (TF-IDF + scaler no bloco numérico + modelo, tudo esparso)
+        self.pipeline = self.build_pipeline()
+        self.pipeline.fit(X_train, y_train)
+        self.set_pipeline_steps()
         
         # Avaliar modelo
-        y_pred = self.model.predict(X_test_scaled)
+        y_pred = self.pipeline.predict(X_test)
         accuracy = accuracy_score(y_test, y_pred)
         
         self.logger.info(f"Acurácia do modelo: {accuracy:.3f}")
         self.logger.info(f"Relatório de classificação:\n{classification_report(y_test, y_pred)}")
         
+        self.model_version = datetime.now().strftime('%Y%m%d%H%M%S')
         self.is_trained = True
         
         return accuracy
     
+    def predict_proba_input(self, X):
+        """Probabilidades por classe para a entrada de build_model_input"""
+        return self.pipeline.predict_proba(X)
+    
+    def predict_proba_frame(self, df):
+        """
+        Probabilidades por classe das linhas de `df`, pelo pontuador
+        externo quando configurado (mesmas classes, na mesma ordem)
+        """
+        if self.scorer is not None:
+            return self.scorer.predict_proba(df)
+        return self.predict_proba_input(self.build_model_input(df))
+    
     def prever(self, df):
         """
         Faz predições em novos dados
@@ -253,133 +234,263 @@ class PiracyDetectionClassifier:
         
         self.logger.info("Fazendo predições...")
         
-        # Criar features
-        df_features = df.copy()
-        df_features['features'] = df_features.apply(self.create_features, axis=1)
+        if self.cache is not None:
+            return self.prever_com_cache(df)
         
-        # Separar features
-        X_text = df_features.apply(lambda row: f"{row.get('title', '')} {row.get('description', '')} {row.get('seller', '')}", axis=1)
-        X_numeric = pd.DataFrame([f for f in df_features['features']])
+        # Uma única passada pelo modelo; o rótulo vem das probabilidades
+        probabilities = self.predict_proba_frame(df)
+        best = np.argmax(probabilities, axis=1)
         
-        # Vetorizar texto
-        X_text_vectorized = self.vectorizer.transform(X_text)
+        # Adicionar resultados ao DataFrame
+        df['ai_prediction'] = self.model.classes_[best]
+        df['ai_confidence'] = probabilities[np.arange(len(best)), best]
+        set_probabilities(df, probabilities, self.model.classes_)
         
-        # Combinar features
-        X_combined = np.hstack([X_text_vectorized.toarray(), X_numeric.values])
+        return df
+    
+    def prediction_version(self):
+        """
+        Versão das predições no cache: a do modelo e, como price_ratio
+        depende do catálogo, o hash do catálogo usado pelas features
+        """
+        catalog = self.feature_builder.catalog_version()
+        return f"{self.model_version}+catalogo.{catalog}" if catalog else str(self.model_version)
+    
+    def prever_com_cache(self, df):
+        """
+        Faz predições consultando o cache: só as linhas ausentes (uma por
+        chave distinta) passam pelo modelo, e o resultado é gravado no cache
+        """
+        version = self.prediction_version()
+        keys, cached, misses = self.cache.lookup(df, version)
+        
+        if len(misses) > 0:
+            probabilities = self.predict_proba_frame(df.iloc[misses])
+            best = np.argmax(probabilities, axis=1)
+            predictions = self.model.classes_[best]
+            confidences = probabilities[np.arange(len(best)), best]
+            miss_keys = [keys[i] for i in misses]
+            self.cache.put_many(miss_keys, version, predictions, confidences, probabilities)
+            cached.update(zip(miss_keys, zip(predictions, confidences, probabilities.tolist())))
+        
+        results = [cached[key] for key in keys]
+        df['ai_prediction'] = np.array([r[0] for r in results], dtype=object)
+        df['ai_confidence'] = np.array([r[1] for r in results], dtype=np.float64)
+        set_probabilities(df, np.array([r[2] for r in results], dtype=np.float64), self.model.classes_)
         
-        # Normalizar
-        X_scaled = self.scaler.transform(X_combined)
+        return df
+    
+    def iter_chunks(self, input_path, chunksize):
+        """Lê um CSV ou Parquet em blocos de até `chunksize` linhas"""
+        if input_path.endswith('.parquet'):
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(input_path).iter_batches(batch_size=chunksize):
+                yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(input_path, chunksize=chunksize)
+    
+    def parquet_schema(self, chunk, input_path):
+        """
+        Esquema Arrow explícito da saída Parquet, que não depende dos tipos
+        inferidos no primeiro bloco: colunas de entrada Parquet mantêm o
+        tipo do arquivo; em CSV, as colunas numéricas de PRODUCT_SCHEMA e
+        do esquema da base (ingestao.py) são float64 e as demais, texto;
+        ai_confidence e prob_<CLASSE> são float64
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        input_schema = pq.ParquetFile(input_path).schema_arrow if input_path.endswith('.parquet') else None
+        numeric = {column for column, kind in PRODUCT_SCHEMA.items() if kind != 'category'}
+        numeric.update(column for column, kind in (schema_for(input_path) or {}).items() if kind not in ('str', 'datetime'))
+        numeric.add('ai_confidence')
+        
+        fields = []
+        for column in chunk.columns:
+            if input_schema is not None and column in input_schema.names:
+                fields.append(input_schema.field(column))
+            elif column in numeric or column.startswith(PROBABILITY_PREFIX):
+                fields.append(pa.field(column, pa.float64()))
+            else:
+                fields.append(pa.field(column, pa.string()))
+        return pa.schema(fields)
+    
+    def conform_chunk(self, chunk, schema):
+        """
+        Tabela Arrow de um bloco no esquema da saída: colunas de texto
+        viram str e as numéricas são convertidas (valores não numéricos
+        viram nulos, com aviso)
+        """
+        import pyarrow as pa
+        chunk = chunk.reindex(columns=schema.names)
+        for field in schema:
+            values = chunk[field.name]
+            if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+                chunk[field.name] = values.astype(object).where(values.isna(), values.astype(str))
+            elif pa.types.is_floating(field.type) and not pd.api.types.is_float_dtype(values):
+                numbers = pd.to_numeric(values, errors='coerce')
+                lost = int((numbers.isna() & values.notna()).sum())
+                if lost:
+                    self.logger.warning(f"{lost} valores não numéricos em '{field.name}' gravados como nulos")
+                chunk[field.name] = numbers.astype(np.float64)
+        return pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+    
+    def prever_arquivo(self, input_path, output_path, chunksize=50000):
+        """
+        Pontua um arquivo CSV ou Parquet em blocos de tamanho fixo.
         
-        # Fazer predições
-        predictions = self.model.predict(X_scaled)
-        probabilities = self.model.predict_proba(X_scaled)
+        Cada bloco passa uma vez pelo modelo e é anexado à saída assim que
+        termina, de modo que a memória usada é limitada pelo tamanho do
+        bloco e não pelo tamanho do arquivo. Na saída Parquet todos os
+        blocos são convertidos para o esquema de parquet_schema. Retorna o
+        total de linhas.
+        """
+        if not self.is_trained:
+            raise ValueError("Modelo não foi treinado ainda")
         
-        # Adicionar resultados ao DataFrame
-        df['ai_prediction'] = predictions
-        df['ai_confidence'] = np.max(probabilities, axis=1)
-        df['ai_probabilities'] = [prob.tolist() for prob in probabilities]
+        out_dir = os.path.dirname(output_path)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
         
-        return df
+        parquet_output = output_path.endswith('.parquet')
+        writer = None
+        total = 0
+        
+        try:
+            for i, chunk in enumerate(self.iter_chunks(input_path, chunksize)):
+                if len(chunk) == 0:
+                    continue
+                chunk = self.prever(chunk)
+                
+                if parquet_output:
+                    import pyarrow.parquet as pq
+                    if writer is None:
+                        writer = pq.ParquetWriter(output_path, self.parquet_schema(chunk, input_path))
+                    writer.write_table(self.conform_chunk(chunk, writer.schema))
+                else:
+                    chunk.to_csv(output_path, mode='w' if total == 0 else 'a', header=total == 0,
+                                 index=False, encoding='utf-8')
+                
+                total += len(chunk)
+                self.logger.info(f"Bloco {i + 1} pontuado: {total} linhas gravadas em {output_path}")
+        finally:
+            if writer is not None:
+                writer.close()
+        
+        return total
     
     def save_model(self, filename="resultados/modelo_deteccao_pirataria.pkl"):
         """
-        Salva o modelo treinado
+        Salva o pipeline treinado em um único artefato versionado.
+        
+        O arquivo é gravado sem compressão pelo joblib, de modo que idf do
+        TF-IDF e média/escala do scaler possam ser mapeados em memória no
+        carregamento. Os nós das árvores não: o sklearn os copia ao
+        desserializar a floresta; para árvores mapeadas em memória use o
+        modelo compilado (floresta_numpy).
+        
+        A gravação vai para um arquivo temporário no mesmo diretório, que
+        substitui o anterior com os.replace: processos que já mapearam o
+        modelo antigo continuam lendo o arquivo original, e nenhum leitor
+        vê um arquivo gravado pela metade.
         """
         if not self.is_trained:
             raise ValueError("Modelo não foi treinado ainda")
         
+        # stop_words_ guarda todos os termos descartados e só serve para inspeção
+        if hasattr(self.vectorizer, 'stop_words_'):
+            del self.vectorizer.stop_words_
+        
         model_data = {
-            'model': self.model,
-            'vectorizer': self.vectorizer,
-            'scaler': self.scaler,
-            'feature_names': self.feature_names,
+            'format_version': MODEL_FORMAT_VERSION,
+            'pipeline': self.pipeline,
+            'schema': {
+                'text_column': TEXT_COLUMN,
+                'text_sources': ['title', 'description', 'seller'],
+                'numeric_features': list(FEATURE_COLUMNS),
+                'input_columns': list(FEATURE_INPUT_COLUMNS),
+                'catalog_file': self.feature_builder.catalog_file
+            },
+            'classes': [str(c) for c in self.model.classes_],
+            'model_name': self.model_name,
+            'model_version': self.model_version,
+            'sklearn_version': sklearn.__version__,
             'trained_at': datetime.now().isoformat()
         }
         
-        with open(filename, 'wb') as f:
-            pickle.dump(model_data, f)
+        temp_file = f"{filename}.{os.getpid()}.tmp"
+        try:
+            joblib.dump(model_data, temp_file, compress=0)
+            os.replace(temp_file, filename)
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
         
         self.logger.info(f"Modelo salvo em {filename}")
     
-    def load_model(self, filename="resultados/modelo_deteccao_pirataria.pkl"):
+    def load_model(self, filename="resultados/modelo_deteccao_pirataria.pkl", mmap_mode='r'):
         """
-        Carrega um modelo treinado
+        Carrega um modelo treinado. Com mmap_mode='r' (padrão) o idf e o
+        scaler ficam mapeados em memória; as árvores são copiadas pelo
+        sklearn
         """
         try:
-            with open(filename, 'rb') as f:
-                model_data = pickle.load(f)
-            
-            self.model = model_data['model']
-            self.vectorizer = model_data['vectorizer']
-            self.scaler = model_data['scaler']
-            self.feature_names = model_data['feature_names']
-            self.is_trained = True
-            
-            self.logger.info(f"Modelo carregado de {filename}")
-            
+            model_data = joblib.load(filename, mmap_mode=mmap_mode)
         except FileNotFoundError:
             self.logger.error(f"Arquivo {filename} não encontrado")
             raise
+        
+        if not isinstance(model_data, dict) or model_data.get('format_version') != MODEL_FORMAT_VERSION:
+            raise ValueError(f"Modelo em {filename} usa um formato antigo; treine novamente")
+        
+        schema = model_data['schema']
+        if schema['numeric_features'] != list(FEATURE_COLUMNS):
+            raise ValueError(f"Modelo em {filename} foi treinado com outras features numéricas: {schema['numeric_features']}")
+        
+        self.pipeline = model_data['pipeline']
+        self.set_pipeline_steps()
+        self.model_name = model_data.get('model_name', DEFAULT_MODEL)
+        self.feature_names = schema['numeric_features']
+        self.feature_builder.catalog_file = schema.get('catalog_file', DEFAULT_CATALOG_FILE)
+        self.model_version = model_data['model_version']
+        self.is_trained = True
+        
+        self.logger.info(f"Modelo carregado de {filename} (versão {self.model_version})")
     
     def analyze_risk_level(self, df):
         """
-        Analisa o nível de risco dos produtos
+        Analisa o nível de risco dos produtos com as regras de
+        self.risk_analyzer (configuráveis em risk_analysis, ver risco.py)
         """
         self.logger.info("Analisando níveis de risco...")
-        
-        def calculate_risk_score(row):
-            score = 0
-            
-            # Baseado na predição da IA
-            if row.get('ai_prediction') == 'SUSPEITO':
-                score += 3
-            elif row.get('ai_prediction') == 'COMPATIVEL':
-                score += 1
-            
-            # Baseado na confiança da IA
-            confidence = row.get('ai_confidence', 0)
-            if confidence < 0.7:
-                score += 1
-            
-            # Baseado no preço
-            price = row.get('price', 0)
-            if price and price < 30:
-                score += 2
-            elif price and price > 200:
-                score += 1
-            
-            # Baseado no vendedor
-            seller = str(row.get('seller', '')).lower()
-            if 'marketplace' in seller:
-                score += 1
-            
-            return score
-        
-        df['risk_score'] = df.apply(calculate_risk_score, axis=1)
-        
-        # Classificar níveis de risco
-        def classify_risk(score):
-            if score >= 4:
-                return 'ALTO'
-            elif score >= 2:
-                return 'MÉDIO'
-            else:
-                return 'BAIXO'
-        
-        df['risk_level'] = df['risk_score'].apply(classify_risk)
-        
-        return df
+        return self.risk_analyzer.analyze(df)
 
 def main():
     """
     Função principal para testar o classificador
     """
+    parser = argparse.ArgumentParser(description="Classificador de detecção de pirataria")
+    parser.add_argument('--prever-arquivo', nargs=2, metavar=('ENTRADA', 'SAIDA'),
+                        help="Pontua um CSV/Parquet em blocos com o modelo salvo")
+    parser.add_argument('--chunksize', type=int, default=50000, help="Linhas por bloco")
+    parser.add_argument('--modelo', default="resultados/modelo_deteccao_pirataria.pkl", help="Arquivo do modelo")
+    parser.add_argument('--cache', default=None, help="Banco SQLite do cache de predições (opcional)")
+    args = parser.parse_args()
+    
+    if args.prever_arquivo:
+        classifier = PiracyDetectionClassifier()
+        classifier.load_model(args.modelo)
+        if args.cache:
+            classifier.cache = PredictionCache(args.cache)
+        total = classifier.prever_arquivo(*args.prever_arquivo, chunksize=args.chunksize)
+        print(f"{total} produtos pontuados em {args.prever_arquivo[1]}")
+        return
+    
     # Carregar dados existentes
     try:
-        df = pd.read_csv('base_dados.csv')
+        df = carregar_base_dados('data/base_dados.csv')
         print(f"Dados carregados: {len(df)} registros")
     except FileNotFoundError:
-        print("Arquivo base_dados.csv não encontrado")
+        print("Arquivo data/base_dados.csv não encontrado")
         return
     
     # Inicializar classificador
@@ -400,6 +511,11 @@ def main():
         df_with_risks.to_csv('resultados/produtos_com_analise_ia.csv', index=False)
         print("Resultados salvos em resultados/produtos_com_analise_ia.csv")
         
+        store = ProductStore()
+        store.salvar_execucao(df_with_risks, model_version=classifier.model_version)
+        store.close()
+        print(f"Resultados gravados em {store.filename}")
+        
         # Mostrar estatísticas
         print(f"\n=== ESTATÍSTICAS ===")
         print(f"Total de produtos: {len(df_with_risks)}")
@@ -0,0 +1,227 @@
+import os
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+from sklearn.metrics import accuracy_score
+from classificador_ia import PiracyDetectionClassifier, TEXT_COLUMN
+from features_produto import FEATURE_COLUMNS, DEFAULT_CATALOG_FILE
+from ingestao import carregar_base_dados
+
+# Formato do artefato salvo pelo modo incremental
+INCREMENTAL_FORMAT_VERSION = 2
+
+# Classes fixas: partial_fit precisa conhecê-las desde o primeiro bloco
+CLASSES = np.array(['COMPATIVEL', 'ORIGINAL', 'SUSPEITO'], dtype=object)
+
+
+class IncrementalPiracyDetectionClassifier(PiracyDetectionClassifier):
+    """
+    Modo incremental do classificador.
+
+    Usa um HashingVectorizer (sem vocabulário, portanto sem estado) e um
+    SGDClassifier com partial_fit: cada execução do pipeline atualiza o
+    modelo apenas com os produtos novos, em blocos, com memória constante
+    em vez de retreinar do zero sobre todo o histórico.
+
+    Cada atualização gera uma nova model_version, por isso o pipeline não
+    usa o cache de predições (cache_predicoes.py) neste modo.
+    """
+
+    def __init__(self, n_features=2 ** 18, chunksize=10000):
+        super().__init__()
+        self.model_name = 'sgd_incremental'
+        self.chunksize = chunksize
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features, alternate_sign=False, stop_words='english'
+        )
+        self.scaler = StandardScaler()
+        self.model = SGDClassifier(loss='log_loss', alpha=1e-5, random_state=42)
+        self.pipeline = None
+        self.n_samples_seen = 0
+
+    def transform_input(self, X):
+        """Vetoriza o texto por hashing e junta o bloco numérico normalizado (CSR)"""
+        X_text = self.vectorizer.transform(X[TEXT_COLUMN])
+        X_numeric = self.scaler.transform(X[FEATURE_COLUMNS].to_numpy())
+        return sparse.hstack([X_text, sparse.csr_matrix(X_numeric)], format='csr')
+
+    def predict_proba_input(self, X):
+        """Probabilidades por classe para a entrada de build_model_input"""
+        return self.model.predict_proba(self.transform_input(X))
+
+    def atualizar_modelo(self, df, labels=None):
+        """
+        Atualiza o modelo com novos produtos rotulados, bloco a bloco.
+
+        Sem `labels`, usa os rótulos heurísticos (a mesma fonte do treino
+        em lote). Retorna o número de produtos incorporados.
+        """
+        if len(df) == 0:
+            return 0
+
+        if labels is None:
+            labels = self.heuristics.label(df)
+        labels = np.asarray(labels, dtype=object)
+
+        for start in range(0, len(df), self.chunksize):
+            chunk = df.iloc[start:start + self.chunksize]
+            y = labels[start:start + self.chunksize]
+            X = self.build_model_input(chunk)
+
+            self.scaler.partial_fit(X[FEATURE_COLUMNS].to_numpy())
+            self.model.partial_fit(self.transform_input(X), y, classes=CLASSES)
+            self.n_samples_seen += len(chunk)
+
+        # Microssegundos: duas atualizações no mesmo segundo são versões distintas
+        self.model_version = datetime.now().strftime('%Y%m%d%H%M%S%f')
+        self.is_trained = True
+        self.logger.info(f"Modelo incremental atualizado com {len(df)} produtos (total visto: {self.n_samples_seen})")
+        return len(df)
+
+    def treinar_modelo(self, df, epochs=5):
+        """
+        Treina o modelo incremental do zero (bootstrap) com algumas passadas
+        sobre os dados; retorna a acurácia em 20% de validação
+        """
+        self.logger.info("Iniciando treinamento do modelo incremental...")
+
+        labels = self.heuristics.label(df)
+        train_idx, test_idx = train_test_split(
+            np.arange(len(df)), test_size=0.2, random_state=42, stratify=labels
+        )
+        df_train = df.iloc[train_idx]
+
+        rng = np.random.default_rng(42)
+        for _ in range(epochs):
+            order = rng.permutation(len(df_train))
+            self.atualizar_modelo(df_train.iloc[order], labels[train_idx][order])
+
+        df_test = df.iloc[test_idx].copy()
+        accuracy = accuracy_score(labels[test_idx], self.prever(df_test)['ai_prediction'])
+        self.logger.info(f"Acurácia do modelo incremental: {accuracy:.3f}")
+        return accuracy
+
+    def verificar_paridade(self, df, tolerance=0.05, epochs=5):
+        """
+        Compara a acurácia do modo incremental com a do modo em lote no mesmo
+        conjunto de validação.
+
+        O modo em lote treina o pipeline padrão em 80% dos dados; o modo
+        incremental consome os mesmos 80% em blocos via partial_fit. O modo
+        incremental é considerado aceitável se perder no máximo `tolerance`
+        de acurácia.
+        """
+        labels = self.heuristics.label(df)
+        train_idx, test_idx = train_test_split(
+            np.arange(len(df)), test_size=0.2, random_state=42, stratify=labels
+        )
+        df_train, df_test = df.iloc[train_idx], df.iloc[test_idx]
+        y_test = labels[test_idx]
+
+        batch = PiracyDetectionClassifier()
+        batch.pipeline = batch.build_pipeline()
+        batch.pipeline.fit(batch.build_model_input(df_train), labels[train_idx])
+        batch.set_pipeline_steps()
+        batch.is_trained = True
+        batch_accuracy = accuracy_score(y_test, batch.prever(df_test.copy())['ai_prediction'])
+
+        incremental = IncrementalPiracyDetectionClassifier(chunksize=self.chunksize)
+        rng = np.random.default_rng(42)
+        for _ in range(epochs):
+            order = rng.permutation(len(df_train))
+            incremental.atualizar_modelo(df_train.iloc[order], labels[train_idx][order])
+        incremental_accuracy = accuracy_score(y_test, incremental.prever(df_test.copy())['ai_prediction'])
+
+        gap = batch_accuracy - incremental_accuracy
+        result = {
+            'batch_accuracy': batch_accuracy,
+            'incremental_accuracy': incremental_accuracy,
+            'gap': gap,
+            'within_tolerance': gap <= tolerance
+        }
+        self.logger.info(
+            f"Paridade lote x incremental: {batch_accuracy:.3f} x {incremental_accuracy:.3f} "
+            f"(diferença {gap:+.3f}, tolerância {tolerance})"
+        )
+        return result
+
+    def save_model(self, filename="resultados/modelo_incremental.pkl"):
+        """
+        Salva o modelo incremental (scaler, SGD e contadores)
+        """
+        if not self.is_trained:
+            raise ValueError("Modelo não foi treinado ainda")
+
+        model_data = {
+            'format_version': INCREMENTAL_FORMAT_VERSION,
+            'mode': 'incremental',
+            'vectorizer_params': self.vectorizer.get_params(),
+            'scaler': self.scaler,
+            'model': self.model,
+            'schema': {
+                'text_column': TEXT_COLUMN,
+                'numeric_features': list(FEATURE_COLUMNS),
+                'catalog_file': self.feature_builder.catalog_file
+            },
+            'n_samples_seen': self.n_samples_seen,
+            'model_version': self.model_version,
+            'trained_at': datetime.now().isoformat()
+        }
+        # Arquivo temporário + os.replace, como em PiracyDetectionClassifier.save_model
+        temp_file = f"{filename}.{os.getpid()}.tmp"
+        try:
+            joblib.dump(model_data, temp_file, compress=0)
+            os.replace(temp_file, filename)
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+        self.logger.info(f"Modelo incremental salvo em {filename}")
+
+    def load_model(self, filename="resultados/modelo_incremental.pkl", mmap_mode=None):
+        """
+        Carrega um modelo incremental salvo
+        """
+        model_data = joblib.load(filename, mmap_mode=mmap_mode)
+        if not isinstance(model_data, dict) or model_data.get('mode') != 'incremental' \
+                or model_data.get('format_version') != INCREMENTAL_FORMAT_VERSION:
+            raise ValueError(f"{filename} não é um modelo incremental compatível")
+        if model_data['schema']['numeric_features'] != list(FEATURE_COLUMNS):
+            raise ValueError(f"Modelo em {filename} foi treinado com outras features numéricas")
+
+        self.feature_builder.catalog_file = model_data['schema'].get('catalog_file', DEFAULT_CATALOG_FILE)
+        self.vectorizer = HashingVectorizer(**model_data['vectorizer_params'])
+        self.scaler = model_data['scaler']
+        self.model = model_data['model']
+        self.n_samples_seen = model_data['n_samples_seen']
+        self.model_version = model_data['model_version']
+        self.is_trained = True
+        self.logger.info(f"Modelo incremental carregado de {filename} (versão {self.model_version})")
+
+
+def main():
+    """
+    Verifica se o modo incremental se mantém próximo do modo em lote
+    """
+    parser = argparse.ArgumentParser(description="Verificação de paridade do modo incremental")
+    parser.add_argument('--dados', default='data/base_dados.csv', help="CSV rotulado pelas heurísticas")
+    parser.add_argument('--tolerancia', type=float, default=0.05, help="Perda máxima de acurácia aceitável")
+    args = parser.parse_args()
+
+    df = carregar_base_dados(args.dados)
+    result = IncrementalPiracyDetectionClassifier().verificar_paridade(df, tolerance=args.tolerancia)
+
+    print(f"Acurácia em lote:       {result['batch_accuracy']:.3f}")
+    print(f"Acurácia incremental:   {result['incremental_accuracy']:.3f}")
+    print(f"Diferença:              {result['gap']:+.3f}")
+    print("OK" if result['within_tolerance'] else "ACIMA DA TOLERÂNCIA")
+
+
+if __name__ == "__main__":
+    main()
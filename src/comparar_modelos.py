@@ -0,0 +1,156 @@
+import os
+import io
+import time
+import argparse
+import logging
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold, cross_validate
+from classificador_ia import PiracyDetectionClassifier, MODEL_CANDIDATES
+from ingestao import carregar_base_dados
+
+logger = logging.getLogger(__name__)
+
+
+def cross_validate_candidate(name, pipeline, X, y, n_splits):
+    """Valida um candidato com k-fold estratificado (executado em um worker)"""
+    cv = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=42)
+    scores = cross_validate(pipeline, X, y, cv=cv, scoring=['accuracy', 'f1_macro'], n_jobs=1)
+    return {
+        'model': name,
+        'accuracy': scores['test_accuracy'].mean(),
+        'accuracy_std': scores['test_accuracy'].std(),
+        'f1_macro': scores['test_f1_macro'].mean(),
+        'f1_macro_std': scores['test_f1_macro'].std()
+    }
+
+
+def measure_serving(name, pipeline, X, y, latency_repeats=50, batch_size=10000):
+    """
+    Mede custo de treino e de inferência de um candidato já escolhido:
+    tempo de treino, latência de uma linha, vazão em lote, tamanho
+    serializado e tempo de carregamento
+    """
+    start = time.perf_counter()
+    pipeline.fit(X, y)
+    fit_time = time.perf_counter() - start
+
+    # Latência de uma linha (mediana, após uma chamada de aquecimento)
+    row = X.iloc[[0]]
+    pipeline.predict_proba(row)
+    latencies = []
+    for _ in range(latency_repeats):
+        start = time.perf_counter()
+        pipeline.predict_proba(row)
+        latencies.append(time.perf_counter() - start)
+
+    # Vazão em lote
+    batch = X.iloc[np.resize(np.arange(len(X)), batch_size)]
+    start = time.perf_counter()
+    pipeline.predict_proba(batch)
+    batch_time = time.perf_counter() - start
+
+    # Tamanho serializado e tempo de carregamento
+    buffer = io.BytesIO()
+    joblib.dump(pipeline, buffer)
+    size = buffer.tell()
+    buffer.seek(0)
+    start = time.perf_counter()
+    joblib.load(buffer)
+    load_time = time.perf_counter() - start
+
+    return {
+        'model': name,
+        'fit_time_s': fit_time,
+        'latency_ms_p50': np.median(latencies) * 1000,
+        'latency_ms_p95': np.percentile(latencies, 95) * 1000,
+        'throughput_rows_s': batch_size / batch_time,
+        'size_mb': size / 1e6,
+        'load_time_ms': load_time * 1000
+    }
+
+
+def compare_models(df, candidates=None, n_splits=5, n_jobs=-1):
+    """
+    Treina e valida os candidatos de MODEL_CANDIDATES sobre os rótulos
+    heurísticos de `df`.
+
+    A validação cruzada roda em paralelo (um candidato por worker); as
+    medições de latência, vazão, tamanho e carregamento rodam depois, em
+    sequência, para que os tempos não sejam distorcidos pela concorrência.
+    """
+    candidates = candidates or list(MODEL_CANDIDATES)
+    classifier = PiracyDetectionClassifier()
+    df_training = classifier.create_training_data(df.copy())
+    X = classifier.build_model_input(df_training)
+    y = df_training['label']
+
+    pipelines = {name: classifier.build_pipeline(name) for name in candidates}
+
+    logger.info(f"Validando {len(candidates)} modelos em paralelo ({n_splits} folds)...")
+    quality = Parallel(n_jobs=n_jobs)(
+        delayed(cross_validate_candidate)(name, pipeline, X, y, n_splits)
+        for name, pipeline in pipelines.items()
+    )
+
+    serving = []
+    for name, pipeline in pipelines.items():
+        logger.info(f"Medindo latência e vazão: {name}")
+        serving.append(measure_serving(name, clone(pipeline), X, y))
+
+    results = pd.DataFrame(quality).merge(pd.DataFrame(serving), on='model')
+    return results.sort_values('f1_macro', ascending=False).reset_index(drop=True)
+
+
+def escolher_modelo(results, latency_budget_ms):
+    """
+    Escolhe o modelo de maior F1 cuja latência p95 de uma linha cabe no
+    orçamento; em caso de empate, o de maior vazão. Retorna None se nenhum
+    modelo couber
+    """
+    eligible = results[results['latency_ms_p95'] <= latency_budget_ms]
+    if len(eligible) == 0:
+        return None
+    best = eligible.sort_values(['f1_macro', 'throughput_rows_s'], ascending=[False, False]).iloc[0]
+    return best['model']
+
+
+def main():
+    """
+    Compara os modelos e indica o melhor para um orçamento de latência
+    """
+    parser = argparse.ArgumentParser(description="Comparação de modelos: qualidade x latência/vazão")
+    parser.add_argument('--dados', default='data/base_dados.csv', help="CSV usado para treino/validação")
+    parser.add_argument('--modelos', nargs='+', choices=list(MODEL_CANDIDATES), help="Candidatos (padrão: todos)")
+    parser.add_argument('--folds', type=int, default=5, help="Número de folds da validação cruzada")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Workers da validação cruzada")
+    parser.add_argument('--orcamento-ms', type=float, default=None, help="Latência máxima (p95) de uma linha")
+    parser.add_argument('--saida', default='resultados/comparacao_modelos.csv', help="CSV com a tabela de resultados")
+    args = parser.parse_args()
+
+    df = carregar_base_dados(args.dados)
+    results = compare_models(df, args.modelos, n_splits=args.folds, n_jobs=args.n_jobs)
+
+    out_dir = os.path.dirname(args.saida)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    results.to_csv(args.saida, index=False)
+
+    print("\n=== COMPARAÇÃO DE MODELOS ===")
+    print(results.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print(f"\nTabela salva em {args.saida}")
+
+    if args.orcamento_ms is not None:
+        chosen = escolher_modelo(results, args.orcamento_ms)
+        if chosen:
+            print(f"\nModelo recomendado para p95 <= {args.orcamento_ms} ms: {chosen}")
+            print(f"Use \"model\": \"{chosen}\" na seção \"ai\" de config.json")
+        else:
+            print(f"\nNenhum modelo atende p95 <= {args.orcamento_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+import os
+import json
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from regras_heuristicas import text_column, price_column
+from vocabulario import fold_text
+from esquema import probability_columns
+from produto import MISSING_SELLER_VALUES
+from ingestao import carregar_base_dados
+
+# Colunas de predição copiadas do representante para o resto do grupo
+# (além das probabilidades por classe, prob_<CLASSE>)
+PREDICTION_COLUMNS = ['ai_prediction', 'ai_confidence']
+
+# Shingles processados por vez no cálculo das assinaturas (limita a memória)
+_SHINGLE_BLOCK = 200000
+
+
+class NearDuplicateDetector:
+    """
+    Agrupamento de anúncios quase idênticos com MinHash + LSH.
+
+    Cada texto (normalizado com fold_text) vira um conjunto de shingles de
+    `shingle_size` caracteres e uma assinatura MinHash de `num_perm`
+    valores. A assinatura é dividida em `bands` faixas; textos com uma faixa
+    idêntica são candidatos e viram vizinhos quando a fração de valores
+    iguais da assinatura (estimativa da similaridade de Jaccard) é pelo
+    menos `threshold`. Os grupos são as componentes conexas, e o
+    representante é a primeira linha de cada grupo. Nenhum par de textos é
+    comparado fora dos candidatos, então o custo cresce quase linearmente.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=64, bands=16, shingle_size=4, seed=0):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) deve ser múltiplo de bands ({bands})")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self.logger = logging.getLogger(__name__)
+
+        # Hash multiply-shift: h_i(x) = (a_i * x + b_i) >> 32, com a_i ímpar
+        rng = np.random.default_rng(seed)
+        self.hash_a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.hash_b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+    @classmethod
+    def from_config(cls, config):
+        """Cria o detector a partir da seção deduplication do config.json"""
+        params = {
+            key: value for key, value in config.get('deduplication', {}).items()
+            if key in ('threshold', 'num_perm', 'bands', 'shingle_size', 'seed')
+        }
+        return cls(**params)
+
+    def shingle_hashes(self, texts):
+        """
+        Hash (uint32) de cada shingle de todos os textos, concatenados, e a
+        posição inicial dos shingles de cada texto. Textos mais curtos que um
+        shingle contam como um shingle só.
+        """
+        k = self.shingle_size
+        encoded = [' '.join(fold_text(text).split()).encode('utf-8') for text in texts]
+        lengths = np.fromiter((max(len(text) - k + 1, 1) for text in encoded), dtype=np.int64, count=len(encoded))
+        padded = b''.join(text.ljust(k, b' ') for text in encoded)
+        data = np.frombuffer(padded, dtype=np.uint8).astype(np.uint64)
+
+        # Hash polinomial de cada janela de k bytes (a janela pode atravessar
+        # o fim do texto; só as janelas que começam dentro de cada texto são usadas)
+        window = np.zeros(len(data), dtype=np.uint64)
+        for offset in range(k):
+            window[:len(data) - offset] = window[:len(data) - offset] * np.uint64(257) + data[offset:]
+        starts = np.concatenate(([0], np.cumsum([max(len(text), k) for text in encoded])[:-1])).astype(np.int64)
+        positions = np.repeat(starts, lengths) + (np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths))
+        hashes = (window[positions] * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(32)
+        return hashes, np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+    def signatures(self, texts):
+        """Matriz (n_textos, num_perm) de assinaturas MinHash (uint32)"""
+        hashes, offsets = self.shingle_hashes(texts)
+        ends = np.append(offsets[1:], len(hashes))
+        signatures = np.empty((len(offsets), self.num_perm), dtype=np.uint32)
+
+        # Blocos de textos inteiros, com até _SHINGLE_BLOCK shingles cada
+        first = 0
+        while first < len(offsets):
+            last = max(int(np.searchsorted(ends, offsets[first] + _SHINGLE_BLOCK, side='right')), first + 1)
+            block = hashes[offsets[first]:ends[last - 1]]
+            permuted = ((block[:, None] * self.hash_a + self.hash_b) >> np.uint64(32)).astype(np.uint32)
+            signatures[first:last] = np.minimum.reduceat(permuted, offsets[first:last] - offsets[first], axis=0)
+            first = last
+        return signatures
+
+    def field_signatures(self, values):
+        """Assinaturas de uma coluna, calculadas uma vez por valor distinto"""
+        codes, uniques = pd.factorize(values)
+        return self.signatures(np.asarray(uniques, dtype=object))[codes]
+
+    def candidate_edges(self, signatures, checks=()):
+        """
+        Pares (i, j) de textos com uma faixa igual na assinatura `signatures`
+        e similaridade estimada >= threshold; cada texto é comparado só com o
+        primeiro do seu balde. `checks` são pares (assinaturas, presente) de
+        outros campos que também precisam ser similares quando presentes nos
+        dois textos.
+        """
+        rows = self.num_perm // self.bands
+        sources, targets = [], []
+        for band in range(self.bands):
+            keys = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+            keys = keys.view(np.dtype((np.void, keys.dtype.itemsize * rows))).ravel()
+            _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+            leader = first[inverse]
+            candidates = np.flatnonzero(leader != np.arange(len(keys)))
+            keep = self.similar(signatures, candidates, leader[candidates])
+            for field_signatures, present in checks:
+                both = present[candidates] & present[leader[candidates]]
+                keep &= ~both | self.similar(field_signatures, candidates, leader[candidates])
+            sources.append(candidates[keep])
+            targets.append(leader[candidates[keep]])
+        return np.concatenate(sources), np.concatenate(targets)
+
+    def similar(self, signatures, left, right):
+        """Indica se a similaridade estimada de cada par é >= threshold"""
+        return (signatures[left] == signatures[right]).mean(axis=1) >= self.threshold
+
+    def cluster(self, titles, descriptions=None):
+        """
+        Grupo de cada anúncio, identificado pela posição do representante
+        (primeira ocorrência do grupo).
+
+        Os candidatos vêm do LSH sobre os títulos; com descrições, um par só
+        é agrupado se as descrições também forem similares (quando os dois
+        anúncios têm descrição), para que um texto padrão do vendedor não
+        junte produtos diferentes. Títulos vazios ficam isolados.
+        """
+        fields = pd.DataFrame({'title': pd.Series(titles, dtype=object)})
+        fields['description'] = pd.Series(descriptions, dtype=object) if descriptions is not None else ''
+        fields = fields.fillna('').astype(str)
+        codes = fields.groupby(['title', 'description'], sort=False).ngroup().to_numpy()
+        uniques = fields.loc[~fields.duplicated().to_numpy()]
+        n = len(uniques)
+        if n == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        titles = uniques['title'].to_numpy(dtype=object)
+        has_title = np.flatnonzero([bool(text.strip()) for text in titles])
+
+        checks = []
+        descriptions = uniques['description'].iloc[has_title]
+        has_description = (descriptions.str.strip() != '').to_numpy()
+        if has_description.any():
+            checks.append((self.field_signatures(descriptions), has_description))
+        sources, targets = self.candidate_edges(self.field_signatures(uniques['title'].iloc[has_title]), checks)
+        graph = coo_matrix(
+            (np.ones(len(sources), dtype=np.int8), (has_title[sources], has_title[targets])), shape=(n, n)
+        )
+        _, components = connected_components(graph, directed=False)
+
+        # Representante: a primeira linha (na ordem original) de cada grupo
+        row_components = components[codes]
+        return pd.Series(np.arange(len(codes))).groupby(row_components).transform('min').to_numpy()
+
+    def agrupar(self, df):
+        """
+        Acrescenta cluster_id (posição do representante), cluster_size e
+        is_representative a `df`, agrupando por título e descrição
+        """
+        titles = text_column(df, 'title', lower=False).where(df['title'].notna(), '') if 'title' in df.columns else None
+        descriptions = None
+        if 'description' in df.columns:
+            descriptions = text_column(df, 'description', lower=False).where(df['description'].notna(), '')
+
+        cluster_id = self.cluster(titles if titles is not None else [''] * len(df), descriptions)
+        df['cluster_id'] = cluster_id
+        df['cluster_size'] = np.bincount(cluster_id, minlength=len(df))[cluster_id]
+        df['is_representative'] = cluster_id == np.arange(len(df))
+
+        n_clusters = int(df['is_representative'].sum())
+        self.logger.info(f"Deduplicação: {len(df)} anúncios em {n_clusters} grupos")
+        return df
+
+
+def propagar_predicoes(df, classifier, detector, price_tolerance=0.1):
+    """
+    Classifica só o representante de cada grupo de quase-duplicatas e
+    copia a predição para o resto do grupo.
+
+    Anúncios cujo preço difere do representante em mais de
+    `price_tolerance` (fração), ou cujo vendedor não é o do representante
+    (ou está ausente), são classificados individualmente: o preço e o
+    vendedor também alimentam o modelo, e uma predição nunca passa de um
+    vendedor para outro.
+    """
+    df = detector.agrupar(df)
+    cluster_id = df['cluster_id'].to_numpy()
+
+    seller = text_column(df, 'seller').str.strip().to_numpy()
+    known_seller = ~np.isin(seller, list(MISSING_SELLER_VALUES))
+    same_seller = known_seller & (seller == seller[cluster_id])
+
+    price = price_column(df).to_numpy(dtype=float)
+    representative_price = price[cluster_id]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        deviation = np.abs(price / representative_price - 1)
+    same_price = (price == representative_price) | (deviation <= price_tolerance)
+
+    own = df['is_representative'].to_numpy() | ~same_price | ~same_seller
+    source = np.where(own, np.arange(len(df)), cluster_id)
+
+    scored = classifier.prever(df.loc[own].copy())
+    scored_position = np.cumsum(own) - 1
+    for column in PREDICTION_COLUMNS + probability_columns(scored):
+        if column in scored.columns:
+            values = scored[column].to_numpy()
+            df[column] = values[scored_position[source]]
+
+    df['prediction_source'] = np.where(own, 'modelo', 'grupo')
+    logging.getLogger(__name__).info(
+        f"Predições: {int(own.sum())} classificadas, {int((~own).sum())} copiadas do representante"
+    )
+    return df
+
+
+def verificar_propagacao(df, classifier, detector, price_tolerance=0.1):
+    """
+    Compara a predição propagada com a classificação de todas as linhas;
+    retorna a concordância e a economia de chamadas ao modelo
+    """
+    full = classifier.prever(df.copy())
+    propagated = propagar_predicoes(df.copy(), classifier, detector, price_tolerance)
+    copied = (propagated['prediction_source'] == 'grupo').to_numpy()
+    agree = full['ai_prediction'].to_numpy() == propagated['ai_prediction'].to_numpy()
+    return {
+        'rows': len(df),
+        'clusters': int(propagated['is_representative'].sum()),
+        'model_calls': int((~copied).sum()),
+        'copied': int(copied.sum()),
+        'agreement': float(agree.mean()) if len(df) else 1.0,
+        'agreement_copied': float(agree[copied].mean()) if copied.any() else 1.0
+    }
+
+
+def main():
+    """
+    Agrupa os anúncios de um CSV e mede a concordância das predições
+    propagadas com a classificação completa
+    """
+    parser = argparse.ArgumentParser(description="Agrupamento de anúncios quase duplicados (MinHash + LSH)")
+    parser.add_argument('--config', default='config.json', help="Configuração (seção deduplication)")
+    parser.add_argument('--dados', default='data/base_dados.csv', help="CSV com os anúncios")
+    parser.add_argument('--modelo', default='resultados/modelo_deteccao_pirataria.pkl', help="Modelo treinado")
+    parser.add_argument('--limiar', type=float, default=None, help="Similaridade mínima (padrão: deduplication.threshold)")
+    parser.add_argument('--saida', default=None, help="CSV com cluster_id/cluster_size")
+    args = parser.parse_args()
+
+    config = {}
+    if os.path.exists(args.config):
+        with open(args.config, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    if args.limiar is not None:
+        config.setdefault('deduplication', {})['threshold'] = args.limiar
+    detector = NearDuplicateDetector.from_config(config)
+    price_tolerance = config.get('deduplication', {}).get('price_tolerance', 0.1)
+
+    df = detector.agrupar(carregar_base_dados(args.dados))
+    sizes = df.loc[df['is_representative'], 'cluster_size']
+    print(f"\n=== DEDUPLICAÇÃO ({len(df)} anúncios, limiar {detector.threshold}) ===")
+    print(f"Grupos: {len(sizes)} ({int((sizes > 1).sum())} com mais de um anúncio, maior: {int(sizes.max())})")
+
+    if os.path.exists(args.modelo):
+        from classificador_ia import PiracyDetectionClassifier
+        classifier = PiracyDetectionClassifier()
+        classifier.load_model(args.modelo)
+        check = verificar_propagacao(df, classifier, detector, price_tolerance)
+        print(f"Chamadas ao modelo: {check['model_calls']} de {check['rows']} ({check['copied']} predições copiadas)")
+        print(f"Concordância com a classificação completa: {check['agreement']:.1%} "
+              f"(entre as copiadas: {check['agreement_copied']:.1%})")
+
+    if args.saida:
+        out_dir = os.path.dirname(args.saida)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        df.to_csv(args.saida, index=False, encoding='utf-8')
+        print(f"\nGrupos salvos em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
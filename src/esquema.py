@@ -0,0 +1,208 @@
+import os
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+
+# Esquema compacto dos DataFrames de produtos, aplicado na ingestão e ao
+# fim de cada etapa do pipeline (colunas ausentes são ignoradas). Título,
+# descrição e URL ficam como texto e dominam a memória, então a redução
+# total é bem menor que a das colunas convertidas:
+# - 'category': colunas de baixa cardinalidade (vendedor, marca, rótulos)
+# - 'float32': preços, notas, confiança e estatísticas de preço
+# - 'inteiro': int32 quando todos os valores são inteiros, senão float32
+PRODUCT_SCHEMA = {
+    'marketplace': 'category',
+    'search_term': 'category',
+    'seller': 'category',
+    'seller_detailed': 'category',
+    'brand': 'category',
+    'product_line': 'category',
+    'sales_format': 'category',
+    'cartridge_type': 'category',
+    'model': 'category',
+    'availability': 'category',
+    'shipping_info': 'category',
+    'catalog_pn': 'category',
+    'catalog_family': 'category',
+    'catalog_match': 'category',
+    'price_family': 'category',
+    'price_anomaly': 'category',
+    'price_anomaly_rule': 'category',
+    'prediction_source': 'category',
+    'label': 'category',
+    'ai_prediction': 'category',
+    'risk_level': 'category',
+    'analysis_timestamp': 'category',
+    'price': 'float32',
+    'suggested_price': 'float32',
+    'price_ratio': 'float32',
+    'rating': 'float32',
+    'review_rating': 'float32',
+    'volume_total': 'float32',
+    'page_yield': 'float32',
+    'family_median': 'float32',
+    'family_mad': 'float32',
+    'price_robust_z': 'float32',
+    'ai_confidence': 'float32',
+    'review_count': 'inteiro',
+    'review_amount': 'inteiro',
+    'cluster_id': 'inteiro',
+    'cluster_size': 'inteiro',
+    'risk_score': 'inteiro'
+}
+
+# Prefixo das colunas de probabilidade por classe (prob_<CLASSE>), que
+# substituem a antiga lista ai_probabilities por linha
+PROBABILITY_PREFIX = 'prob_'
+
+# Prefixo das colunas de contribuição de cada regra de risco (risk_<regra>)
+RISK_PREFIX = 'risk_'
+
+
+def probability_columns(df):
+    """Colunas prob_<CLASSE> presentes em `df`"""
+    return [column for column in df.columns if column.startswith(PROBABILITY_PREFIX)]
+
+
+def set_probabilities(df, probabilities, classes):
+    """Grava a matriz de probabilidades (linhas x classes) como colunas prob_<CLASSE>"""
+    probabilities = np.asarray(probabilities, dtype=np.float64).reshape(len(df), len(classes))
+    for i, label in enumerate(classes):
+        df[f"{PROBABILITY_PREFIX}{label}"] = probabilities[:, i]
+    return df
+
+
+def probability_matrix(df, classes):
+    """Matriz de probabilidades (linhas x classes, na ordem de `classes`) a partir das colunas prob_"""
+    if len(classes) == 0:
+        return np.empty((len(df), 0), dtype=np.float64)
+    return np.column_stack([
+        df[f"{PROBABILITY_PREFIX}{label}"].to_numpy(dtype=np.float64) for label in classes
+    ])
+
+
+def _kind(column):
+    if column in PRODUCT_SCHEMA:
+        return PRODUCT_SCHEMA[column]
+    if column.startswith(PROBABILITY_PREFIX):
+        return 'float32'
+    if column.startswith(RISK_PREFIX):
+        return 'inteiro'
+    return None
+
+
+def _converter(values, kind):
+    """Converte uma coluna para o tipo compacto (None se já estiver nele)"""
+    if kind == 'category':
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            return None
+        return values.astype('category')
+
+    if values.dtype == np.float32 or values.dtype == np.int32:
+        return None
+    numbers = pd.to_numeric(values, errors='coerce')
+    if pd.api.types.is_bool_dtype(numbers):
+        return None
+    if kind == 'inteiro':
+        data = numbers.to_numpy(dtype=np.float64, na_value=np.nan)
+        integral = np.isfinite(data).all() and (data == np.round(data)).all()
+        if integral and (len(data) == 0 or np.abs(data).max() < 2 ** 31):
+            return numbers.astype(np.int32)
+    return numbers.astype(np.float32)
+
+
+def compactar(df):
+    """
+    Aplica PRODUCT_SCHEMA a `df` (no próprio DataFrame, que é retornado).
+
+    Categorias guardam só os valores presentes; comparações (== 'ALTO'),
+    .str e to_csv funcionam como antes. Valores float32 têm ~7 dígitos
+    significativos, suficientes para preços em centavos.
+    """
+    for column in df.columns:
+        kind = _kind(column)
+        if kind is None:
+            continue
+        converted = _converter(df[column], kind)
+        if converted is not None:
+            df[column] = converted
+    return df
+
+
+def uso_memoria(df):
+    """Bytes ocupados por coluna (contando o conteúdo dos textos)"""
+    return df.memory_usage(deep=True, index=False)
+
+
+def relatorio_memoria(antes, depois):
+    """
+    Comparação coluna a coluna (tipo e MB) entre dois DataFrames, com
+    uma linha TOTAL no fim
+    """
+    columns = list(dict.fromkeys(list(antes.columns) + list(depois.columns)))
+    before = uso_memoria(antes)
+    after = uso_memoria(depois)
+    report = pd.DataFrame({
+        'tipo_antes': [str(antes[column].dtype) if column in antes.columns else '-' for column in columns],
+        'mb_antes': [before.get(column, 0) / 1e6 for column in columns],
+        'tipo_depois': [str(depois[column].dtype) if column in depois.columns else '-' for column in columns],
+        'mb_depois': [after.get(column, 0) / 1e6 for column in columns]
+    }, index=columns)
+    report = report.sort_values('mb_antes', ascending=False)
+    report.loc['TOTAL'] = ['', report['mb_antes'].sum(), '', report['mb_depois'].sum()]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        report['reducao'] = np.where(
+            report['mb_antes'] > 0, 1 - report['mb_depois'] / report['mb_antes'], 0.0
+        )
+    return report
+
+
+def main():
+    """
+    Mostra a memória de uma base de anúncios antes e depois do esquema
+    compacto, com as colunas das etapas do pipeline (catálogo, anomalias
+    de preço, predição e risco, quando o modelo existe)
+    """
+    parser = argparse.ArgumentParser(description="Memória dos DataFrames de produtos antes/depois do esquema compacto")
+    parser.add_argument('--dados', default='data/base_dados.csv', help="CSV com os anúncios")
+    parser.add_argument('--catalogo', default='data/catalogo.csv', help="CSV do catálogo")
+    parser.add_argument('--modelo', default='resultados/modelo_deteccao_pirataria.pkl', help="Modelo treinado")
+    parser.add_argument('--saida', default=None, help="CSV com o relatório")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    from ingestao import carregar_base_dados
+    df = carregar_base_dados(args.dados)
+    if os.path.exists(args.catalogo):
+        from catalogo import load_catalog_index
+        from anomalias_preco import PriceAnomalyDetector
+        catalog_index = load_catalog_index(args.catalogo)
+        df = PriceAnomalyDetector().detect(catalog_index.attach(df), catalog_index)
+
+    antes = df.copy()
+    if os.path.exists(args.modelo):
+        from classificador_ia import PiracyDetectionClassifier
+        classifier = PiracyDetectionClassifier()
+        classifier.load_model(args.modelo)
+        df = classifier.analyze_risk_level(classifier.prever(df))
+        classes = classifier.model.classes_
+        # Formato anterior: probabilidades como lista Python por linha
+        antes = df.drop(columns=probability_columns(df))
+        antes['ai_probabilities'] = probability_matrix(df, classes).tolist()
+
+    report = relatorio_memoria(antes, compactar(df.copy()))
+    with pd.option_context('display.float_format', '{:.3f}'.format, 'display.width', 200):
+        print(f"\n=== MEMÓRIA ({len(df)} anúncios) ===")
+        print(report.to_string())
+
+    if args.saida:
+        out_dir = os.path.dirname(args.saida)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        report.to_csv(args.saida, index_label='coluna', encoding='utf-8')
+        print(f"\nRelatório salvo em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+import os
+import json
+import time
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from floresta_numpy import CompiledPiracyModel, TEXT_SOURCES
+from features_produto import NumericFeatureBuilder, FEATURE_COLUMNS, FEATURE_INPUT_COLUMNS
+from regras_heuristicas import HeuristicLabeler
+from risco import RiskAnalyzer
+from esquema import set_probabilities
+
+logger = logging.getLogger(__name__)
+
+# Linhas enviadas a cada worker por tarefa
+DEFAULT_BLOCK_ROWS = 20000
+
+# Etapas que podem ser executadas nos workers, na ordem em que rodam
+STAGES = ('labels', 'features', 'prediction', 'risk')
+
+# Estado do processo worker (criado uma vez no inicializador)
+_worker = {}
+
+
+def memory_usage():
+    """
+    Memória do processo atual em MB, lida de /proc/self/smaps_rollup
+    (Linux): RSS, PSS (páginas compartilhadas divididas entre os
+    processos), privada e compartilhada. Retorna {} em outros sistemas.
+    """
+    try:
+        with open('/proc/self/smaps_rollup', 'r') as f:
+            fields = dict(
+                (parts[0].rstrip(':'), int(parts[1]))
+                for parts in (line.split() for line in f)
+                if len(parts) == 3 and parts[2] == 'kB'
+            )
+    except OSError:
+        return {}
+    return {
+        'rss_mb': fields.get('Rss', 0) / 1024,
+        'pss_mb': fields.get('Pss', 0) / 1024,
+        'private_mb': (fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)) / 1024,
+        'shared_mb': (fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)) / 1024
+    }
+
+
+def _build_state(model_dir, risk_params):
+    """
+    Componentes usados pelas etapas. O modelo compilado é aberto com
+    mmap_mode='r': os arrays da floresta e do TF-IDF ficam no page cache,
+    compartilhados por todos os workers, e não são copiados para a memória
+    privada de cada processo
+    """
+    model = CompiledPiracyModel(model_dir, mmap_mode='r') if model_dir else None
+    return {
+        'model': model,
+        'labeler': HeuristicLabeler(),
+        'features': model.feature_builder if model else NumericFeatureBuilder(),
+        'risk': RiskAnalyzer(**risk_params)
+    }
+
+
+def _init_worker(model_dir, risk_params):
+    """Prepara o worker"""
+    _worker.update(_build_state(model_dir, risk_params))
+
+
+def _run_stages(state, block, stages):
+    """Executa as etapas pedidas sobre um bloco; retorna (colunas novas, probabilidades)"""
+    result = pd.DataFrame(index=block.index)
+    proba = None
+
+    if 'labels' in stages:
+        result['label'] = state['labeler'].label(block)
+
+    if 'features' in stages:
+        # Prefixo evita sobrescrever colunas de entrada de mesmo nome (price)
+        result[[f"feature_{column}" for column in FEATURE_COLUMNS]] = state['features'].build(block)
+
+    if 'prediction' in stages:
+        model = state['model']
+        proba = model.predict_proba(block)
+        best = np.argmax(proba, axis=1)
+        result['ai_prediction'] = model.classes_[best]
+        result['ai_confidence'] = proba[np.arange(len(best)), best]
+
+    if 'risk' in stages:
+        scored = block.copy()
+        for column in ('ai_prediction', 'ai_confidence'):
+            if column in result.columns:
+                scored[column] = result[column]
+        scored = state['risk'].analyze(scored)
+        risk_columns = state['risk'].contribution_columns() + ['risk_score', 'risk_level']
+        result[risk_columns] = scored[risk_columns]
+
+    return result, proba
+
+
+def _process_block(block, stages):
+    """
+    Executa as etapas pedidas sobre um bloco de linhas no worker.
+
+    Retorna (pid, colunas novas, probabilidades, memória): só as colunas
+    calculadas voltam ao processo principal, não o bloco inteiro.
+    """
+    result, proba = _run_stages(_worker, block, stages)
+    return os.getpid(), result, proba, memory_usage()
+
+
+class ParallelScorer:
+    """
+    Execução multi-processo em blocos de linhas, com um único modelo em
+    memória compartilhada.
+
+    Rotulagem, features, predição e risco rodam nos workers sobre blocos
+    de `block_rows` linhas; só as colunas calculadas voltam e são juntadas
+    na ordem original. Cada worker mapeia os arquivos .npy do modelo compilado
+    (floresta_numpy) em vez de desserializar a própria cópia do pickle,
+    de modo que só as matrizes de features de cada bloco ocupam memória
+    privada no worker.
+    """
+
+    def __init__(self, model_dir, n_workers=None, block_rows=DEFAULT_BLOCK_ROWS, risk_analyzer=None):
+        self.n_workers = n_workers or os.cpu_count()
+        self.block_rows = block_rows
+        self.model = CompiledPiracyModel(model_dir, mmap_mode='r')
+        # Workers abrem a mesma versão do processo principal, mesmo que o
+        # modelo seja exportado de novo enquanto eles iniciam
+        self.model_dir = self.model.model_dir
+        self.classes_ = self.model.classes_
+        self.risk_analyzer = risk_analyzer or RiskAnalyzer()
+        self.worker_memory = {}
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.n_workers,
+            initializer=_init_worker,
+            initargs=(self.model_dir, self.risk_analyzer.params())
+        )
+
+    def input_columns(self, df):
+        """
+        Colunas enviadas aos workers: as lidas pelo modelo e pelas
+        features, as de CatalogIndex.attach e as entradas das regras de
+        risco configuradas (ex.: cluster_size)
+        """
+        columns = list(dict.fromkeys(
+            TEXT_SOURCES + FEATURE_INPUT_COLUMNS + ['catalog_pn'] + self.risk_analyzer.input_columns()
+        ))
+        return df.reindex(columns=[column for column in columns if column in df.columns])
+
+    def blocks(self, df):
+        """Divide `df` em blocos de `block_rows` linhas"""
+        return [df.iloc[start:start + self.block_rows] for start in range(0, len(df), self.block_rows)]
+
+    def run_stages(self, df, stages):
+        """
+        Executa as etapas em paralelo, um bloco por tarefa; retorna as
+        colunas novas e as probabilidades (ou None) na ordem original
+        """
+        unknown = set(stages) - set(STAGES)
+        if unknown:
+            raise ValueError(f"Etapas desconhecidas: {sorted(unknown)}")
+
+        inputs = self.input_columns(df)
+        results, probas = [], []
+        for pid, result, proba, memory in self.executor.map(_process_block, self.blocks(inputs), repeat(tuple(stages))):
+            results.append(result)
+            probas.append(proba)
+            self.worker_memory[pid] = memory
+
+        columns = pd.concat(results) if results else pd.DataFrame(index=df.index)
+        proba = np.vstack(probas) if probas and probas[0] is not None else None
+        return columns, proba
+
+    def processar(self, df, stages=STAGES):
+        """
+        Executa rotulagem, features, predição e/ou análise de risco em
+        blocos de linhas distribuídos entre os workers e junta o resultado
+        a `df`, na ordem original (as probabilidades viram colunas
+        prob_<CLASSE>)
+        """
+        stages = [stage for stage in STAGES if stage in stages]
+        columns, proba = self.run_stages(df, stages)
+        for column in columns.columns:
+            df[column] = columns[column].to_numpy()
+        if proba is not None:
+            set_probabilities(df, proba, self.classes_)
+        return df
+
+    def predict_proba(self, df):
+        """Probabilidades por classe, com os blocos pontuados em paralelo e na ordem original"""
+        if len(df) == 0:
+            return np.empty((0, len(self.classes_)), dtype=np.float64)
+        return self.run_stages(df, ['prediction'])[1]
+
+    def prever(self, df):
+        """Mesmas colunas de PiracyDetectionClassifier.prever"""
+        return self.processar(df, ['prediction'])
+
+    def memory_report(self):
+        """Memória do último bloco pontuado por cada worker (MB)"""
+        return pd.DataFrame.from_dict(self.worker_memory, orient='index').rename_axis('pid').reset_index()
+
+    def close(self):
+        """Encerra os workers"""
+        self.executor.shutdown()
+
+
+def verificar_paridade(scorer, df, stages=STAGES):
+    """
+    Compara as colunas calculadas pelos workers com as mesmas etapas
+    executadas no processo atual sobre `df` inteiro (todas as colunas);
+    retorna, por coluna, o número de linhas diferentes e a maior diferença
+    entre as probabilidades
+    """
+    stages = [stage for stage in STAGES if stage in stages]
+    parallel, parallel_proba = scorer.run_stages(df, stages)
+    local, local_proba = _run_stages(_build_state(scorer.model_dir, scorer.risk_analyzer.params()), df, stages)
+
+    mismatches = {}
+    for column in local.columns:
+        expected, found = local[column].to_numpy(), parallel[column].to_numpy()
+        if pd.api.types.is_numeric_dtype(local[column]):
+            equal = np.isclose(found.astype(float), expected.astype(float), rtol=1e-9, atol=0, equal_nan=True)
+        else:
+            equal = found == expected
+        mismatches[column] = int((~equal).sum())
+    if local_proba is not None:
+        mismatches['max_proba_diff'] = float(np.abs(parallel_proba - local_proba).max()) if len(df) else 0.0
+    return mismatches
+
+
+def curva_speedup(df, model_dir, workers_list, stages=STAGES, block_rows=None, repeats=1, risk_analyzer=None):
+    """
+    Mede o tempo de `processar` para cada número de workers e retorna a
+    curva de speedup e eficiência em relação a 1 worker (ou ao menor
+    número testado)
+    """
+    rows = []
+    for n_workers in sorted(set(workers_list)):
+        # Um bloco por worker, no mínimo, para que todos tenham trabalho
+        block = block_rows or max(1000, -(-len(df) // (n_workers * 4)))
+        scorer = ParallelScorer(model_dir, n_workers=n_workers, block_rows=block, risk_analyzer=risk_analyzer)
+        try:
+            scorer.processar(df.head(block).copy(), stages)  # aquecimento dos workers
+            times = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                scorer.processar(df.copy(), stages)
+                times.append(time.perf_counter() - start)
+        finally:
+            scorer.close()
+        rows.append({'workers': n_workers, 'seconds': min(times), 'rows_s': len(df) / min(times)})
+        logger.info(f"{n_workers} workers: {min(times):.2f}s")
+
+    curve = pd.DataFrame(rows)
+    curve['speedup'] = curve['seconds'].iloc[0] / curve['seconds']
+    curve['efficiency'] = curve['speedup'] / (curve['workers'] / curve['workers'].iloc[0])
+    return curve
+
+
+def main():
+    """
+    Processa um CSV em paralelo com o modelo compilado ou mede a curva de speedup
+    """
+    parser = argparse.ArgumentParser(description="Execução multi-processo com modelo compartilhado")
+    parser.add_argument('--config', default='config.json', help="Configuração (regras e limiares de risco)")
+    parser.add_argument('--compilado', default="resultados/modelo_compilado", help="Diretório do modelo compilado")
+    parser.add_argument('--prever-arquivo', nargs=2, metavar=('ENTRADA', 'SAIDA'), help="CSV de entrada e de saída")
+    parser.add_argument('--etapas', nargs='+', choices=STAGES, default=list(STAGES), help="Etapas a executar")
+    parser.add_argument('--workers', type=int, default=None, help="Processos (padrão: núcleos)")
+    parser.add_argument('--bloco', type=int, default=DEFAULT_BLOCK_ROWS, help="Linhas por tarefa")
+    parser.add_argument('--curva', nargs='+', type=int, metavar='N', help="Mede o speedup para cada número de workers")
+    parser.add_argument('--paridade', action='store_true', help="Compara os workers com a execução no processo atual")
+    parser.add_argument('--dados', default='data/base_dados.csv', help="CSV usado na medição da curva")
+    parser.add_argument('--linhas', type=int, default=200000, help="Linhas usadas na medição (o CSV é repetido)")
+    parser.add_argument('--saida-curva', default='resultados/curva_speedup.csv', help="CSV com a curva medida")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    config = {}
+    if os.path.exists(args.config):
+        with open(args.config, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    risk_analyzer = RiskAnalyzer.from_config(config)
+
+    if args.curva:
+        base = pd.read_csv(args.dados)
+        df = base.iloc[np.resize(np.arange(len(base)), args.linhas)].reset_index(drop=True)
+        curve = curva_speedup(df, args.compilado, args.curva, stages=args.etapas, risk_analyzer=risk_analyzer)
+
+        out_dir = os.path.dirname(args.saida_curva)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        curve.to_csv(args.saida_curva, index=False)
+
+        print(f"\n=== CURVA DE SPEEDUP ({len(df)} linhas, {os.cpu_count()} núcleos) ===")
+        print(curve.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+        print(f"\nCurva salva em {args.saida_curva}")
+        return
+
+    if args.paridade:
+        scorer = ParallelScorer(args.compilado, n_workers=args.workers, block_rows=args.bloco, risk_analyzer=risk_analyzer)
+        try:
+            mismatches = verificar_paridade(scorer, pd.read_csv(args.dados), args.etapas)
+        finally:
+            scorer.close()
+        print("\n=== PARIDADE WORKERS x PROCESSO ATUAL (linhas diferentes) ===")
+        for column, value in mismatches.items():
+            print(f"  {column}: {value}")
+        return
+
+    if not args.prever_arquivo:
+        parser.error("informe --prever-arquivo, --curva ou --paridade")
+
+    input_path, output_path = args.prever_arquivo
+    scorer = ParallelScorer(args.compilado, n_workers=args.workers, block_rows=args.bloco, risk_analyzer=risk_analyzer)
+    try:
+        df = pd.read_csv(input_path)
+        start = time.perf_counter()
+        df = scorer.processar(df, args.etapas)
+        elapsed = time.perf_counter() - start
+        df.to_csv(output_path, index=False, encoding='utf-8')
+
+        print(f"{len(df)} produtos processados em {elapsed:.2f}s com {scorer.n_workers} workers")
+        report = scorer.memory_report()
+        if len(report):
+            print("\nMemória por worker (MB):")
+            print(report.to_string(index=False, float_format=lambda v: f"{v:.1f}"))
+    finally:
+        scorer.close()
+
+
+if __name__ == "__main__":
+    main()
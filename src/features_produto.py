@@ -0,0 +1,160 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+from regras_heuristicas import text_column, price_column, unique_rows
+from vocabulario import KeywordMatcher
+from catalogo import load_catalog_index, catalog_version
+
+# Ordem das features numéricas no modelo
+FEATURE_COLUMNS = [
+    'price',
+    'title_length',
+    'description_length',
+    'has_price',
+    'price_ratio',
+    'word_count',
+    'has_suspicious_words',
+    'has_original_words',
+    'seller_trust_score'
+]
+
+# Colunas lidas pelo construtor de features ('model' é usado na associação
+# ao catálogo, que dá o preço sugerido de price_ratio)
+FEATURE_INPUT_COLUMNS = ['title', 'description', 'seller', 'price', 'model', 'suggested_price']
+
+# Catálogo usado para o preço sugerido quando o DataFrame não passou por
+# CatalogIndex.attach (mesmo padrão de catalog.file no config.json)
+DEFAULT_CATALOG_FILE = 'data/catalogo.csv'
+
+# Grupos de VOCABULARIES (vocabulario.py) usados nas features
+TEXT_WORD_GROUPS = ['suspicious_words', 'original_words']
+SELLER_WORD_GROUPS = ['trusted_seller_words', 'suspicious_seller_words']
+
+
+def combined_text(df):
+    """Texto usado pelo vetorizador: título, descrição e vendedor"""
+    return (
+        text_column(df, 'title', lower=False) + ' ' +
+        text_column(df, 'description', lower=False) + ' ' +
+        text_column(df, 'seller', lower=False)
+    )
+
+
+class NumericFeatureBuilder:
+    """
+    Construtor colunar das features numéricas.
+
+    Normaliza título, descrição e vendedor uma única vez e calcula as
+    FEATURE_COLUMNS com operações sobre colunas inteiras, retornando a
+    matriz float32 pronta para o modelo.
+
+    O preço sugerido de price_ratio vem do catálogo `catalog_file` sempre
+    que o DataFrame não traz as colunas de CatalogIndex.attach, de modo
+    que treino, pipeline, arquivos em lote, serviço e workers calculam a
+    feature da mesma forma.
+    """
+
+    def __init__(self, catalog_file=DEFAULT_CATALOG_FILE):
+        self.text_matcher = KeywordMatcher(TEXT_WORD_GROUPS)
+        self.seller_matcher = KeywordMatcher(SELLER_WORD_GROUPS)
+        self.catalog_file = catalog_file
+        self.missing_catalog_logged = False
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def catalog_index(self):
+        """Índice do catálogo (None se o arquivo não existir)"""
+        if self.catalog_file and os.path.exists(self.catalog_file):
+            return load_catalog_index(self.catalog_file)
+        return None
+
+    def catalog_version(self):
+        """Hash do catálogo usado em price_ratio ('' se o arquivo não existir)"""
+        if self.catalog_file and os.path.exists(self.catalog_file):
+            return catalog_version(self.catalog_file)
+        return ''
+
+    def suggested_prices(self, df):
+        """
+        Preço sugerido de cada linha: o de suggested_price quando presente;
+        sem CatalogIndex.attach (coluna catalog_pn), os ausentes vêm do
+        catálogo, como em attach
+        """
+        if 'suggested_price' in df.columns:
+            suggested_price = pd.to_numeric(df['suggested_price'], errors='coerce').to_numpy(dtype=np.float64)
+        else:
+            suggested_price = np.full(len(df), np.nan)
+        if 'catalog_pn' in df.columns or not np.isnan(suggested_price).any():
+            return suggested_price
+
+        catalog_index = self.catalog_index
+        if catalog_index is None:
+            if not self.missing_catalog_logged:
+                self.logger.warning(f"Catálogo {self.catalog_file} não encontrado, price_ratio sem preço sugerido")
+                self.missing_catalog_logged = True
+            return suggested_price
+        return np.where(np.isnan(suggested_price), catalog_index.suggested_prices(df), suggested_price)
+
+    def price_ratio(self, price, suggested_price):
+        """Razão entre preço e preço sugerido (1.0 quando um deles falta)"""
+        valid = (price != 0) & (suggested_price != 0) & ~np.isnan(suggested_price)
+        ratio = np.ones(len(price), dtype=np.float64)
+        np.divide(price, suggested_price, out=ratio, where=valid)
+        return ratio
+
+    def count_suspicious_words(self, text):
+        """Conta palavras suspeitas distintas em cada texto"""
+        return self.text_matcher.group_count(text, group='suspicious_words')
+
+    def count_original_words(self, text):
+        """Conta palavras de originalidade distintas em cada texto"""
+        return self.text_matcher.group_count(text, group='original_words')
+
+    def seller_trust(self, seller):
+        """Score de confiança do vendedor: 1.0 confiável, 0.0 suspeito, 0.5 demais"""
+        counts = self.seller_matcher.group_counts(seller)
+        trusted, suspicious = counts[:, 0] > 0, counts[:, 1] > 0
+        return np.where(trusted, 1.0, np.where(suspicious, 0.0, 0.5))
+
+    def build(self, df):
+        """
+        Calcula a matriz (n_linhas, len(FEATURE_COLUMNS)) em float32.
+
+        As features são calculadas uma vez por combinação distinta das
+        colunas de entrada e replicadas para as linhas repetidas.
+        """
+        columns = FEATURE_INPUT_COLUMNS + (['catalog_pn'] if 'catalog_pn' in df.columns else [])
+        codes, unique_inputs = unique_rows(df, columns)
+        return self.build_rows(unique_inputs)[codes]
+
+    def build_rows(self, df):
+        """Calcula a matriz de features de cada linha, sem deduplicação"""
+        title = text_column(df, 'title', lower=False)
+        description = text_column(df, 'description', lower=False)
+        seller = text_column(df, 'seller', lower=False)
+        text = title + ' ' + description + ' ' + seller
+
+        # Preço ausente ou inválido conta como "sem preço". Preços arredondados
+        # para float32 (o tipo de PRODUCT_SCHEMA), para que price_ratio seja o
+        # mesmo com o DataFrame compactado ou não
+        price = price_column(df).fillna(0).to_numpy(dtype=np.float32).astype(np.float64)
+        suggested_price = self.suggested_prices(df).astype(np.float32).astype(np.float64)
+
+        features = np.empty((len(df), len(FEATURE_COLUMNS)), dtype=np.float32)
+        features[:, 0] = price
+        features[:, 1] = title.str.len().to_numpy()
+        features[:, 2] = description.str.len().to_numpy()
+        features[:, 3] = price != 0
+        features[:, 4] = self.price_ratio(price, suggested_price)
+        features[:, 5] = np.fromiter((len(value.split()) for value in text), dtype=np.int64, count=len(text))
+        # Mesmo resultado da busca em `text`, com cada campo distinto normalizado uma vez
+        word_counts = self.text_matcher.group_counts(title, description, seller, separator=' ')
+        features[:, 6] = word_counts[:, 0]
+        features[:, 7] = word_counts[:, 1]
+        features[:, 8] = self.seller_trust(seller)
+        return features
+
+    def build_frame(self, df):
+        """Mesmas features de build(), como DataFrame com FEATURE_COLUMNS"""
+        return pd.DataFrame(self.build(df), columns=FEATURE_COLUMNS, index=df.index)
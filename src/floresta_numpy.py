@@ -0,0 +1,367 @@
+import os
+import re
+import json
+import shutil
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from regras_heuristicas import text_column
+from features_produto import NumericFeatureBuilder, FEATURE_COLUMNS, DEFAULT_CATALOG_FILE
+from esquema import set_probabilities
+
+# Versão do formato do modelo compilado
+COMPILED_FORMAT_VERSION = 2
+
+# Arrays gravados em .npy (podem ser mapeados em memória no carregamento)
+ARRAY_FILES = [
+    'feature', 'threshold', 'children', 'values', 'roots',
+    'idf', 'numeric_mean', 'numeric_scale'
+]
+
+# Campos que compõem o texto do TF-IDF (mesma ordem de combined_text)
+TEXT_SOURCES = ['title', 'description', 'seller']
+
+# Linhas pontuadas por vez (limita a matriz densa de features)
+DEFAULT_BLOCK_SIZE = 1024
+
+# Arquivo, em `out_dir`, com o nome da versão exportada em uso
+CURRENT_FILE = 'CURRENT'
+
+# Versões mantidas em `out_dir`: a atual e a anterior, que processos
+# abertos antes da última exportação ainda podem estar lendo
+KEEP_VERSIONS = 2
+
+
+def resolve_model_dir(model_dir):
+    """
+    Diretório da versão em uso do modelo compilado (o próprio `model_dir`
+    se ele foi exportado no formato antigo, sem CURRENT)
+    """
+    current = os.path.join(model_dir, CURRENT_FILE)
+    if not os.path.exists(current):
+        return model_dir
+    with open(current, 'r', encoding='utf-8') as f:
+        return os.path.join(model_dir, f.read().strip())
+
+
+def _publicar(out_dir, arrays, meta):
+    """
+    Grava arrays e meta.json em um subdiretório novo de `out_dir` e só
+    então aponta CURRENT para ele (os.replace), de modo que nenhum leitor
+    veja arquivos pela metade ou misture arrays de duas exportações; os
+    arquivos mapeados por processos abertos não são sobrescritos
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    version = f"v{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+    temp_dir = os.path.join(out_dir, f".{version}.tmp")
+    try:
+        os.makedirs(temp_dir)
+        for name, array in arrays.items():
+            np.save(os.path.join(temp_dir, f"{name}.npy"), np.ascontiguousarray(array))
+        with open(os.path.join(temp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.rename(temp_dir, os.path.join(out_dir, version))
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    temp_current = os.path.join(out_dir, f".{CURRENT_FILE}.tmp")
+    with open(temp_current, 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(temp_current, os.path.join(out_dir, CURRENT_FILE))
+
+    versions = sorted(
+        name for name in os.listdir(out_dir)
+        if name.startswith('v') and name != version and os.path.isdir(os.path.join(out_dir, name))
+    )
+    for old in versions[:max(0, len(versions) - (KEEP_VERSIONS - 1))]:
+        shutil.rmtree(os.path.join(out_dir, old), ignore_errors=True)
+    return version
+
+
+def exportar_modelo(classifier, out_dir):
+    """
+    Achata o RandomForest, o TF-IDF e o scaler de um
+    PiracyDetectionClassifier treinado em arrays NumPy contíguos.
+
+    Todas as árvores são concatenadas em um único conjunto de nós:
+    `feature`, `threshold` e `children` (filho esquerdo/direito, com
+    índices absolutos) descrevem os nós internos; as folhas apontam para
+    si mesmas, de modo que o percurso pode avançar todas as árvores em
+    passo único. `values` guarda as probabilidades de cada folha e
+    `roots` o nó raiz de cada árvore.
+
+    Cada exportação vai para um subdiretório versionado de `out_dir`,
+    apontado pelo arquivo CURRENT (ver _publicar).
+    """
+    model = classifier.model
+    if not hasattr(model, 'estimators_') or not all(hasattr(tree, 'tree_') for tree in model.estimators_):
+        raise ValueError(f"Só ensembles de árvores podem ser compilados (modelo: {classifier.model_name})")
+
+    vectorizer = classifier.vectorizer
+    if vectorizer.ngram_range != (1, 1) or vectorizer.analyzer != 'word' or vectorizer.sublinear_tf \
+            or vectorizer.strip_accents is not None or vectorizer.norm != 'l2':
+        raise ValueError("Configuração de TF-IDF não suportada pelo avaliador compilado")
+
+    features, thresholds, children, values, roots = [], [], [], [], []
+    offset = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        node_ids = np.arange(n_nodes) + offset
+        is_leaf = tree.children_left == -1
+
+        left = np.where(is_leaf, node_ids, tree.children_left + offset)
+        right = np.where(is_leaf, node_ids, tree.children_right + offset)
+        value = tree.value[:, 0, :].astype(np.float64)
+        value = value / value.sum(axis=1, keepdims=True)
+
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold).astype(np.float64))
+        children.append(np.stack([left, right], axis=1).astype(np.int32))
+        values.append(value)
+        roots.append(offset)
+        offset += n_nodes
+
+    scaler = classifier.scaler
+    n_numeric = len(FEATURE_COLUMNS)
+    numeric_mean = getattr(scaler, 'mean_', None)
+    if numeric_mean is None or not getattr(scaler, 'with_mean', True):
+        numeric_mean = np.zeros(n_numeric)
+    numeric_scale = getattr(scaler, 'scale_', None)
+    if numeric_scale is None:
+        numeric_scale = np.ones(n_numeric)
+
+    arrays = {
+        'feature': np.concatenate(features),
+        'threshold': np.concatenate(thresholds),
+        'children': np.concatenate(children),
+        'values': np.concatenate(values),
+        'roots': np.array(roots, dtype=np.int32),
+        'idf': vectorizer.idf_.astype(np.float64),
+        'numeric_mean': np.asarray(numeric_mean, dtype=np.float64),
+        'numeric_scale': np.asarray(numeric_scale, dtype=np.float64)
+    }
+
+    meta = {
+        'format_version': COMPILED_FORMAT_VERSION,
+        'model_name': classifier.model_name,
+        'model_version': classifier.model_version,
+        'classes': [str(c) for c in model.classes_],
+        'n_trees': len(model.estimators_),
+        'max_depth': int(max(tree.tree_.max_depth for tree in model.estimators_)),
+        'vocabulary': {term: int(index) for term, index in vectorizer.vocabulary_.items()},
+        'token_pattern': vectorizer.token_pattern,
+        'lowercase': bool(vectorizer.lowercase),
+        'numeric_features': list(FEATURE_COLUMNS),
+        'catalog_file': classifier.feature_builder.catalog_file,
+        'exported_at': datetime.now().isoformat()
+    }
+    _publicar(out_dir, arrays, meta)
+    return meta
+
+
+class CompiledForest:
+    """
+    Avaliador em lote das árvores exportadas por exportar_modelo.
+
+    Reproduz o RandomForestClassifier do sklearn: a entrada é convertida
+    para float32, cada nó manda a linha para a esquerda quando
+    X[feature] <= threshold, e a probabilidade é a média das
+    probabilidades das folhas alcançadas.
+    """
+
+    def __init__(self, arrays):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.children = arrays['children'].reshape(-1)
+        self.values = arrays['values']
+        self.roots = arrays['roots']
+        self.is_leaf = arrays['children'][:, 0] == np.arange(len(self.feature))
+
+    def apply(self, X):
+        """
+        Índice (absoluto) da folha alcançada em cada árvore: (n_linhas, n_árvores).
+
+        Os pares (linha, árvore) ficam em um vetor plano; a cada passo só os
+        pares que ainda não chegaram a uma folha são avançados.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_columns = X.shape
+        n_trees = len(self.roots)
+        values = X.reshape(-1)
+
+        nodes = np.tile(np.asarray(self.roots, dtype=np.int64), n_rows)
+        row_offsets = np.repeat(np.arange(n_rows, dtype=np.int64) * n_columns, n_trees)
+        active = np.flatnonzero(~self.is_leaf[nodes])
+
+        while active.size:
+            current = nodes[active]
+            go_right = values[row_offsets[active] + self.feature[current]] > self.threshold[current]
+            current = self.children[current * 2 + go_right]
+            nodes[active] = current
+            active = active[~self.is_leaf[current]]
+
+        return nodes.reshape(n_rows, n_trees)
+
+    def predict_proba(self, X):
+        """Média das probabilidades das folhas sobre as árvores"""
+        leaves = self.apply(X)
+        proba = np.zeros((len(leaves), self.values.shape[1]), dtype=np.float64)
+        for tree in range(leaves.shape[1]):
+            proba += self.values[leaves[:, tree]]
+        proba /= leaves.shape[1]
+        return proba
+
+
+class CompiledPiracyModel:
+    """
+    Modelo de detecção compilado: TF-IDF, scaler e floresta avaliados só
+    com NumPy, sem importar o sklearn.
+    """
+
+    def __init__(self, model_dir, mmap_mode='r', block_size=DEFAULT_BLOCK_SIZE):
+        """
+        Carrega a versão em uso do modelo de `model_dir`; com mmap_mode='r'
+        os arrays são mapeados em memória (somente leitura) e compartilhados
+        pelo page cache entre processos que abrirem o mesmo diretório.
+        `self.model_dir` guarda o diretório da versão carregada.
+        """
+        model_dir = resolve_model_dir(model_dir)
+        self.model_dir = model_dir
+        with open(os.path.join(model_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('format_version') != COMPILED_FORMAT_VERSION:
+            raise ValueError(f"Modelo compilado em {model_dir} usa um formato incompatível")
+        if meta['numeric_features'] != list(FEATURE_COLUMNS):
+            raise ValueError(f"Modelo compilado em {model_dir} foi treinado com outras features numéricas")
+
+        self.meta = meta
+        self.model_name = meta['model_name']
+        self.model_version = meta['model_version']
+        self.classes_ = np.array(meta['classes'], dtype=object)
+        self.block_size = block_size
+        self.arrays = {
+            name: np.load(os.path.join(model_dir, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in ARRAY_FILES
+        }
+        self.forest = CompiledForest(self.arrays)
+        self.vocabulary = meta['vocabulary']
+        self.n_terms = len(self.arrays['idf'])
+        self.token_pattern = re.compile(meta['token_pattern'])
+        self.feature_builder = NumericFeatureBuilder(meta.get('catalog_file', DEFAULT_CATALOG_FILE))
+        self.logger = logging.getLogger(__name__)
+
+    def term_ids(self, text):
+        """Índices no vocabulário dos tokens de um texto"""
+        if self.meta['lowercase']:
+            text = text.lower()
+        vocabulary = self.vocabulary
+        return [vocabulary[token] for token in self.token_pattern.findall(text) if token in vocabulary]
+
+    def field_terms(self, values):
+        """
+        Tokeniza cada valor distinto de um campo uma única vez e retorna
+        (linha, termo) de todos os tokens do campo
+        """
+        codes, uniques = pd.factorize(values)
+        ids = [np.array(self.term_ids(value), dtype=np.int64) for value in uniques]
+        unique_lengths = np.array([len(terms) for terms in ids], dtype=np.int64)
+        unique_starts = np.cumsum(unique_lengths) - unique_lengths
+        flat = np.concatenate(ids) if ids else np.empty(0, dtype=np.int64)
+
+        lengths = unique_lengths[codes]
+        rows = np.repeat(np.arange(len(values)), lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return rows, flat[np.repeat(unique_starts[codes], lengths) + offsets]
+
+    def text_features(self, df, out):
+        """
+        Escreve o TF-IDF (norma l2) do texto combinado nas primeiras colunas
+        de `out`.
+
+        Como os campos são unidos por espaço e nenhum token atravessa um
+        espaço, os tokens do texto combinado são os tokens de título,
+        descrição e vendedor; cada valor distinto de campo é tokenizado uma
+        vez só. A norma de cada linha soma os quadrados na ordem das colunas,
+        como o sklearn.
+        """
+        keys = []
+        for column in TEXT_SOURCES:
+            rows, terms = self.field_terms(text_column(df, column, lower=False))
+            keys.append(rows * self.n_terms + terms)
+
+        keys, counts = np.unique(np.concatenate(keys), return_counts=True)
+        rows, cols = np.divmod(keys, self.n_terms)
+        values = counts * self.arrays['idf'][cols]
+        norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=len(df)))
+        values /= norms[rows]
+
+        out[:, :self.n_terms] = 0
+        out[rows, cols] = values
+
+    def transform(self, df):
+        """Matriz de entrada da floresta (float32): TF-IDF seguido das features numéricas"""
+        X = np.empty((len(df), self.n_terms + len(FEATURE_COLUMNS)), dtype=np.float32)
+        self.text_features(df, X)
+
+        # Mesma sequência de operações do StandardScaler: média e escala
+        # convertidas para float32 antes de subtrair e dividir
+        numeric = self.feature_builder.build(df)
+        numeric -= self.arrays['numeric_mean'].astype(numeric.dtype)
+        numeric /= self.arrays['numeric_scale'].astype(numeric.dtype)
+        X[:, self.n_terms:] = numeric
+        return X
+
+    def predict_proba(self, df):
+        """Probabilidades por classe, processando `block_size` linhas por vez"""
+        proba = np.empty((len(df), len(self.classes_)), dtype=np.float64)
+        for start in range(0, len(df), self.block_size):
+            block = df.iloc[start:start + self.block_size]
+            proba[start:start + len(block)] = self.forest.predict_proba(self.transform(block))
+        return proba
+
+    def prever(self, df):
+        """Mesmas colunas de PiracyDetectionClassifier.prever"""
+        probabilities = self.predict_proba(df)
+        best = np.argmax(probabilities, axis=1)
+        df['ai_prediction'] = self.classes_[best]
+        df['ai_confidence'] = probabilities[np.arange(len(best)), best]
+        set_probabilities(df, probabilities, self.classes_)
+        return df
+
+
+def main():
+    """
+    Exporta o modelo salvo para o formato compilado ou pontua um CSV com ele
+    """
+    parser = argparse.ArgumentParser(description="Avaliador NumPy do RandomForest de detecção")
+    parser.add_argument('--exportar', action='store_true', help="Exporta --modelo para --compilado")
+    parser.add_argument('--modelo', default="resultados/modelo_deteccao_pirataria.pkl", help="Artefato do classificador")
+    parser.add_argument('--compilado', default="resultados/modelo_compilado", help="Diretório do modelo compilado")
+    parser.add_argument('--prever-arquivo', nargs=2, metavar=('ENTRADA', 'SAIDA'), help="Pontua um CSV com o modelo compilado")
+    parser.add_argument('--chunksize', type=int, default=50000, help="Linhas por bloco")
+    args = parser.parse_args()
+
+    if args.exportar:
+        # Único ponto que precisa do sklearn: ler o artefato original
+        from classificador_ia import PiracyDetectionClassifier
+        classifier = PiracyDetectionClassifier()
+        classifier.load_model(args.modelo)
+        meta = exportar_modelo(classifier, args.compilado)
+        print(f"Modelo {meta['model_name']} ({meta['n_trees']} árvores) exportado para {args.compilado}")
+
+    if args.prever_arquivo:
+        input_path, output_path = args.prever_arquivo
+        model = CompiledPiracyModel(args.compilado)
+        total = 0
+        for chunk in pd.read_csv(input_path, chunksize=args.chunksize):
+            chunk = model.prever(chunk)
+            chunk.to_csv(output_path, mode='w' if total == 0 else 'a', header=total == 0, index=False, encoding='utf-8')
+            total += len(chunk)
+        print(f"{total} produtos pontuados em {output_path}")
+
+
+if __name__ == "__main__":
+    main()
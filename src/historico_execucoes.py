@@ -0,0 +1,118 @@
+import os
+import glob
+import logging
+import pandas as pd
+from datetime import datetime
+from esquema import PROBABILITY_PREFIX, probability_columns
+
+# Colunas de entrada guardadas em cada execução (as que existirem)
+HISTORY_INPUT_COLUMNS = [
+    'marketplace', 'product_id', 'title', 'url', 'price', 'suggested_price',
+    'catalog_pn', 'catalog_family', 'catalog_match', 'price_ratio', 'price_anomaly', 'cluster_size',
+    'rating', 'review_count', 'seller', 'description', 'search_term', 'scraped_at'
+]
+
+# Colunas de saída do modelo e do risco
+HISTORY_OUTPUT_COLUMNS = ['ai_prediction', 'ai_confidence', 'risk_score', 'risk_level']
+
+# run_id com microssegundos, para que execuções no mesmo segundo (ex.: vários
+# pipelines agendados juntos) não sobrescrevam uma à outra; a ordem
+# alfabética continua sendo a cronológica
+RUN_ID_FORMAT = '%Y%m%d_%H%M%S_%f'
+
+# Formato dos run_ids gravados antes, com resolução de segundos
+LEGACY_RUN_ID_FORMAT = '%Y%m%d_%H%M%S'
+
+
+def run_timestamp(run_id):
+    """Data/hora de um run_id (None se o id não seguir nenhum dos formatos)"""
+    for run_id_format in (RUN_ID_FORMAT, LEGACY_RUN_ID_FORMAT):
+        try:
+            return pd.Timestamp(datetime.strptime(run_id, run_id_format))
+        except ValueError:
+            continue
+    return None
+
+
+class RunHistory:
+    """
+    Histórico das execuções do pipeline.
+
+    Cada execução é gravada em um Parquet próprio com as entradas dos
+    produtos, as probabilidades brutas por classe (prob_<CLASSE>) e o
+    risco calculado, para que o risco possa ser recalculado depois com
+    outros parâmetros sem repetir o scraping nem a predição.
+    """
+
+    def __init__(self, history_dir="resultados/historico"):
+        self.history_dir = history_dir
+        self.logger = logging.getLogger(__name__)
+
+    def run_path(self, run_id):
+        return os.path.join(self.history_dir, f"run_{run_id}.parquet")
+
+    def save_run(self, df, classes, model_version=None, run_at=None):
+        """
+        Grava uma execução; retorna o run_id.
+
+        `classes` são as classes_ do modelo: as colunas prob_<CLASSE> de
+        `df` são gravadas nessa ordem.
+        """
+        run_at = run_at or datetime.now()
+        run_id = run_at.strftime(RUN_ID_FORMAT)
+        if os.path.exists(self.run_path(run_id)):
+            raise FileExistsError(f"Execução {run_id} já existe em {self.history_dir}")
+
+        probabilities = [f"{PROBABILITY_PREFIX}{label}" for label in classes]
+        columns = HISTORY_INPUT_COLUMNS + HISTORY_OUTPUT_COLUMNS + probabilities
+        record = df[[column for column in columns if column in df.columns]].copy()
+        record.insert(0, 'run_id', run_id)
+        record.insert(1, 'run_at', pd.Timestamp(run_at))
+        record['model_version'] = model_version
+
+        os.makedirs(self.history_dir, exist_ok=True)
+        record.to_parquet(self.run_path(run_id), index=False)
+        self.logger.info(f"Execução {run_id} gravada no histórico ({len(record)} produtos)")
+        return run_id
+
+    def list_runs(self):
+        """run_ids gravados, do mais antigo ao mais recente"""
+        paths = glob.glob(os.path.join(self.history_dir, 'run_*.parquet'))
+        return sorted(os.path.basename(path)[len('run_'):-len('.parquet')] for path in paths)
+
+    def select_runs(self, run_ids=None, since=None, until=None):
+        """
+        Filtra execuções por id e/ou intervalo de datas (inclusive); sem
+        filtros, retorna só a execução mais recente
+        """
+        runs = self.list_runs()
+        if run_ids:
+            missing = set(run_ids) - set(runs)
+            if missing:
+                raise ValueError(f"Execuções não encontradas: {sorted(missing)}")
+            runs = [run for run in runs if run in run_ids]
+        if since is not None or until is not None:
+            since = pd.Timestamp(since) if since is not None else pd.Timestamp.min
+            until = pd.Timestamp(until) if until is not None else pd.Timestamp.max
+            # Data sem hora em `until` inclui o dia inteiro
+            if until.normalize() == until:
+                until = until + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+            timestamps = {run: run_timestamp(run) for run in runs}
+            runs = [
+                run for run in runs
+                if timestamps[run] is not None and since <= timestamps[run] <= until
+            ]
+        elif not run_ids:
+            runs = runs[-1:]
+        return runs
+
+    def load(self, run_ids=None, since=None, until=None):
+        """Carrega as execuções selecionadas em um único DataFrame"""
+        runs = self.select_runs(run_ids, since, until)
+        if not runs:
+            return pd.DataFrame()
+        return pd.concat([pd.read_parquet(self.run_path(run)) for run in runs], ignore_index=True)
+
+    def probability_columns(self, df):
+        """Colunas prob_<CLASSE> presentes em `df`"""
+        return probability_columns(df)
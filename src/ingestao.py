@@ -0,0 +1,271 @@
+import os
+import re
+import json
+import hashlib
+import argparse
+import logging
+import pandas as pd
+
+# Tipos das colunas de cada base. O CSV é lido todo como texto e cada
+# coluna é convertida aqui, em vez de depender da inferência do pandas:
+# - 'str', 'int64', 'float64', 'datetime': conversões diretas
+# - 'milhar': inteiro com separador de milhar ("1,906" -> 1906, "1 avaliação" -> 1)
+# - 'decimal_br': número com vírgula decimal e unidade ("8,5 mL" -> 8.5)
+# - 'preco_br': preço no formato brasileiro ("1.234,9" -> 1234.9, "1.234" -> 1234; ver parse_price)
+BASE_DADOS_SCHEMA = {
+    'id': 'int64',
+    'products_url_id': 'int64',
+    'url': 'str',
+    'title': 'str',
+    'price': 'float64',
+    'review_rating': 'float64',
+    'review_amount': 'milhar',
+    'seller': 'str',
+    'description': 'str',
+    'brand': 'str',
+    'product_line': 'str',
+    'model': 'str',
+    'sales_format': 'str',
+    'volume_total': 'decimal_br',
+    'page_yield': 'float64',
+    'cartridge_type': 'str',
+    'comments_scraped': 'int64',
+    'data_cadastro': 'datetime'
+}
+
+CATALOGO_SCHEMA = {
+    'PN': 'str',
+    'Familia': 'str',
+    'Produto': 'str',
+    'Média de Páginas Impressas': 'str',  # "4000 /8000 / 8000 / 8000" em kits
+    'Preço Sugerido': 'preco_br'
+}
+
+# Esquema de cada base, pelo nome do arquivo sem extensão
+DATASETS = {
+    'base_dados': BASE_DADOS_SCHEMA,
+    'catalogo': CATALOGO_SCHEMA
+}
+
+DEFAULT_CACHE_DIR = 'data/cache'
+
+# Número com pontos separando grupos de 3 dígitos ("1.234", "12.345.678")
+_THOUSANDS = re.compile(r'[-+]?\d{1,3}(?:\.\d{3})+')
+
+# Versão das conversões de _converter; mudar a conversão de um tipo exige
+# incrementar para invalidar os caches já gravados
+INGEST_VERSION = 2
+
+
+def parse_price(value):
+    """
+    Preço em float (None se ausente/inválido). Texto segue o formato
+    brasileiro: com vírgula, os pontos são de milhar e a vírgula é o
+    decimal ("1.234,9" -> 1234.9); sem vírgula, pontos entre grupos de 3
+    dígitos também são de milhar ("1.234" -> 1234) e um ponto seguido de
+    1 ou 2 dígitos é decimal ("79.9", como gravado pelo pandas)
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        text = value.replace('R$', '').strip()
+        if ',' in text or _THOUSANDS.fullmatch(text):
+            text = text.replace('.', '').replace(',', '.')
+        try:
+            number = float(text)
+        except ValueError:
+            return None
+    else:
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return None
+    return None if number != number else number
+
+
+def _converter(values, kind):
+    """Converte uma coluna lida como texto para o tipo do esquema"""
+    if kind == 'str':
+        return values
+    if kind == 'datetime':
+        return pd.to_datetime(values, errors='coerce')
+    if kind == 'milhar':
+        digits = values.str.extract(r'(\d[\d.,]*)', expand=False).str.replace(r'[.,]', '', regex=True)
+        return pd.to_numeric(digits, errors='coerce').astype('Int64')
+    if kind == 'decimal_br':
+        number = values.str.extract(r'(\d+(?:,\d+)?)', expand=False).str.replace(',', '.', regex=False)
+        return pd.to_numeric(number, errors='coerce')
+    if kind == 'preco_br':
+        return pd.to_numeric(values.map(parse_price, na_action='ignore'), errors='coerce').astype('float64')
+    if kind == 'int64':
+        numbers = pd.to_numeric(values, errors='coerce')
+        return numbers.astype('int64') if numbers.notna().all() else numbers.astype('Int64')
+    if kind == 'float64':
+        return pd.to_numeric(values, errors='coerce').astype('float64')
+    raise ValueError(f"Tipo desconhecido no esquema: {kind}")
+
+
+def aplicar_esquema(df, schema):
+    """Converte as colunas de `df` (lidas como texto) conforme o esquema"""
+    for column, kind in schema.items():
+        if column in df.columns:
+            df[column] = _converter(df[column], kind)
+    return df
+
+
+def ler_csv(path, schema, **kwargs):
+    """Lê o CSV todo como texto e aplica o esquema"""
+    return aplicar_esquema(pd.read_csv(path, dtype=str, keep_default_na=True, **kwargs), schema)
+
+
+def schema_for(path):
+    """Esquema da base pelo nome do arquivo (None se não for uma base conhecida)"""
+    return DATASETS.get(os.path.splitext(os.path.basename(path))[0])
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _schema_version(schema):
+    payload = json.dumps({'ingest_version': INGEST_VERSION, 'schema': schema}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class IngestCache:
+    """
+    Cache colunar (Parquet) das bases em CSV.
+
+    Cada CSV é convertido uma vez, com o esquema explícito, e gravado em
+    `cache_dir`; as leituras seguintes carregam o Parquet. Ao lado fica um
+    JSON com mtime, tamanho e hash SHA-256 do CSV e a versão do esquema: se
+    mtime e tamanho não mudaram, o cache vale sem reler o CSV; se mudaram,
+    o hash decide (um `touch` sem mudança de conteúdo não reconverte).
+    Mudar o esquema invalida o cache.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.logger = logging.getLogger(__name__)
+
+    def paths(self, source):
+        name = os.path.splitext(os.path.basename(source))[0]
+        return os.path.join(self.cache_dir, f"{name}.parquet"), os.path.join(self.cache_dir, f"{name}.json")
+
+    def is_valid(self, source, schema):
+        """Indica se o cache de `source` está atualizado (e renova o mtime se só ele mudou)"""
+        parquet_path, meta_path = self.paths(source)
+        if not (os.path.exists(parquet_path) and os.path.exists(meta_path)):
+            return False
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('source') != os.path.abspath(source) or meta.get('schema_version') != _schema_version(schema):
+            return False
+
+        stat = os.stat(source)
+        if meta.get('mtime') == stat.st_mtime and meta.get('size') == stat.st_size:
+            return True
+        if meta.get('size') == stat.st_size and meta.get('sha256') == _file_hash(source):
+            self.write_meta(source, schema, meta['sha256'])
+            return True
+        return False
+
+    def write_meta(self, source, schema, sha256=None):
+        stat = os.stat(source)
+        meta = {
+            'source': os.path.abspath(source),
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'sha256': sha256 or _file_hash(source),
+            'schema_version': _schema_version(schema)
+        }
+        _, meta_path = self.paths(source)
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+
+    def load(self, source, schema):
+        """DataFrame tipado de `source`, do cache quando válido"""
+        parquet_path, _ = self.paths(source)
+        try:
+            if self.is_valid(source, schema):
+                return pd.read_parquet(parquet_path)
+        except (OSError, ValueError, ImportError) as e:
+            self.logger.warning(f"Cache de {source} ilegível, relendo o CSV: {e}")
+
+        df = ler_csv(source, schema)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            df.to_parquet(parquet_path, index=False)
+            self.write_meta(source, schema)
+            self.logger.info(f"{source} convertido para {parquet_path} ({len(df)} registros)")
+        except (OSError, ValueError, ImportError) as e:
+            self.logger.warning(f"Não foi possível gravar o cache de {source}: {e}")
+        return df
+
+    def iter_chunks(self, source, schema, chunksize):
+        """Blocos de até `chunksize` linhas do cache (criado se necessário)"""
+        import pyarrow.parquet as pq
+
+        parquet_path, _ = self.paths(source)
+        if not self.is_valid(source, schema):
+            df = self.load(source, schema)
+            if not self.is_valid(source, schema):
+                # Cache não pôde ser gravado: divide o DataFrame já lido
+                for start in range(0, len(df), chunksize):
+                    yield df.iloc[start:start + chunksize]
+                return
+        for batch in pq.ParquetFile(parquet_path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+
+
+def carregar_base_dados(path='data/base_dados.csv', cache_dir=DEFAULT_CACHE_DIR):
+    """Base de anúncios rotulados (base_dados.csv) com os tipos de BASE_DADOS_SCHEMA"""
+    return IngestCache(cache_dir).load(path, BASE_DADOS_SCHEMA)
+
+
+def carregar_catalogo(path='data/catalogo.csv', cache_dir=DEFAULT_CACHE_DIR):
+    """Catálogo oficial (catalogo.csv) com os tipos de CATALOGO_SCHEMA"""
+    return IngestCache(cache_dir).load(path, CATALOGO_SCHEMA)
+
+
+def ler_em_blocos(path, chunksize=50000, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Blocos de um CSV: bases conhecidas vêm tipadas do cache; outros
+    arquivos são lidos em blocos pelo pandas
+    """
+    schema = schema_for(path)
+    if schema is not None:
+        try:
+            yield from IngestCache(cache_dir).iter_chunks(path, schema, chunksize)
+            return
+        except ImportError:
+            pass
+    yield from pd.read_csv(path, chunksize=chunksize)
+
+
+def main():
+    """Converte as bases para o cache colunar e mostra os tipos"""
+    parser = argparse.ArgumentParser(description="Cache colunar tipado das bases em CSV")
+    parser.add_argument('arquivos', nargs='*', default=['data/base_dados.csv', 'data/catalogo.csv'],
+                        help="CSVs a converter (padrão: base_dados.csv e catalogo.csv)")
+    parser.add_argument('--cache', default=DEFAULT_CACHE_DIR, help="Diretório do cache")
+    args = parser.parse_args()
+
+    cache = IngestCache(args.cache)
+    for path in args.arquivos:
+        schema = schema_for(path)
+        if schema is None:
+            print(f"{path}: sem esquema conhecido (bases: {', '.join(DATASETS)})")
+            continue
+        valid = cache.is_valid(path, schema)
+        df = cache.load(path, schema)
+        print(f"\n{path}: {len(df)} registros ({'cache válido' if valid else 'convertido'})")
+        print(df.dtypes.to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+import time
+import re
+import logging
+from datetime import datetime
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from scraper_base import MarketplaceScraper
+
+class MercadoLivreScraper(MarketplaceScraper):
+    marketplace = 'mercadolivre'
+
+    def __init__(self, headless=True, debug=False):
+        """
+        Inicializa o scraper do Mercado Livre
+        """
+        super().__init__(headless=headless, debug=debug)
+
+    def setup_logging(self):
+        """Configura o sistema de logging"""
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(levelname)s - %(message)s',
+            handlers=[
+                logging.FileHandler('logs/mercadolivre_scraper.log'),
+                logging.StreamHandler()
+            ]
+        )
+        self.logger = logging.getLogger(__name__)
+
+    def build_search_url(self, search_term):
+        """Monta a URL de busca do Mercado Livre para um termo"""
+        slug = re.sub(r'\s+', '-', search_term.strip().lower())
+        return f"https://lista.mercadolivre.com.br/{slug}"
+
+    def iter_listing(self, search_term, max_pages=3):
+        """
+        Itera sobre os produtos da listagem de busca do Mercado Livre
+        """
+        search_url = self.build_search_url(search_term)
+        self.logger.info(f"Iniciando scraping da listagem: {search_url}")
+
+        try:
+            self.driver.get(search_url)
+            WebDriverWait(self.driver, 10).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "li.ui-search-layout__item"))
+            )
+        except TimeoutException:
+            self.logger.warning("Nenhum resultado encontrado na listagem")
+            return
+
+        for page in range(max_pages):
+            self.logger.info(f"Processando página {page + 1}")
+            time.sleep(1)
+
+            for element in self.driver.find_elements(By.CSS_SELECTOR, "li.ui-search-layout__item"):
+                try:
+                    product_data = self.extract_basic_product_info(element)
+                    if product_data:
+                        yield product_data
+                except Exception as e:
+                    self.logger.warning(f"Erro ao extrair produto: {e}")
+                    continue
+
+            if page < max_pages - 1:
+                try:
+                    next_button = self.driver.find_element(By.CSS_SELECTOR, "li.andes-pagination__button--next a")
+                    self.driver.get(next_button.get_attribute("href"))
+                    time.sleep(2)
+                except NoSuchElementException:
+                    self.logger.info("Não há mais páginas disponíveis")
+                    break
+
+    def extract_basic_product_info(self, element):
+        """
+        Extrai informações básicas do produto na listagem
+        """
+        title = self.extract_title(element)
+        if not title:
+            return None
+
+        product_url = self.extract_product_url(element)
+
+        return {
+            'product_id': self.extract_product_id(product_url),
+            'title': title,
+            'url': product_url,
+            'price': self.extract_price(element),
+            'rating': self.extract_rating(element),
+            'review_count': self.extract_review_count(element),
+            'seller': self.extract_seller_from_listing(element),
+            'scraped_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+    def extract_product_id(self, url):
+        """Extrai o identificador MLB da URL do produto"""
+        if not url:
+            return None
+        match = re.search(r'MLB-?(\d+)', url)
+        return f"MLB{match.group(1)}" if match else None
+
+    def extract_title(self, element):
+        """Extrai o título do produto"""
+        title_selectors = [
+            "a.poly-component__title",
+            ".poly-component__title-wrapper a",
+            "h2.ui-search-item__title",
+            "h3"
+        ]
+
+        for selector in title_selectors:
+            try:
+                title = element.find_element(By.CSS_SELECTOR, selector).text.strip()
+                if title and len(title) > 3:
+                    return title
+            except NoSuchElementException:
+                continue
+
+        return None
+
+    def extract_product_url(self, element):
+        """Extrai a URL do produto"""
+        url_selectors = [
+            "a.poly-component__title",
+            ".poly-component__title-wrapper a",
+            "a.ui-search-link"
+        ]
+
+        for selector in url_selectors:
+            try:
+                url = element.find_element(By.CSS_SELECTOR, selector).get_attribute("href")
+                if url:
+                    return url
+            except NoSuchElementException:
+                continue
+
+        return None
+
+    def extract_price(self, element):
+        """Extrai o preço do produto"""
+        price_selectors = [
+            ".poly-price__current .andes-money-amount",
+            ".ui-search-price__second-line .andes-money-amount"
+        ]
+
+        for selector in price_selectors:
+            try:
+                price_element = element.find_element(By.CSS_SELECTOR, selector)
+                fraction = price_element.find_element(By.CSS_SELECTOR, ".andes-money-amount__fraction").text
+                fraction = fraction.replace(".", "").strip()
+                try:
+                    cents = price_element.find_element(By.CSS_SELECTOR, ".andes-money-amount__cents").text.strip()
+                except NoSuchElementException:
+                    cents = "0"
+                if fraction.isdigit():
+                    return float(f"{fraction}.{cents or '0'}")
+            except (NoSuchElementException, ValueError):
+                continue
+
+        return None
+
+    def extract_rating(self, element):
+        """Extrai a avaliação do produto"""
+        try:
+            rating_text = element.find_element(By.CSS_SELECTOR, ".poly-reviews__rating").text
+            return float(rating_text.replace(",", "."))
+        except (NoSuchElementException, ValueError):
+            return None
+
+    def extract_review_count(self, element):
+        """Extrai o número de avaliações"""
+        try:
+            review_text = element.find_element(By.CSS_SELECTOR, ".poly-reviews__total").text
+            review_text = re.sub(r'\D', '', review_text)
+            if review_text:
+                return int(review_text)
+        except (NoSuchElementException, ValueError):
+            pass
+
+        return None
+
+    def extract_seller_from_listing(self, element):
+        """Extrai o vendedor da listagem (básico)"""
+        try:
+            seller_text = element.find_element(By.CSS_SELECTOR, ".poly-component__seller").text
+            seller_name = re.sub(r'^\s*Por\s+', '', seller_text, flags=re.IGNORECASE).strip()
+            if self.is_valid_seller_name(seller_name):
+                return seller_name
+        except NoSuchElementException:
+            pass
+
+        return ""
+
+    def fetch_details(self, product):
+        """
+        Acessa a página individual do produto para extrair mais detalhes
+        """
+        product_url = product['url']
+        self.logger.info(f"Acessando página do produto: {product_url}")
+
+        try:
+            original_window = self.driver.current_window_handle
+            self.driver.execute_script("window.open('');")
+            self.driver.switch_to.window(self.driver.window_handles[-1])
+
+            try:
+                self.driver.get(product_url)
+                time.sleep(2)
+
+                return {
+                    'seller_detailed': self.extract_detailed_seller(),
+                    'price_detailed': self.extract_detailed_price(),
+                    'description': self.extract_description(),
+                    'specifications': self.extract_specifications(),
+                    'availability': self.extract_availability(),
+                    'shipping_info': self.extract_shipping_info()
+                }
+
+            finally:
+                self.driver.close()
+                self.driver.switch_to.window(original_window)
+
+        except Exception as e:
+            self.logger.error(f"Erro ao acessar página do produto: {e}")
+            return {}
+
+    def _first_text(self, selectors):
+        """Retorna o texto do primeiro seletor encontrado na página"""
+        for selector in selectors:
+            try:
+                text = self.driver.find_element(By.CSS_SELECTOR, selector).text.strip()
+                if text:
+                    return text
+            except NoSuchElementException:
+                continue
+        return None
+
+    def extract_detailed_seller(self):
+        """Extrai o vendedor da página individual"""
+        seller_text = self._first_text([
+            ".ui-pdp-seller__link-trigger",
+            ".ui-pdp-seller__header__title",
+            ".ui-seller-data-header__title"
+        ])
+        if seller_text:
+            seller_text = re.sub(r'^\s*Vendido por\s+', '', seller_text, flags=re.IGNORECASE).strip()
+            if self.is_valid_seller_name(seller_text):
+                return seller_text
+
+        try:
+            page_text = self.driver.find_element(By.TAG_NAME, "body").text
+            match = re.search(r'Vendido por\s+([^\n\r]+)', page_text, re.IGNORECASE)
+            if match and self.is_valid_seller_name(match.group(1).strip()):
+                return match.group(1).strip()
+        except NoSuchElementException:
+            pass
+
+        return ""
+
+    def extract_detailed_price(self):
+        """Extrai o preço da página individual"""
+        try:
+            price = self.driver.find_element(By.CSS_SELECTOR, "meta[itemprop='price']").get_attribute("content")
+            return float(price)
+        except (NoSuchElementException, TypeError, ValueError):
+            pass
+
+        fraction = self._first_text([".ui-pdp-price__second-line .andes-money-amount__fraction"])
+        if fraction and fraction.replace(".", "").isdigit():
+            return float(fraction.replace(".", ""))
+
+        return None
+
+    def extract_description(self):
+        """Extrai a descrição do produto"""
+        return self._first_text([
+            ".ui-pdp-description__content",
+            ".ui-pdp-features"
+        ])
+
+    def extract_specifications(self):
+        """Extrai especificações do produto"""
+        specs = {}
+        for row in self.driver.find_elements(By.CSS_SELECTOR, ".andes-table tr"):
+            try:
+                key = row.find_element(By.TAG_NAME, "th").text.strip()
+                value = row.find_element(By.TAG_NAME, "td").text.strip()
+                if key and value:
+                    specs[key] = value
+            except NoSuchElementException:
+                continue
+        return specs
+
+    def extract_availability(self):
+        """Extrai informações de disponibilidade"""
+        return self._first_text([
+            ".ui-pdp-buybox__quantity__available",
+            ".ui-pdp-stock-information__title"
+        ])
+
+    def extract_shipping_info(self):
+        """Extrai informações de frete"""
+        return self._first_text([
+            ".ui-pdp-media__title",
+            ".ui-pdp-shipping"
+        ])
+
+def main():
+    """Função principal para testar o scraper"""
+    scraper = MercadoLivreScraper(headless=False, debug=True)
+
+    try:
+        products = scraper.collect("cartucho hp 667", max_pages=1)
+
+        print(f"\n=== RESULTADOS DO SCRAPING ===")
+        print(f"Total de produtos: {len(products)}")
+
+        for i, product in enumerate(products[:5]):
+            print(f"\n--- Produto {i+1} ---")
+            print(f"Título: {product.title or 'N/A'}")
+            print(f"Preço: R$ {product.price if product.price is not None else 'N/A'}")
+            print(f"Vendedor: {product.seller or 'N/A'}")
+            print(f"URL: {product.url or 'N/A'}")
+
+    except Exception as e:
+        print(f"Erro durante o scraping: {e}")
+
+    finally:
+        scraper.close()
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,33 @@ from datetime import datetime
 import logging
 import os
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from amazon_webscraping import AmazonScraperV2
-from classificador_ia import PiracyDetectionClassifier
+from mercadolivre_webscraping import MercadoLivreScraper
+from produto import com_vendedor, records_to_frame
+from classificador_ia import PiracyDetectionClassifier, DEFAULT_MODEL
+from classificador_incremental import IncrementalPiracyDetectionClassifier
+from cache_predicoes import PredictionCache
+from floresta_numpy import exportar_modelo
+from execucao_paralela import ParallelScorer
+from risco import RiskAnalyzer, DEFAULT_RISK_RULES
+from historico_execucoes import RunHistory
+from catalogo import load_catalog_index
+from deduplicacao import NearDuplicateDetector, propagar_predicoes
+from anomalias_preco import PriceAnomalyDetector
+from armazenamento import ProductStore
+from ingestao import carregar_base_dados
+from esquema import compactar, uso_memoria
 import warnings
 warnings.filterwarnings('ignore')
 
+# Backends de scraping disponíveis, por nome usado em config.json
+MARKETPLACE_BACKENDS = {
+    'amazon': AmazonScraperV2,
+    'mercadolivre': MercadoLivreScraper
+}
+
 class IntegratedPiracyDetectionPipeline:
     def __init__(self, config_file="config.json"):
         """
@@ -16,8 +38,11 @@ class IntegratedPiracyDetectionPipeline:
         """
         self.setup_logging()
         self.load_config(config_file)
-        self.scraper = None
+        self.scrapers = []
+        self._scrapers_lock = threading.Lock()
+        self._thread_local = threading.local()
         self.classifier = None
+        self.parallel_scorer = None
         self.setup_components()
         
     def setup_logging(self):
@@ -43,19 +68,46 @@ class IntegratedPiracyDetectionPipeline:
                     "cartucho HP 662"
                 ],
                 "max_pages": 2,
-                "headless": True
+                "headless": True,
+                "marketplaces": ["amazon", "mercadolivre"],
+                "max_workers": 4
             },
             "ai": {
                 "model_file": "resultados/modelo_deteccao_pirataria.pkl",
+                "model": "random_forest_100",
+                "mode": "batch",
+                "incremental_model_file": "resultados/modelo_incremental.pkl",
+                "cache_file": "resultados/cache_predicoes.sqlite",
+                "compiled_model_dir": "resultados/modelo_compilado",
+                "parallel_workers": 0,
                 "confidence_threshold": 0.7
             },
+            "deduplication": {
+                "enabled": True,
+                "threshold": 0.8,
+                "num_perm": 64,
+                "bands": 16,
+                "price_tolerance": 0.1
+            },
+            "catalog": {
+                "file": "data/catalogo.csv"
+            },
+            "price_anomaly": {
+                "low_factor": 0.8,
+                "high_factor": 1.3,
+                "z_threshold": 3.5,
+                "min_group_size": 5
+            },
             "risk_analysis": {
                 "high_risk_threshold": 4,
-                "medium_risk_threshold": 2
+                "medium_risk_threshold": 2,
+                "rules": DEFAULT_RISK_RULES
             },
             "output": {
                 "results_file": "resultados/resultados_deteccao_pirataria.csv",
-                "report_file": "resultados/relatorio_pirataria.html"
+                "report_file": "resultados/relatorio_pirataria.html",
+                "history_dir": "resultados/historico",
+                "store_file": "resultados/produtos.sqlite"
             }
         }
         
@@ -72,19 +124,37 @@ class IntegratedPiracyDetectionPipeline:
     def setup_components(self):
         """Configura os componentes do pipeline"""
         try:
-            # Inicializar scraper
-            self.scraper = AmazonScraperV2(
-                headless=self.config['scraping']['headless'],
-                debug=True
+            # Validar marketplaces (os scrapers são criados sob demanda por worker)
+            for marketplace in self.get_marketplaces():
+                if marketplace not in MARKETPLACE_BACKENDS:
+                    raise ValueError(f"Marketplace desconhecido: {marketplace}")
+            
+            # Cache de predições (anúncios repetidos não passam de novo pelo modelo).
+            # No modo incremental cada execução gera uma nova versão do modelo,
+            # então nenhuma predição guardada seria reaproveitada
+            cache_file = self.config['ai'].get('cache_file')
+            self.prediction_cache = PredictionCache(cache_file) if cache_file and not self.is_incremental() else None
+            if cache_file and self.is_incremental():
+                self.logger.info("Modo incremental: cache de predições desativado")
+            
+            # Agrupamento de anúncios quase idênticos (detalhes e predição só do representante)
+            dedup_config = self.config.get('deduplication', {})
+            self.duplicate_detector = (
+                NearDuplicateDetector.from_config(self.config) if dedup_config.get('enabled', False) else None
             )
             
             # Inicializar classificador
-            self.classifier = PiracyDetectionClassifier()
+            self.classifier = self.create_classifier()
+            model_file = self.get_model_file()
             
             # Tentar carregar modelo existente
-            if os.path.exists(self.config['ai']['model_file']):
-                self.classifier.load_model(self.config['ai']['model_file'])
-                self.logger.info("Modelo de IA carregado com sucesso")
+            if os.path.exists(model_file):
+                try:
+                    self.classifier.load_model(model_file)
+                    self.logger.info("Modelo de IA carregado com sucesso")
+                except ValueError as e:
+                    self.classifier = self.create_classifier()
+                    self.logger.warning(f"{e}; o modelo será treinado com dados existentes")
             else:
                 self.logger.info("Modelo de IA não encontrado, será treinado com dados existentes")
             
@@ -117,11 +187,17 @@ class IntegratedPiracyDetectionPipeline:
             # Etapa 4: Análise com IA
             analyzed_products = self.analyze_products_with_ai(new_products)
             
+            # Etapa 4.1: Modo incremental - incorporar os produtos novos ao modelo
+            if self.is_incremental():
+                self.update_incremental_model(analyzed_products)
+            
             # Etapa 5: Análise de risco
             risk_analyzed_products = self.analisar_niveis_risco(analyzed_products)
             
-            # Etapa 6: Salvar resultados
+            # Etapa 6: Salvar resultados (CSV, histórico e base SQLite)
             self.save_results(risk_analyzed_products)
+            run_id = self.save_run_history(risk_analyzed_products)
+            self.save_to_store(risk_analyzed_products, run_id)
             
             # Etapa 7: Gerar relatório
             self.generate_report(risk_analyzed_products)
@@ -146,9 +222,9 @@ class IntegratedPiracyDetectionPipeline:
             dataset_path = default_path if os.path.exists(default_path) else alt_path
 
             if os.path.exists(dataset_path):
-                df = pd.read_csv(dataset_path)
+                df = carregar_base_dados(dataset_path)
                 self.logger.info(f"Dados existentes carregados: {len(df)} registros")
-                return df
+                return self.apply_schema(df, "ingestão")
             else:
                 self.logger.warning("Arquivo base_dados.csv não encontrado")
                 return pd.DataFrame()
@@ -160,40 +236,187 @@ class IntegratedPiracyDetectionPipeline:
         """Treina o modelo com dados existentes"""
         if len(existing_data) > 0:
             self.logger.info("Treinando modelo com dados existentes...")
+            existing_data = self.attach_catalog(existing_data)
             accuracy = self.classifier.treinar_modelo(existing_data)
             # Garantir diretório antes de salvar
-            model_path = self.config['ai']['model_file']
+            model_path = self.get_model_file()
             os.makedirs(os.path.dirname(model_path), exist_ok=True)
             self.classifier.save_model(model_path)
+            self.export_compiled_model()
             self.logger.info(f"Modelo treinado com acurácia: {accuracy:.3f}")
         else:
             self.logger.warning("Sem dados para treinamento")
     
+    def attach_catalog(self, df):
+        """Acrescenta o preço sugerido do catálogo oficial (catalog.file) e price_ratio"""
+        catalog_file = self.config.get('catalog', {}).get('file', 'data/catalogo.csv')
+        if not os.path.exists(catalog_file):
+            self.logger.warning(f"Catálogo {catalog_file} não encontrado, produtos sem preço sugerido")
+            return df
+        return load_catalog_index(catalog_file).attach(df)
+    
+    def detect_price_anomalies(self, df):
+        """Marca preços anômalos por família do catálogo (seção price_anomaly)"""
+        catalog_file = self.config.get('catalog', {}).get('file', 'data/catalogo.csv')
+        if not os.path.exists(catalog_file):
+            return df
+        detector = PriceAnomalyDetector.from_config(self.config)
+        return detector.detect(df, load_catalog_index(catalog_file))
+    
+    def apply_schema(self, df, stage):
+        """Aplica o esquema compacto (esquema.py) ao fim de uma etapa e registra a memória"""
+        before = uso_memoria(df).sum()
+        df = compactar(df)
+        after = uso_memoria(df).sum()
+        self.logger.info(f"Esquema compacto após {stage}: {before / 1e6:.2f} MB -> {after / 1e6:.2f} MB")
+        return df
+    
+    def export_compiled_model(self):
+        """Exporta o RandomForest para o avaliador NumPy (ai.compiled_model_dir), se configurado"""
+        compiled_dir = self.config['ai'].get('compiled_model_dir')
+        if not compiled_dir or self.is_incremental():
+            return
+        try:
+            exportar_modelo(self.classifier, compiled_dir)
+            self.logger.info(f"Modelo compilado exportado para {compiled_dir}")
+        except ValueError as e:
+            self.logger.info(f"Modelo compilado não exportado: {e}")
+    
+    def setup_parallel_scorer(self):
+        """
+        Pontua com ParallelScorer (ai.parallel_workers > 1 processos) sobre o
+        modelo compilado, se ele for da mesma versão do classificador; senão
+        a predição continua no processo atual
+        """
+        workers = self.config['ai'].get('parallel_workers') or 0
+        compiled_dir = self.config['ai'].get('compiled_model_dir')
+        if workers <= 1 or not compiled_dir or self.is_incremental() or not self.classifier.is_trained:
+            return
+        if self.parallel_scorer is None:
+            try:
+                self.parallel_scorer = ParallelScorer(compiled_dir, n_workers=workers)
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"Predição paralela desativada, modelo compilado indisponível: {e}")
+                return
+        
+        scorer = self.parallel_scorer
+        if scorer.model.model_version != self.classifier.model_version \
+                or list(scorer.classes_) != [str(c) for c in self.classifier.model.classes_]:
+            self.logger.warning(
+                f"Modelo compilado (versão {scorer.model.model_version}) difere do classificador "
+                f"(versão {self.classifier.model_version}); predição no processo atual"
+            )
+            self.close_parallel_scorer()
+            return
+        self.classifier.scorer = scorer
+        self.logger.info(f"Predição paralela com {scorer.n_workers} workers ({scorer.model_dir})")
+    
+    def close_parallel_scorer(self):
+        """Encerra os workers da predição paralela"""
+        if self.parallel_scorer is not None:
+            self.parallel_scorer.close()
+            self.parallel_scorer = None
+        if self.classifier is not None:
+            self.classifier.scorer = None
+    
+    def update_incremental_model(self, df):
+        """Atualiza o modelo incremental com os produtos novos e o salva"""
+        if len(df) == 0:
+            return
+        self.classifier.atualizar_modelo(df)
+        model_path = self.get_model_file()
+        os.makedirs(os.path.dirname(model_path), exist_ok=True)
+        self.classifier.save_model(model_path)
+    
+    def is_incremental(self):
+        """Indica se o pipeline usa o modo de aprendizado incremental"""
+        return self.config['ai'].get('mode', 'batch') == 'incremental'
+    
+    def get_model_file(self):
+        """Arquivo do modelo de acordo com o modo (lote ou incremental)"""
+        if self.is_incremental():
+            return self.config['ai'].get('incremental_model_file', 'resultados/modelo_incremental.pkl')
+        return self.config['ai']['model_file']
+    
+    def create_classifier(self):
+        """Cria o classificador do modo configurado"""
+        if self.is_incremental():
+            classifier = IncrementalPiracyDetectionClassifier()
+        else:
+            classifier = PiracyDetectionClassifier(model_name=self.get_model_name())
+        classifier.cache = self.prediction_cache
+        # Catálogo do price_ratio fora do pipeline (gravado junto com o modelo)
+        classifier.feature_builder.catalog_file = self.config.get('catalog', {}).get('file', 'data/catalogo.csv')
+        classifier.risk_analyzer = RiskAnalyzer.from_config(self.config)
+        return classifier
+    
+    def get_model_name(self):
+        """Modelo configurado (ver comparar_modelos.py para escolher)"""
+        return self.config['ai'].get('model', DEFAULT_MODEL)
+    
+    def get_marketplaces(self):
+        """Marketplaces configurados para o scraping"""
+        return self.config['scraping'].get('marketplaces', ['amazon'])
+    
+    def get_scraper(self, marketplace):
+        """
+        Retorna o scraper do marketplace para a thread atual.
+        
+        Cada worker do pool mantém seu próprio driver, pois o WebDriver não é
+        thread-safe; os drivers são reaproveitados entre tarefas da mesma thread.
+        """
+        scrapers = getattr(self._thread_local, 'scrapers', None)
+        if scrapers is None:
+            scrapers = self._thread_local.scrapers = {}
+        
+        if marketplace not in scrapers:
+            scraper = MARKETPLACE_BACKENDS[marketplace](
+                headless=self.config['scraping']['headless'],
+                debug=self.config['scraping'].get('debug', False)
+            )
+            scraper.duplicate_detector = self.duplicate_detector
+            scrapers[marketplace] = scraper
+            with self._scrapers_lock:
+                self.scrapers.append(scraper)
+        
+        return scrapers[marketplace]
+    
+    def scrape_term(self, marketplace, term, max_pages):
+        """Coleta um termo em um marketplace (executado em um worker do pool)"""
+        self.logger.info(f"Buscando: {term} [{marketplace}]")
+        try:
+            products = self.get_scraper(marketplace).collect(term, max_pages)
+            self.logger.info(f"Encontrados {len(products)} produtos para '{term}' [{marketplace}]")
+            return products
+        except Exception as e:
+            self.logger.error(f"Erro ao buscar '{term}' [{marketplace}]: {e}")
+            return []
+    
     def scrape_new_products(self):
-        """Executa scraping de novos produtos"""
+        """
+        Executa o scraping de todos os marketplaces configurados em paralelo,
+        em um pool de workers compartilhado, no esquema normalizado
+        """
         self.logger.info("Iniciando scraping de novos produtos...")
         
-        all_products = []
         search_terms = self.config['scraping']['search_terms']
         max_pages = self.config['scraping']['max_pages']
+        max_workers = self.config['scraping'].get('max_workers', 4)
         
-        for term in search_terms:
-            self.logger.info(f"Buscando: {term}")
-            try:
-                # Usar o novo método de scraping completo
-                search_url = f"https://www.amazon.com.br/s?k={term.replace(' ', '+')}"
-                products = self.scraper.scrape_complete_products(search_url, max_pages)
-                all_products.extend(products)
-                self.logger.info(f"Encontrados {len(products)} produtos para '{term}'")
-            except Exception as e:
-                self.logger.error(f"Erro ao buscar '{term}': {e}")
-                continue
+        tasks = [(marketplace, term) for marketplace in self.get_marketplaces() for term in search_terms]
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self.scrape_term, marketplace, term, max_pages) for marketplace, term in tasks]
+            # Manter a ordem das tarefas no resultado
+            results = [future.result() for future in futures]
+        
+        all_products = [product for products in results for product in products]
         
         self.logger.info(f"Total de produtos coletados: {len(all_products)}")
         return all_products
     
     def analyze_products_with_ai(self, products):
-        """Analisa produtos com IA, filtrando produtos sem vendedor"""
+        """Analisa produtos (ProductRecord) com IA, filtrando produtos sem vendedor"""
         if not products:
             self.logger.warning("Nenhum produto para analisar")
             return pd.DataFrame()
@@ -201,22 +424,9 @@ class IntegratedPiracyDetectionPipeline:
         self.logger.info("Analisando produtos com IA...")
         
         # Filtrar produtos sem vendedor antes da análise
-        products_with_seller = []
-        for product in products:
-            # Verificar se tem vendedor válido
-            has_seller = (
-                (product.get('seller_detailed') and 
-                 str(product.get('seller_detailed')).strip() and 
-                 str(product.get('seller_detailed')).lower() not in ['nan', 'none', 'null', '']) or
-                (product.get('seller') and 
-                 str(product.get('seller')).strip() and 
-                 str(product.get('seller')).lower() not in ['nan', 'none', 'null', ''])
-            )
-            
-            if has_seller:
-                products_with_seller.append(product)
-            else:
-                self.logger.info(f"Produto sem vendedor filtrado: {product.get('title', 'N/A')[:50]}")
+        products_with_seller, without_seller = com_vendedor(products)
+        for product in without_seller:
+            self.logger.info(f"Produto sem vendedor filtrado: {(product.title or 'N/A')[:50]}")
         
         if not products_with_seller:
             self.logger.warning("Nenhum produto com vendedor para analisar")
@@ -225,34 +435,29 @@ class IntegratedPiracyDetectionPipeline:
         self.logger.info(f"Produtos com vendedor para análise: {len(products_with_seller)}/{len(products)}")
         
         # Converter para DataFrame
-        df = pd.DataFrame(products_with_seller)
-        
-        # Mapear seller_detailed para seller se disponível
-        if 'seller_detailed' in df.columns:
-            self.logger.info(f"Campo seller_detailed encontrado com {df['seller_detailed'].notna().sum()} valores")
-            df['seller'] = df['seller_detailed'].fillna(df.get('seller', ''))
-            self.logger.info(f"Vendedores mapeados: {df['seller'].notna().sum()}/{len(df)}")
-        else:
-            self.logger.warning("Campo seller_detailed não encontrado nos dados")
-            self.logger.info(f"Colunas disponíveis: {list(df.columns)}")
-        
-        # Mapear price_detailed para price se disponível
-        if 'price_detailed' in df.columns:
-            self.logger.info(f"Campo price_detailed encontrado com {df['price_detailed'].notna().sum()} valores")
-            df['price'] = df['price_detailed'].fillna(df.get('price', ''))
-            self.logger.info(f"Preços mapeados: {df['price'].notna().sum()}/{len(df)}")
-        else:
-            self.logger.warning("Campo price_detailed não encontrado nos dados")
-        
-        # Fazer predições
-        if self.classifier.is_trained:
+        df = records_to_frame(products_with_seller)
+        
+        # Preço sugerido do catálogo (alimenta a feature price_ratio)
+        df = self.attach_catalog(df)
+        df = self.detect_price_anomalies(df)
+        
+        # Fazer predições (com deduplicação, só os representantes passam pelo modelo;
+        # com ai.parallel_workers, as linhas são pontuadas em vários processos)
+        self.setup_parallel_scorer()
+        if self.classifier.is_trained and self.duplicate_detector is not None:
+            price_tolerance = self.config['deduplication'].get('price_tolerance', 0.1)
+            df = propagar_predicoes(df, self.classifier, self.duplicate_detector, price_tolerance)
+        elif self.classifier.is_trained:
             df = self.classifier.prever(df)
         else:
             self.logger.warning("Modelo não treinado, usando regras heurísticas")
-            df['ai_prediction'] = df.apply(self.classifier.apply_heuristic_rules, axis=1)
+            df['ai_prediction'] = self.classifier.heuristics.label(df)
             df['ai_confidence'] = 0.5  # Confiança padrão
+            if self.duplicate_detector is not None:
+                df = self.duplicate_detector.agrupar(df)  # cluster_size para a regra de risco
         
-        return df
+        return self.apply_schema(df, "análise com IA")
+    
     def analisar_niveis_risco(self, df):
         """Analisa níveis de risco dos produtos"""
         if len(df) == 0:
@@ -266,7 +471,7 @@ class IntegratedPiracyDetectionPipeline:
         # Adicionar timestamp
         df['analysis_timestamp'] = datetime.now().isoformat()
         
-        return df
+        return self.apply_schema(df, "análise de risco")
     
     def save_results(self, df):
         """Salva resultados em CSV"""
@@ -292,6 +497,25 @@ class IntegratedPiracyDetectionPipeline:
         self.logger.info(f"  Produtos suspeitos: {suspicious_products}")
         self.logger.info(f"  Produtos de alto risco: {high_risk_products}")
     
+    def save_run_history(self, df):
+        """Grava entradas, probabilidades e risco da execução no histórico (ver rerisco.py)"""
+        if len(df) == 0:
+            return
+        history = RunHistory(self.config['output'].get('history_dir', 'resultados/historico'))
+        classes = getattr(self.classifier.model, 'classes_', [])
+        return history.save_run(df, classes, model_version=self.classifier.model_version)
+    
+    def save_to_store(self, df, run_id=None):
+        """Grava produtos, vendedores, ofertas, preços e predições na base SQLite (output.store_file)"""
+        store_file = self.config['output'].get('store_file')
+        if not store_file or len(df) == 0:
+            return
+        store = ProductStore(store_file)
+        try:
+            store.salvar_execucao(df, run_id=run_id, model_version=self.classifier.model_version)
+        finally:
+            store.close()
+    
     def generate_report(self, df):
         """Gera relatório HTML"""
         if len(df) == 0:
@@ -477,8 +701,16 @@ class IntegratedPiracyDetectionPipeline:
     
     def cleanup(self):
         """Limpa recursos"""
-        if self.scraper:
-            self.scraper.close()
+        for scraper in self.scrapers:
+            try:
+                scraper.close()
+            except Exception as e:
+                self.logger.warning(f"Erro ao fechar scraper: {e}")
+        self.scrapers = []
+        self.close_parallel_scorer()
+        if getattr(self, 'prediction_cache', None) is not None:
+            self.prediction_cache.close()
+            self.prediction_cache = None
         self.logger.info("Recursos limpos")
 
 def main():
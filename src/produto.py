@@ -0,0 +1,174 @@
+import json
+import math
+import argparse
+from dataclasses import dataclass, fields
+from datetime import datetime
+import pandas as pd
+from ingestao import parse_price
+
+# Textos de vendedor que equivalem a "sem vendedor"
+MISSING_SELLER_VALUES = {'', 'nan', 'none', 'null'}
+
+
+def _present(value):
+    return value is not None and not (isinstance(value, float) and math.isnan(value))
+
+
+def _float(value):
+    """Número como float (None se ausente/inválido); texto no formato brasileiro, como no catálogo"""
+    return parse_price(value) if _present(value) else None
+
+
+def _int(value):
+    number = _float(value)
+    return None if number is None else int(number)
+
+
+def seller_name(*candidates):
+    """Primeiro nome de vendedor válido entre os candidatos ('' se nenhum)"""
+    for value in candidates:
+        if _present(value):
+            text = str(value).strip()
+            if text.lower() not in MISSING_SELLER_VALUES:
+                return text
+    return ''
+
+
+@dataclass(slots=True)
+class ProductRecord:
+    """
+    Produto coletado no esquema normalizado de todos os marketplaces.
+
+    A normalização (vendedor da página ou da listagem, preço numérico,
+    especificações em JSON) é feita uma vez, em `from_raw`; o restante do
+    fluxo só lê os atributos.
+    """
+
+    marketplace: str = None
+    product_id: str = None
+    title: str = None
+    url: str = None
+    price: float = None
+    rating: float = None
+    review_count: int = None
+    seller: str = ''
+    description: str = None
+    specifications: str = ''
+    availability: str = None
+    shipping_info: str = None
+    search_term: str = None
+    scraped_at: str = None
+    duplicate_of: str = None
+
+    @classmethod
+    def from_raw(cls, product, marketplace=None, search_term=None, details=None):
+        """
+        Cria o registro a partir do dicionário bruto da listagem e, se
+        houver, do dicionário de detalhes da página do produto (que tem
+        precedência, como em {**produto, **detalhes})
+        """
+        details = details or {}
+
+        def get(key):
+            return details[key] if key in details else product.get(key)
+
+        price = get('price_detailed')
+        if price is None:
+            price = get('price')
+
+        specifications = get('specifications') or ''
+        if isinstance(specifications, dict):
+            specifications = json.dumps(specifications, ensure_ascii=False) if specifications else ''
+
+        return cls(
+            marketplace=marketplace or get('marketplace'),
+            product_id=get('product_id'),
+            title=get('title'),
+            url=get('url'),
+            price=_float(price),
+            rating=_float(get('rating')),
+            review_count=_int(get('review_count')),
+            seller=seller_name(get('seller_detailed'), get('seller')),
+            description=get('description'),
+            specifications=specifications,
+            availability=get('availability'),
+            shipping_info=get('shipping_info'),
+            search_term=search_term or get('search_term'),
+            scraped_at=get('scraped_at') or datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            duplicate_of=get('duplicate_of')
+        )
+
+    @property
+    def has_seller(self):
+        """Indica se o produto tem vendedor identificado"""
+        return bool(self.seller)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in PRODUCT_FIELDS}
+
+
+# Colunas do esquema normalizado, na ordem dos campos de ProductRecord
+PRODUCT_FIELDS = [field.name for field in fields(ProductRecord)]
+
+
+def com_vendedor(records):
+    """Separa os registros com vendedor; retorna (com vendedor, sem vendedor)"""
+    kept, dropped = [], []
+    for record in records:
+        (kept if record.has_seller else dropped).append(record)
+    return kept, dropped
+
+
+def records_to_frame(records):
+    """DataFrame com uma coluna por campo, montado coluna a coluna"""
+    return pd.DataFrame(
+        {name: [getattr(record, name) for record in records] for name in PRODUCT_FIELDS},
+        columns=PRODUCT_FIELDS
+    )
+
+
+def records_from_frame(df):
+    """
+    Registros a partir de um DataFrame (NaN vira None), com a mesma
+    normalização de `ProductRecord.from_raw`
+    """
+    rows = df.astype(object).where(df.notna(), None).to_dict('records')
+    return [ProductRecord.from_raw(row) for row in rows]
+
+
+def records_to_arrow(records):
+    """Tabela Arrow (pyarrow) com uma coluna por campo"""
+    import pyarrow as pa
+    return pa.Table.from_pydict(
+        {name: [getattr(record, name) for record in records] for name in PRODUCT_FIELDS}
+    )
+
+
+def records_from_arrow(table):
+    """Registros a partir de uma tabela Arrow, com a mesma normalização de `ProductRecord.from_raw`"""
+    return [ProductRecord.from_raw(row) for row in table.to_pylist()]
+
+
+def main():
+    """Converte um CSV de produtos brutos para o esquema normalizado"""
+    parser = argparse.ArgumentParser(description="Normaliza produtos coletados (CSV bruto -> esquema de ProductRecord)")
+    parser.add_argument('--dados', required=True, help="CSV com os produtos brutos (seller/seller_detailed, price/price_detailed, ...)")
+    parser.add_argument('--marketplace', default=None, help="Marketplace, se o CSV não tiver a coluna")
+    parser.add_argument('--saida', required=True, help="Arquivo de saída (.csv ou .parquet)")
+    args = parser.parse_args()
+
+    raw = pd.read_csv(args.dados, dtype=object)
+    raw = raw.astype(object).where(raw.notna(), None)
+    records = [ProductRecord.from_raw(product, args.marketplace) for product in raw.to_dict('records')]
+    kept, dropped = com_vendedor(records)
+
+    if args.saida.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        pq.write_table(records_to_arrow(kept), args.saida)
+    else:
+        records_to_frame(kept).to_csv(args.saida, index=False, encoding='utf-8')
+    print(f"{len(kept)} produtos salvos em {args.saida} ({len(dropped)} sem vendedor descartados)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+from vocabulario import VOCABULARIES, KeywordMatcher
+
+# Regras heurísticas de rotulagem, em forma declarativa.
+#
+# Grupos de palavras-chave (vocabulario.py): cada palavra distinta encontrada
+# no título ou na descrição soma `weight` ao score, sem diferenciar maiúsculas
+# nem acentos. Regras de vendedor: vale a primeira regra cujo grupo aparecer
+# no vendedor. Regras de preço e descrição curta somam o peso quando a
+# condição é satisfeita.
+HEURISTIC_RULES = {
+    'keyword_groups': [
+        {'name': 'suspicious_keywords', 'weight': 2, 'keywords': VOCABULARIES['suspicious_keywords']},
+        {'name': 'original_keywords', 'weight': -1, 'keywords': VOCABULARIES['original_keywords']}
+    ],
+    'seller_rules': [
+        {'name': 'trusted_sellers', 'weight': -1, 'keywords': VOCABULARIES['trusted_sellers']},
+        {'name': 'suspicious_sellers', 'weight': 2, 'keywords': VOCABULARIES['suspicious_sellers']}
+    ],
+    'price_rules': [
+        {'name': 'low_price', 'below': 30, 'weight': 1},
+        {'name': 'high_price', 'above': 200, 'weight': 0.5}
+    ],
+    'short_description': {'max_length': 50, 'weight': 1},
+    'labels': {'suspicious_min_score': 2, 'original_max_score': -1}
+}
+
+# Colunas lidas pelas regras
+RULE_INPUT_COLUMNS = ['title', 'description', 'seller', 'price']
+
+def text_column(df, column, lower=True):
+    """
+    Retorna a coluna como texto (em minúsculas por padrão), com a mesma
+    conversão de str(row.get(column, '')) usada nas regras por linha
+    """
+    if column not in df.columns:
+        return pd.Series('', index=df.index, dtype=object)
+    values = df[column]
+    if pd.api.types.is_string_dtype(values):
+        # Coluna textual: só os ausentes precisam de conversão (str(nan) == 'nan')
+        values = values.astype(object).fillna('nan')
+    else:
+        values = values.astype(object).map(str)
+    return values.str.lower() if lower else values
+
+
+def price_column(df):
+    """Retorna a coluna de preço como float (ausente/inválido vira NaN)"""
+    if 'price' not in df.columns:
+        return pd.Series(0.0, index=df.index)
+    return pd.to_numeric(df['price'], errors='coerce')
+
+
+def unique_rows(df, columns):
+    """
+    Deduplica o DataFrame pelas colunas informadas.
+
+    Retorna (codes, unique_df): unique_df tem a primeira ocorrência de cada
+    combinação e codes[i] é a posição, em unique_df, da linha i de df.
+    """
+    inputs = df.reindex(columns=columns)
+    codes = inputs.groupby(columns, dropna=False, sort=False).ngroup().to_numpy()
+    return codes, df.loc[~inputs.duplicated().to_numpy()]
+
+
+class HeuristicLabeler:
+    """
+    Motor de rotulagem heurística vetorizado.
+
+    Os grupos de palavras-chave e as regras de vendedor de HEURISTIC_RULES
+    viram dois KeywordMatcher, que buscam cada grupo na coluna inteira (uma
+    expressão regular por grupo, ou o autômato do pyahocorasick), e o score
+    é calculado com aritmética de colunas. Isso já evita o laço por linha
+    mesmo quando todas as linhas são distintas; a deduplicação de score()
+    só acrescenta ganho quando há anúncios repetidos.
+    """
+
+    def __init__(self, rules=None):
+        self.rules = rules or HEURISTIC_RULES
+        self.keyword_matcher = KeywordMatcher(
+            {group['name']: group['keywords'] for group in self.rules['keyword_groups']}
+        )
+        self.seller_matcher = KeywordMatcher(
+            {rule['name']: rule['keywords'] for rule in self.rules['seller_rules']}
+        )
+
+    def score(self, df):
+        """
+        Calcula o score heurístico de cada linha.
+
+        As regras são avaliadas uma única vez por combinação distinta de
+        título, descrição, vendedor e preço (anúncios repetidos entre coletas
+        são comuns) e o resultado é replicado para as linhas repetidas. Sem
+        repetições, a deduplicação custa um agrupamento a mais sobre as
+        quatro colunas (pequeno perto da busca das palavras).
+        """
+        codes, unique_inputs = unique_rows(df, RULE_INPUT_COLUMNS)
+        return self.score_rows(unique_inputs)[codes]
+
+    def score_rows(self, df):
+        """Calcula o score heurístico de cada linha, sem deduplicação"""
+        title = text_column(df, 'title', lower=False)
+        description = text_column(df, 'description', lower=False)
+        seller = text_column(df, 'seller', lower=False)
+        price = price_column(df).to_numpy(dtype=float)
+
+        score = np.zeros(len(df), dtype=float)
+
+        # Palavras-chave no título ou na descrição
+        keyword_counts = self.keyword_matcher.group_counts(title, description)
+        for column, group in enumerate(self.rules['keyword_groups']):
+            score += group['weight'] * keyword_counts[:, column]
+
+        # Vendedor: vale a primeira regra que casar
+        seller_counts = self.seller_matcher.group_counts(seller)
+        matched = np.zeros(len(df), dtype=bool)
+        for column, rule in enumerate(self.rules['seller_rules']):
+            hit = (seller_counts[:, column] > 0) & ~matched
+            score += rule['weight'] * hit
+            matched |= hit
+
+        # Preço (zero/ausente não pontua); vale a primeira regra que casar
+        has_price = ~np.isnan(price) & (price != 0)
+        matched = np.zeros(len(df), dtype=bool)
+        for rule in self.rules['price_rules']:
+            if 'below' in rule:
+                hit = has_price & (price < rule['below'])
+            else:
+                hit = has_price & (price > rule['above'])
+            hit &= ~matched
+            score += rule['weight'] * hit
+            matched |= hit
+
+        # Descrição vazia ou muito curta
+        short = self.rules['short_description']
+        score += short['weight'] * (description.str.len().to_numpy() < short['max_length'])
+
+        return score
+
+    def label(self, df):
+        """Classifica cada linha em SUSPEITO, ORIGINAL ou COMPATIVEL"""
+        score = self.score(df)
+        labels = self.rules['labels']
+        return np.select(
+            [score >= labels['suspicious_min_score'], score <= labels['original_max_score']],
+            ['SUSPEITO', 'ORIGINAL'],
+            default='COMPATIVEL'
+        ).astype(object)
@@ -0,0 +1,110 @@
+import os
+import json
+import argparse
+import pandas as pd
+from risco import RiskAnalyzer, RISK_LEVELS
+from historico_execucoes import RunHistory
+
+
+def recalcular_risco(df, risk_analyzer):
+    """
+    Recalcula risk_score/risk_level de execuções gravadas com outro
+    analisador; as colunas anteriores ficam em previous_risk_score e
+    previous_risk_level
+    """
+    df = df.rename(columns={'risk_score': 'previous_risk_score', 'risk_level': 'previous_risk_level'})
+    df = df.drop(columns=[column for column in df.columns if column.startswith('risk_')])
+    return risk_analyzer.analyze(df)
+
+
+def resumo_mudancas(df):
+    """
+    Tabela nível anterior x nível novo e a lista de movimentos
+    (de, para, quantidade) entre ALTO/MÉDIO/BAIXO
+    """
+    table = pd.crosstab(
+        pd.Categorical(df['previous_risk_level'], categories=RISK_LEVELS),
+        pd.Categorical(df['risk_level'], categories=RISK_LEVELS),
+        rownames=['anterior'], colnames=['novo'], dropna=False
+    )
+    moves = [
+        {'de': before, 'para': after, 'produtos': int(table.loc[before, after])}
+        for before in RISK_LEVELS for after in RISK_LEVELS
+        if before != after and table.loc[before, after] > 0
+    ]
+    return table, pd.DataFrame(moves, columns=['de', 'para', 'produtos'])
+
+
+def main():
+    """
+    Recalcula o risco de execuções gravadas com novos limiares/regras,
+    sem repetir scraping nem predição
+    """
+    parser = argparse.ArgumentParser(description="Recalcula o risco de execuções do histórico")
+    parser.add_argument('--config', default='config.json', help="Configuração base (regras e limiares atuais)")
+    parser.add_argument('--historico', default=None, help="Diretório do histórico (padrão: output.history_dir)")
+    parser.add_argument('--execucao', nargs='+', default=None, help="run_id(s) a recalcular (padrão: a mais recente)")
+    parser.add_argument('--desde', default=None, help="Data/hora inicial (ex.: 2026-10-01)")
+    parser.add_argument('--ate', default=None, help="Data/hora final (inclusive)")
+    parser.add_argument('--alto', type=float, default=None, help="Novo high_risk_threshold")
+    parser.add_argument('--medio', type=float, default=None, help="Novo medium_risk_threshold")
+    parser.add_argument('--confianca', type=float, default=None, help="Novo ai.confidence_threshold")
+    parser.add_argument('--regras', default=None, help="JSON com a lista de regras (formato de risk_analysis.rules)")
+    parser.add_argument('--listar', action='store_true', help="Lista as execuções gravadas")
+    parser.add_argument('--saida', default=None, help="CSV com os produtos recalculados")
+    args = parser.parse_args()
+
+    config = {}
+    if os.path.exists(args.config):
+        with open(args.config, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+
+    history = RunHistory(args.historico or config.get('output', {}).get('history_dir', 'resultados/historico'))
+
+    if args.listar:
+        for run_id in history.list_runs():
+            print(run_id)
+        return
+
+    rules = None
+    if args.regras:
+        with open(args.regras, 'r', encoding='utf-8') as f:
+            rules = json.load(f)
+
+    risk_analyzer = RiskAnalyzer.from_config(
+        config,
+        rules=rules,
+        high_risk_threshold=args.alto,
+        medium_risk_threshold=args.medio,
+        confidence_threshold=args.confianca
+    )
+
+    df = history.load(args.execucao, args.desde, args.ate)
+    if len(df) == 0:
+        print("Nenhuma execução encontrada no histórico")
+        return
+
+    df = recalcular_risco(df, risk_analyzer)
+    table, moves = resumo_mudancas(df)
+
+    print(f"\n=== RECÁLCULO DE RISCO ({df['run_id'].nunique()} execuções, {len(df)} produtos) ===")
+    print(f"Limiares: ALTO >= {risk_analyzer.high_risk_threshold}, MÉDIO >= {risk_analyzer.medium_risk_threshold}, "
+          f"confiança < {risk_analyzer.confidence_threshold}")
+    print("\nNível anterior x nível novo:")
+    print(table.to_string())
+
+    changed = int(moves['produtos'].sum()) if len(moves) else 0
+    print(f"\nProdutos que mudaram de nível: {changed}")
+    for _, move in moves.iterrows():
+        print(f"  {move['de']} -> {move['para']}: {move['produtos']}")
+
+    if args.saida:
+        out_dir = os.path.dirname(args.saida)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        df.to_csv(args.saida, index=False, encoding='utf-8')
+        print(f"\nProdutos recalculados salvos em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+from regras_heuristicas import text_column, price_column
+from vocabulario import KeywordMatcher
+
+# Regras de risco padrão, em forma declarativa (sobrescritas por
+# risk_analysis.rules em config.json). Cada regra gera uma coluna
+# risk_<name> com a sua contribuição; risk_score é a soma das colunas.
+#
+# Tipos de regra:
+#   prediction      peso por classe prevista pela IA (weights)
+#   low_confidence  soma `weight` quando ai_confidence < ai.confidence_threshold
+#   price           faixas de preço (below/above); vale a primeira que casar,
+#                   preço zero ou ausente não pontua
+#   seller_keywords soma `weight` quando o vendedor contém uma das keywords
+#                   (sem diferenciar maiúsculas nem acentos)
+#   cluster_size    soma `weight` quando o anúncio pertence a um grupo de
+#                   `min_size` ou mais anúncios quase idênticos (deduplicacao.py)
+DEFAULT_RISK_RULES = [
+    {'name': 'ai_prediction', 'type': 'prediction', 'weights': {'SUSPEITO': 3, 'COMPATIVEL': 1}},
+    {'name': 'low_confidence', 'type': 'low_confidence', 'weight': 1},
+    {'name': 'price', 'type': 'price', 'bands': [{'below': 30, 'weight': 2}, {'above': 200, 'weight': 1}]},
+    {'name': 'marketplace_seller', 'type': 'seller_keywords', 'keywords': ['marketplace'], 'weight': 1},
+    {'name': 'cloned_listing', 'type': 'cluster_size', 'min_size': 3, 'weight': 1}
+]
+
+DEFAULT_HIGH_RISK_THRESHOLD = 4
+DEFAULT_MEDIUM_RISK_THRESHOLD = 2
+DEFAULT_CONFIDENCE_THRESHOLD = 0.7
+
+RISK_LEVELS = ['ALTO', 'MÉDIO', 'BAIXO']
+
+# Colunas lidas por cada tipo de regra
+RULE_INPUT_COLUMNS = {
+    'prediction': ['ai_prediction'],
+    'low_confidence': ['ai_confidence'],
+    'price': ['price'],
+    'seller_keywords': ['seller'],
+    'cluster_size': ['cluster_size']
+}
+
+
+class RiskAnalyzer:
+    """
+    Motor de análise de risco vetorizado.
+
+    As regras e os limiares vêm da configuração (risk_analysis e
+    ai.confidence_threshold); cada regra é avaliada sobre colunas inteiras
+    e a contribuição de cada uma fica em uma coluna própria.
+    """
+
+    RULE_TYPES = ('prediction', 'low_confidence', 'price', 'seller_keywords', 'cluster_size')
+
+    def __init__(self, rules=None, high_risk_threshold=DEFAULT_HIGH_RISK_THRESHOLD,
+                 medium_risk_threshold=DEFAULT_MEDIUM_RISK_THRESHOLD,
+                 confidence_threshold=DEFAULT_CONFIDENCE_THRESHOLD):
+        self.rules = rules or DEFAULT_RISK_RULES
+        for rule in self.rules:
+            if rule.get('type') not in self.RULE_TYPES:
+                raise ValueError(f"Tipo de regra de risco desconhecido: {rule.get('type')} ({rule.get('name')})")
+        self.seller_matchers = {
+            rule['name']: KeywordMatcher({rule['name']: rule['keywords']})
+            for rule in self.rules if rule['type'] == 'seller_keywords'
+        }
+        self.high_risk_threshold = high_risk_threshold
+        self.medium_risk_threshold = medium_risk_threshold
+        self.confidence_threshold = confidence_threshold
+
+    @classmethod
+    def from_config(cls, config, **overrides):
+        """
+        Cria o analisador a partir do config.json carregado; `overrides`
+        substitui parâmetros (rules, limiares) sem editar o arquivo
+        """
+        risk_config = config.get('risk_analysis', {})
+        params = {
+            'rules': risk_config.get('rules'),
+            'high_risk_threshold': risk_config.get('high_risk_threshold', DEFAULT_HIGH_RISK_THRESHOLD),
+            'medium_risk_threshold': risk_config.get('medium_risk_threshold', DEFAULT_MEDIUM_RISK_THRESHOLD),
+            'confidence_threshold': config.get('ai', {}).get('confidence_threshold', DEFAULT_CONFIDENCE_THRESHOLD)
+        }
+        params.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(**params)
+
+    def params(self):
+        """Parâmetros atuais, no formato de from_config"""
+        return {
+            'rules': self.rules,
+            'high_risk_threshold': self.high_risk_threshold,
+            'medium_risk_threshold': self.medium_risk_threshold,
+            'confidence_threshold': self.confidence_threshold
+        }
+
+    def input_columns(self):
+        """Colunas lidas pelas regras configuradas"""
+        return list(dict.fromkeys(column for rule in self.rules for column in RULE_INPUT_COLUMNS[rule['type']]))
+
+    def contribution_columns(self):
+        """Nome da coluna de contribuição de cada regra"""
+        return [f"risk_{rule['name']}" for rule in self.rules]
+
+    def evaluate_rule(self, rule, df):
+        """Contribuição de uma regra para cada linha"""
+        n_rows = len(df)
+
+        if rule['type'] == 'prediction':
+            if 'ai_prediction' not in df.columns:
+                return np.zeros(n_rows)
+            weights = pd.Series(rule['weights'], dtype=float)
+            return df['ai_prediction'].astype(object).map(weights).fillna(0).to_numpy(dtype=float)
+
+        if rule['type'] == 'low_confidence':
+            # Sem coluna de confiança conta como confiança zero; NaN não pontua
+            if 'ai_confidence' not in df.columns:
+                return np.full(n_rows, float(rule['weight']))
+            confidence = pd.to_numeric(df['ai_confidence'], errors='coerce').to_numpy(dtype=float)
+            return rule['weight'] * (confidence < self.confidence_threshold)
+
+        if rule['type'] == 'price':
+            price = price_column(df).to_numpy(dtype=float)
+            has_price = ~np.isnan(price) & (price != 0)
+            contribution = np.zeros(n_rows)
+            matched = np.zeros(n_rows, dtype=bool)
+            for band in rule['bands']:
+                if 'below' in band:
+                    hit = has_price & (price < band['below'])
+                else:
+                    hit = has_price & (price > band['above'])
+                hit &= ~matched
+                contribution += band['weight'] * hit
+                matched |= hit
+            return contribution
+
+        if rule['type'] == 'cluster_size':
+            if 'cluster_size' not in df.columns:
+                return np.zeros(n_rows)
+            size = pd.to_numeric(df['cluster_size'], errors='coerce').to_numpy(dtype=float)
+            return rule['weight'] * (size >= rule['min_size'])
+
+        # seller_keywords
+        if 'seller' not in df.columns:
+            return np.zeros(n_rows)
+        hit = self.seller_matchers[rule['name']].group_counts(text_column(df, 'seller', lower=False))[:, 0] > 0
+        return rule['weight'] * hit
+
+    def contributions(self, df):
+        """DataFrame com a contribuição de cada regra (colunas risk_<name>)"""
+        return pd.DataFrame(
+            {column: self.evaluate_rule(rule, df) for column, rule in zip(self.contribution_columns(), self.rules)},
+            index=df.index
+        )
+
+    def classify(self, score):
+        """Nível de risco (ALTO/MÉDIO/BAIXO) de cada score"""
+        score = np.asarray(score, dtype=float)
+        return np.select(
+            [score >= self.high_risk_threshold, score >= self.medium_risk_threshold],
+            RISK_LEVELS[:2],
+            default=RISK_LEVELS[2]
+        ).astype(object)
+
+    def analyze(self, df):
+        """
+        Acrescenta a `df` as colunas de contribuição, risk_score e risk_level
+        """
+        contributions = self.contributions(df)
+        score = contributions.to_numpy().sum(axis=1) if len(contributions.columns) else np.zeros(len(df))
+
+        # Pesos inteiros mantêm o score inteiro, como nas regras originais
+        if all(float(value).is_integer() for value in self.weights()):
+            contributions = contributions.astype(np.int64)
+            score = score.astype(np.int64)
+
+        for column in contributions.columns:
+            df[column] = contributions[column].to_numpy()
+        df['risk_score'] = score
+        df['risk_level'] = self.classify(score)
+        return df
+
+    def weights(self):
+        """Todos os pesos declarados nas regras"""
+        for rule in self.rules:
+            if rule['type'] == 'prediction':
+                yield from rule['weights'].values()
+            elif rule['type'] == 'price':
+                yield from (band['weight'] for band in rule['bands'])
+            else:
+                yield rule['weight']
@@ -0,0 +1,226 @@
+import time
+from abc import ABC, abstractmethod
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from webdriver_manager.chrome import ChromeDriverManager
+from vocabulario import KeywordMatcher
+from produto import ProductRecord, PRODUCT_FIELDS, seller_name
+
+# Textos que claramente não são nomes de vendedores (vocabulario.py)
+INVALID_SELLER_MATCHER = KeywordMatcher(['invalid_seller_names'])
+
+# Esquema normalizado produzido por todos os marketplaces (campos de ProductRecord)
+NORMALIZED_COLUMNS = PRODUCT_FIELDS
+
+# Campos de detalhe que descrevem o produto (e não a oferta) e podem ser
+# copiados do representante para os anúncios quase idênticos do mesmo vendedor
+SHARED_DETAIL_FIELDS = ['description', 'specifications']
+
+
+class MarketplaceScraper(ABC):
+    """
+    Interface comum dos backends de scraping.
+
+    Cada marketplace implementa o iterador de listagem, o coletor de detalhes
+    e os extratores de campos; a normalização para NORMALIZED_COLUMNS e o
+    fluxo completo (listagem + detalhes) ficam aqui.
+    """
+
+    marketplace = None
+    log_file = 'logs/scraper.log'
+
+    def __init__(self, headless=True, debug=False):
+        self.debug = debug
+        self.setup_logging()
+        self.driver = None
+        self.headless = headless
+        # NearDuplicateDetector (deduplicacao.py), atribuído pelo pipeline
+        self.duplicate_detector = None
+        self.setup_driver()
+
+    @abstractmethod
+    def setup_logging(self):
+        """Configura o sistema de logging"""
+
+    def setup_driver(self):
+        """Configura o driver do Chrome"""
+        try:
+            chrome_options = Options()
+            if self.headless:
+                chrome_options.add_argument("--headless")
+            chrome_options.add_argument("--no-sandbox")
+            chrome_options.add_argument("--disable-dev-shm-usage")
+            chrome_options.add_argument("--disable-gpu")
+            chrome_options.add_argument("--window-size=1920,1080")
+            chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
+
+            service = Service(ChromeDriverManager().install())
+            self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            self.logger.info("Driver do Chrome configurado com sucesso")
+
+        except Exception as e:
+            self.logger.error(f"Erro ao configurar driver: {e}")
+            raise
+
+    # --- Interface de cada marketplace ---
+
+    @abstractmethod
+    def build_search_url(self, search_term):
+        """Monta a URL de busca para um termo"""
+
+    @abstractmethod
+    def iter_listing(self, search_term, max_pages=3):
+        """Itera sobre os produtos básicos da listagem de busca"""
+
+    @abstractmethod
+    def fetch_details(self, product):
+        """Coleta os detalhes da página individual de um produto"""
+
+    @abstractmethod
+    def extract_title(self, element):
+        """Extrai o título do produto na listagem"""
+
+    @abstractmethod
+    def extract_product_url(self, element):
+        """Extrai a URL do produto na listagem"""
+
+    @abstractmethod
+    def extract_price(self, element):
+        """Extrai o preço do produto na listagem"""
+
+    @abstractmethod
+    def extract_rating(self, element):
+        """Extrai a avaliação do produto na listagem"""
+
+    @abstractmethod
+    def extract_review_count(self, element):
+        """Extrai o número de avaliações na listagem"""
+
+    @abstractmethod
+    def extract_seller_from_listing(self, element):
+        """Extrai o vendedor na listagem"""
+
+    # --- Fluxo comum ---
+
+    def is_valid_seller_name(self, text):
+        """Valida se o texto é um nome de vendedor válido"""
+        if not text or text.strip() == "":
+            return False
+
+        text = text.strip()
+
+        if self.debug:
+            self.logger.info(f"Validando nome de vendedor: '{text}'")
+
+        # Filtrar textos que claramente não são nomes de vendedores
+        invalid = INVALID_SELLER_MATCHER.matches(text)
+        if invalid:
+            if self.debug:
+                self.logger.info(f"Nome rejeitado por palavra-chave: '{invalid[0]}'")
+            return False
+
+        # Verificar se tem pelo menos 2 caracteres
+        if len(text) < 2:
+            if self.debug:
+                self.logger.info("Nome rejeitado por ser muito curto")
+            return False
+
+        # Verificar se não é um número puro
+        try:
+            float(text.replace(',', '.'))
+            if self.debug:
+                self.logger.info("Nome rejeitado por ser apenas número")
+            return False
+        except ValueError:
+            pass
+
+        # Verificar se não contém apenas caracteres especiais
+        if not any(c.isalnum() for c in text):
+            if self.debug:
+                self.logger.info("Nome rejeitado por não conter caracteres alfanuméricos")
+            return False
+
+        # Verificar se não é muito longo (provavelmente não é nome de vendedor)
+        if len(text) > 100:
+            if self.debug:
+                self.logger.info("Nome rejeitado por ser muito longo")
+            return False
+
+        if self.debug:
+            self.logger.info(f"Nome de vendedor válido: '{text}'")
+
+        return True
+
+    def normalize_product(self, product, search_term=None, details=None):
+        """
+        Converte o dicionário bruto do marketplace (e os detalhes da página,
+        se houver) para um ProductRecord
+        """
+        return ProductRecord.from_raw(product, self.marketplace, search_term, details)
+
+    def same_seller(self, product, representative, representative_details):
+        """
+        Indica se o vendedor da listagem de `product` é conhecido e igual ao
+        do representante (da listagem ou da página de detalhes)
+        """
+        seller = seller_name(product.get('seller')).casefold()
+        if not seller:
+            return False
+        known = {
+            seller_name(representative.get('seller')).casefold(),
+            seller_name(representative_details.get('seller_detailed')).casefold()
+        }
+        return seller in known
+
+    def collect(self, search_term, max_pages=3, delay=2):
+        """
+        Coleta completa de um termo: listagem + detalhes, já normalizada
+        (lista de ProductRecord).
+
+        Com um duplicate_detector, os anúncios quase idênticos da listagem
+        são agrupados pelo título. Um anúncio do grupo cujo vendedor, já
+        informado na listagem, é o mesmo do representante não tem a página
+        de detalhes visitada: recebe a descrição e as especificações do
+        representante e mantém o próprio preço. Os demais (outro vendedor
+        ou vendedor ausente na listagem) têm a página visitada, para que
+        vendedor e preço sejam sempre os do próprio anúncio.
+        """
+        self.logger.info(f"[{self.marketplace}] Coletando '{search_term}'")
+
+        listing = list(self.iter_listing(search_term, max_pages))
+        if self.duplicate_detector is not None and listing:
+            clusters = self.duplicate_detector.cluster([product.get('title') or '' for product in listing])
+        else:
+            clusters = range(len(listing))
+
+        normalized = []
+        details_by_position = {}
+        copied = 0
+        for position, (product, representative) in enumerate(zip(listing, clusters)):
+            details = None
+            if product.get('url'):
+                if representative != position and representative in details_by_position \
+                        and self.same_seller(product, listing[representative], details_by_position[representative]):
+                    shared = details_by_position[representative]
+                    details = {field: shared.get(field) for field in SHARED_DETAIL_FIELDS}
+                    details['duplicate_of'] = listing[representative].get('url')
+                    copied += 1
+                else:
+                    details = self.fetch_details(product)
+                    details_by_position[position] = details
+                    # Pausa entre produtos para evitar bloqueio
+                    time.sleep(delay)
+            normalized.append(self.normalize_product(product, search_term, details))
+
+        self.logger.info(
+            f"[{self.marketplace}] {len(normalized)} produtos coletados para '{search_term}' "
+            f"({copied} com detalhes copiados de um anúncio quase idêntico)"
+        )
+        return normalized
+
+    def close(self):
+        """Fecha o driver"""
+        if self.driver:
+            self.driver.quit()
+            self.logger.info("Driver fechado")
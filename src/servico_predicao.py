@@ -0,0 +1,415 @@
+import os
+import json
+import time
+import queue
+import logging
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from classificador_ia import PiracyDetectionClassifier
+from cache_predicoes import PredictionCache
+from esquema import probability_matrix
+from features_produto import FEATURE_INPUT_COLUMNS
+
+# Configuração padrão do serviço (seção "service" de config.json)
+DEFAULT_SERVICE_CONFIG = {
+    "host": "127.0.0.1",
+    "port": 8765,
+    "unix_socket": None,
+    "max_batch_size": 256,
+    "max_delay_ms": 5
+}
+
+# Latências guardadas para os percentis de /stats
+LATENCY_WINDOW = 10000
+
+# Campos do produto lidos pelo modelo; os demais campos do pedido são ignorados
+NUMERIC_FIELDS = ['price', 'suggested_price']
+TEXT_FIELDS = [column for column in FEATURE_INPUT_COLUMNS if column not in NUMERIC_FIELDS]
+
+
+class InvalidProductError(ValueError):
+    """Produto do pedido com campo de tipo inválido (resposta 400)"""
+
+
+def coerce_product(product):
+    """
+    Valida um produto do pedido e converte os campos lidos pelo modelo
+    (texto ou número); levanta InvalidProductError se algum tiver outro
+    tipo, para que um produto malformado seja recusado antes de entrar no
+    micro-lote
+    """
+    if not isinstance(product, dict):
+        raise InvalidProductError("Produtos devem ser objetos JSON")
+
+    coerced = {}
+    for field in TEXT_FIELDS:
+        value = product.get(field)
+        if value is None:
+            continue
+        if isinstance(value, (list, dict)):
+            raise InvalidProductError(f"Campo '{field}' deve ser texto")
+        coerced[field] = str(value)
+
+    for field in NUMERIC_FIELDS:
+        value = product.get(field)
+        if value is None or value == '':
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise InvalidProductError(f"Campo '{field}' deve ser numérico")
+        try:
+            coerced[field] = float(value)
+        except ValueError:
+            raise InvalidProductError(f"Campo '{field}' deve ser numérico: {value!r}")
+    return coerced
+
+
+class PendingRequest:
+    """Pedido de predição aguardando o próximo micro-lote"""
+
+    def __init__(self, products):
+        self.products = products
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.created = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Agrupa pedidos concorrentes em micro-lotes.
+
+    Uma única thread consome a fila: assim que chega um pedido, espera no
+    máximo `max_delay_ms` por outros (ou até `max_batch_size` produtos) e
+    pontua todos com uma única chamada a `prever`, o que amortiza o custo
+    de vetorização e de predição entre os pedidos. Se o micro-lote falhar,
+    cada pedido é pontuado separadamente, e o erro só chega a quem o causou.
+    """
+
+    def __init__(self, classifier, max_batch_size=256, max_delay_ms=5):
+        self.classifier = classifier
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_ms / 1000
+        self.queue = queue.Queue()
+        self.logger = logging.getLogger(__name__)
+
+        self.stats_lock = threading.Lock()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.started_at = time.time()
+        self.requests = 0
+        self.products = 0
+        self.batches = 0
+        self.errors = 0
+
+        self.running = True
+        self.worker = threading.Thread(target=self.run, name='micro-batcher', daemon=True)
+        self.worker.start()
+
+    def submit(self, products, timeout=30):
+        """
+        Valida e enfileira produtos e aguarda as predições (lista de dicts);
+        levanta InvalidProductError, sem enfileirar, se algum produto for inválido
+        """
+        pending = PendingRequest([coerce_product(product) for product in products])
+        self.queue.put(pending)
+        if not pending.done.wait(timeout):
+            raise TimeoutError("Tempo esgotado aguardando a predição")
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def collect_batch(self):
+        """Bloqueia até o primeiro pedido e junta os que chegarem dentro do atraso máximo"""
+        first = self.queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        size = len(first.products)
+        deadline = time.perf_counter() + self.max_delay
+
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                pending = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if pending is None:
+                self.running = False
+                break
+            batch.append(pending)
+            size += len(pending.products)
+
+        return batch
+
+    def run(self):
+        """Laço da thread de predição"""
+        while self.running:
+            batch = self.collect_batch()
+            if batch is None:
+                break
+            self.process_batch(batch)
+
+    def score(self, products):
+        """Predições de uma lista de produtos, com uma única chamada a `prever`"""
+        df = self.classifier.prever(pd.DataFrame(products))
+        classes = self.classifier.model.classes_
+        return [
+            {
+                'ai_prediction': prediction,
+                'ai_confidence': float(confidence),
+                'ai_probabilities': dict(zip(classes, map(float, probabilities)))
+            }
+            for prediction, confidence, probabilities in zip(
+                df['ai_prediction'], df['ai_confidence'], probability_matrix(df, classes)
+            )
+        ]
+
+    def process_batch(self, batch):
+        """Pontua um micro-lote e entrega a cada pedido a sua fatia do resultado"""
+        products = [product for pending in batch for product in pending.products]
+        try:
+            results = self.score(products)
+            start = 0
+            for pending in batch:
+                pending.result = results[start:start + len(pending.products)]
+                start += len(pending.products)
+        except Exception as e:
+            self.logger.error(f"Erro ao pontuar micro-lote de {len(batch)} pedidos: {e}")
+            for pending in batch:
+                if len(batch) == 1:
+                    pending.error = e
+                    continue
+                # Pedido a pedido, para que o erro de um não chegue aos demais
+                try:
+                    pending.result = self.score(pending.products)
+                except Exception as request_error:
+                    pending.error = request_error
+            with self.stats_lock:
+                self.errors += sum(pending.error is not None for pending in batch)
+
+        finished = time.perf_counter()
+        with self.stats_lock:
+            self.batches += 1
+            self.requests += len(batch)
+            self.products += len(products)
+            self.latencies.extend(finished - pending.created for pending in batch)
+
+        for pending in batch:
+            pending.done.set()
+
+    def stats(self):
+        """Latência (ms) e vazão acumuladas desde o início do serviço"""
+        with self.stats_lock:
+            latencies = np.array(self.latencies) * 1000
+            uptime = time.time() - self.started_at
+            stats = {
+                'uptime_s': uptime,
+                'requests': self.requests,
+                'products': self.products,
+                'batches': self.batches,
+                'errors': self.errors,
+                'avg_batch_size': self.products / self.batches if self.batches else 0.0,
+                'throughput_products_s': self.products / uptime if uptime else 0.0,
+                'queue_size': self.queue.qsize()
+            }
+        if len(latencies):
+            stats.update({
+                'latency_ms_p50': float(np.percentile(latencies, 50)),
+                'latency_ms_p95': float(np.percentile(latencies, 95)),
+                'latency_ms_p99': float(np.percentile(latencies, 99)),
+                'latency_ms_max': float(latencies.max())
+            })
+        if self.classifier.cache is not None:
+            stats['cache'] = self.classifier.cache.stats()
+        return stats
+
+    def stop(self):
+        """Encerra a thread de predição"""
+        self.queue.put(None)
+        self.worker.join(timeout=5)
+
+
+class PredictionRequestHandler(BaseHTTPRequestHandler):
+    """
+    Rotas do serviço:
+      POST /predict  {"product": {...}} ou {"products": [{...}, ...]}
+      GET  /stats    latência e vazão
+      GET  /health   estado do modelo
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def address_string(self):
+        # Em socket Unix o endereço do cliente é uma string vazia
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return 'unix'
+
+    def log_message(self, format, *args):
+        logging.getLogger(__name__).debug(f"{self.address_string()} - {format % args}")
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            classifier = self.server.batcher.classifier
+            self.send_json(200, {
+                'status': 'ok',
+                'model_name': classifier.model_name,
+                'model_version': classifier.model_version
+            })
+        elif self.path == '/stats':
+            self.send_json(200, self.server.batcher.stats())
+        else:
+            self.send_json(404, {'error': f"Rota desconhecida: {self.path}"})
+
+    def do_POST(self):
+        if self.path != '/predict':
+            self.send_json(404, {'error': f"Rota desconhecida: {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except (ValueError, json.JSONDecodeError):
+            self.send_json(400, {'error': "JSON inválido"})
+            return
+
+        if isinstance(payload, list):
+            products = payload
+        elif not isinstance(payload, dict):
+            self.send_json(400, {'error': "O corpo deve ser um objeto ou uma lista de produtos"})
+            return
+        elif 'products' in payload:
+            products = payload['products']
+        elif 'product' in payload:
+            products = [payload['product']]
+        else:
+            self.send_json(400, {'error': "Envie 'product' ou 'products'"})
+            return
+
+        if not isinstance(products, list) or not products:
+            self.send_json(400, {'error': "Envie ao menos um produto"})
+            return
+
+        try:
+            predictions = self.server.batcher.submit(products)
+        except InvalidProductError as e:
+            self.send_json(400, {'error': str(e)})
+            return
+        except TimeoutError as e:
+            self.send_json(503, {'error': str(e)})
+            return
+        except Exception as e:
+            self.send_json(500, {'error': str(e)})
+            return
+
+        self.send_json(200, {
+            'model_version': self.server.batcher.classifier.model_version,
+            'predictions': predictions
+        })
+
+
+class LocalHTTPServer(ThreadingHTTPServer):
+    """Servidor HTTP em localhost, uma thread por conexão"""
+    daemon_threads = True
+    # Fila de conexões pendentes (o padrão do socketserver, 5, recusa rajadas)
+    request_queue_size = 128
+
+
+class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    """Servidor HTTP em socket Unix, uma thread por conexão"""
+    daemon_threads = True
+    request_queue_size = 128
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ''
+
+
+def create_server(batcher, host='127.0.0.1', port=8765, unix_socket=None):
+    """Cria o servidor HTTP em localhost ou, se informado, em um socket Unix"""
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        server = ThreadingUnixHTTPServer(unix_socket, PredictionRequestHandler)
+    else:
+        server = LocalHTTPServer((host, port), PredictionRequestHandler)
+    server.batcher = batcher
+    return server
+
+
+def load_config(config_file):
+    """Lê as seções "ai" e "service" de config.json"""
+    try:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        config = {}
+    service = dict(DEFAULT_SERVICE_CONFIG)
+    service.update(config.get('service', {}))
+    return config.get('ai', {}), service
+
+
+def main():
+    """
+    Sobe o serviço local de predição com o modelo salvo
+    """
+    parser = argparse.ArgumentParser(description="Serviço local de predição com micro-lotes")
+    parser.add_argument('--config', default='config.json', help="Arquivo de configuração")
+    parser.add_argument('--modelo', default=None, help="Arquivo do modelo (padrão: ai.model_file)")
+    parser.add_argument('--host', default=None, help="Endereço HTTP (padrão: service.host)")
+    parser.add_argument('--porta', type=int, default=None, help="Porta HTTP (padrão: service.port)")
+    parser.add_argument('--socket', default=None, help="Socket Unix no lugar de host/porta")
+    parser.add_argument('--max-lote', type=int, default=None, help="Produtos por micro-lote")
+    parser.add_argument('--atraso-ms', type=float, default=None, help="Espera máxima para formar um micro-lote")
+    args = parser.parse_args()
+
+    ai_config, service = load_config(args.config)
+    model_file = args.modelo or ai_config.get('model_file', 'resultados/modelo_deteccao_pirataria.pkl')
+
+    # Modelo carregado uma única vez para toda a vida do serviço
+    classifier = PiracyDetectionClassifier()
+    classifier.load_model(model_file)
+    if ai_config.get('cache_file'):
+        classifier.cache = PredictionCache(ai_config['cache_file'])
+
+    batcher = MicroBatcher(
+        classifier,
+        max_batch_size=args.max_lote or service['max_batch_size'],
+        max_delay_ms=args.atraso_ms if args.atraso_ms is not None else service['max_delay_ms']
+    )
+    server = create_server(
+        batcher,
+        host=args.host or service['host'],
+        port=args.porta or service['port'],
+        unix_socket=args.socket or service['unix_socket']
+    )
+
+    address = args.socket or service['unix_socket'] or f"http://{args.host or service['host']}:{args.porta or service['port']}"
+    classifier.logger.info(f"Serviço de predição ouvindo em {address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.stop()
+        if classifier.cache is not None:
+            classifier.cache.close()
+
+
+if __name__ == "__main__":
+    main()
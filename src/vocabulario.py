@@ -0,0 +1,218 @@
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick é opcional; sem ele usam-se expressões regulares por grupo
+    ahocorasick = None
+
+# Vocabulários usados pelas regras, features, análise de risco e scrapers.
+# As palavras são comparadas depois de normalizadas (minúsculas e sem
+# acentos), então 'compatível' e 'compativel' são a mesma palavra.
+VOCABULARIES = {
+    # Regras heurísticas de rotulagem (regras_heuristicas.py)
+    'suspicious_keywords': [
+        'genérico', 'cópia', 'compatível', 'recondicionado', 'usado',
+        'refurbished', 'remanufactured', 'compatible', 'generic',
+        'não original', 'alternativo', 'substituto', 'imitação',
+        'falso', 'fake', 'replica', 'copia', 'compativel'
+    ],
+    'original_keywords': [
+        'original', 'oficial', 'genuíno', 'autêntico', 'lacrado',
+        'novo', 'novo lacrado', 'garantia', 'nota fiscal'
+    ],
+    'trusted_sellers': ['amazon', 'amazon.com.br', 'hp', 'hp brasil', 'oficial'],
+    'suspicious_sellers': ['marketplace', 'terceiros', 'vendedor externo', 'loja genérica'],
+
+    # Features numéricas do modelo (features_produto.py)
+    'suspicious_words': [
+        'genérico', 'cópia', 'compatível', 'recondicionado', 'usado',
+        'refurbished', 'remanufactured', 'compatible', 'generic',
+        'não original', 'alternativo', 'substituto', 'imitação'
+    ],
+    'original_words': [
+        'original', 'oficial', 'genuíno', 'autêntico', 'lacrado',
+        'novo', 'garantia', 'nota fiscal', 'certificado'
+    ],
+    'trusted_seller_words': ['amazon', 'hp', 'oficial'],
+    'suspicious_seller_words': ['marketplace', 'terceiros', 'vendedor externo'],
+
+    # Textos da página que não são nomes de vendedor (scraper_base.py)
+    'invalid_seller_names': [
+        'avaliação', 'review', 'rating', 'estrela', 'star',
+        'avaliações', 'reviews', 'disponível', 'available',
+        'preço', 'price', 'frete', 'shipping', 'entrega', 'delivery',
+        'mais vendidos', 'best sellers', 'escolha da amazon',
+        'amazon choice', 'patrocinado', 'sponsored',
+        'pesquisas relacionadas', 'related searches',
+        'anterior', 'próximo', 'next', 'previous',
+        'departamentos', 'departments', 'categoria', 'category',
+        'ver mais', 'see more', 'ver ofertas', 'see offers',
+        'produtos similares', 'similar products',
+        'outras opções', 'other options',
+        # Termos genéricos que não são nomes
+        'vendido por', 'enviado por', 'sold by', 'shipped by'
+    ]
+}
+
+_COMBINING_MARKS = re.compile('[\u0300-\u036f]')
+
+
+def fold_text(text):
+    """Normaliza um texto para comparação: minúsculas e sem acentos"""
+    return _COMBINING_MARKS.sub('', unicodedata.normalize('NFKD', str(text).lower()))
+
+
+def fold_texts(texts):
+    """fold_text aplicado a uma coluna inteira, com as operações de texto do pandas"""
+    values = pd.Series(texts, dtype=object).fillna('nan').astype(str)
+    return values.str.lower().str.normalize('NFKD').str.replace(_COMBINING_MARKS.pattern, '', regex=True)
+
+
+class KeywordMatcher:
+    """
+    Busca simultânea de vários grupos de palavras-chave.
+
+    Com pyahocorasick instalado, todas as palavras de todos os grupos
+    entram em um único autômato de Aho-Corasick e cada texto é percorrido
+    uma vez. Sem ele, cada grupo vira uma expressão regular (alternativa
+    das palavras) aplicada à coluna inteira com str.contains, e só os
+    textos que casam com o grupo são verificados palavra a palavra; as
+    duas formas rodam em código C e dão o mesmo resultado: o número de
+    palavras distintas de cada grupo encontradas no texto (como substring,
+    incluindo ocorrências sobrepostas como 'novo' / 'novo lacrado').
+    """
+
+    def __init__(self, groups):
+        """`groups`: {nome do grupo: lista de palavras} ou lista de nomes de VOCABULARIES"""
+        if not isinstance(groups, dict):
+            groups = {name: VOCABULARIES[name] for name in groups}
+        self.group_names = list(groups)
+
+        keyword_ids = {}
+        memberships = []
+        for group_index, keywords in enumerate(groups.values()):
+            for keyword in keywords:
+                folded = fold_text(keyword)
+                if folded not in keyword_ids:
+                    keyword_ids[folded] = len(keyword_ids)
+                    memberships.append(set())
+                memberships[keyword_ids[folded]].add(group_index)
+
+        self.keywords = list(keyword_ids)
+        self.membership = np.zeros((len(self.keywords), len(self.group_names)), dtype=np.int64)
+        for keyword_id, group_indices in enumerate(memberships):
+            self.membership[keyword_id, list(group_indices)] = 1
+
+        if ahocorasick is not None and self.keywords:
+            self.automaton = ahocorasick.Automaton()
+            for keyword_id, keyword in enumerate(self.keywords):
+                self.automaton.add_word(keyword, keyword_id)
+            self.automaton.make_automaton()
+        else:
+            self.automaton = None
+
+        # Uma expressão por grupo, cada palavra no primeiro grupo em que aparece
+        self.group_patterns = []
+        first_group = self.membership.argmax(axis=1)
+        for group_index in range(len(self.group_names)):
+            keyword_ids = np.flatnonzero(first_group == group_index)
+            if len(keyword_ids):
+                pattern = '|'.join(re.escape(self.keywords[keyword_id]) for keyword_id in keyword_ids)
+                self.group_patterns.append((pattern, keyword_ids))
+        self.pattern = re.compile('|'.join(pattern for pattern, _ in self.group_patterns)) if self.keywords else None
+
+    def keyword_ids(self, folded_text):
+        """Conjunto dos ids das palavras encontradas em um texto já normalizado"""
+        if self.automaton is not None:
+            return {keyword_id for _, keyword_id in self.automaton.iter(folded_text)}
+        if self.pattern is None or not self.pattern.search(folded_text):
+            return set()
+        return {keyword_id for keyword_id, keyword in enumerate(self.keywords) if keyword in folded_text}
+
+    def matches(self, text, group=None):
+        """Palavras encontradas em `text` (de todos os grupos ou só de `group`)"""
+        found = sorted(self.keyword_ids(fold_text(text)))
+        if group is not None:
+            column = self.group_names.index(group)
+            found = [keyword_id for keyword_id in found if self.membership[keyword_id, column]]
+        return [self.keywords[keyword_id] for keyword_id in found]
+
+    def contains(self, text, group):
+        """Indica se `text` contém alguma palavra de `group`"""
+        return bool(self.matches(text, group))
+
+    def presence(self, texts):
+        """
+        Matriz booleana (n_textos, n_palavras) indicando as palavras
+        encontradas em cada texto; textos repetidos são processados uma vez
+        """
+        codes, uniques = pd.factorize(pd.Series(texts, dtype=object).fillna('nan'))
+        folded = fold_texts(uniques)
+        found = np.zeros((len(uniques), len(self.keywords)), dtype=bool)
+        if self.automaton is not None:
+            for position, text in enumerate(folded):
+                keyword_ids = self.keyword_ids(text)
+                if keyword_ids:
+                    found[position, list(keyword_ids)] = True
+            return found[codes]
+
+        for pattern, keyword_ids in self.group_patterns:
+            hit = folded.str.contains(pattern, regex=True).to_numpy(dtype=bool)
+            if not hit.any():
+                continue
+            candidates = folded[hit]
+            for keyword_id in keyword_ids:
+                found[hit, keyword_id] = candidates.str.contains(
+                    self.keywords[keyword_id], regex=False
+                ).to_numpy(dtype=bool)
+        return found[codes]
+
+    def junctions(self, fields, separator):
+        """
+        Trechos do texto concatenado (campos unidos por `separator`) em
+        volta de cada junção, largos o bastante para conter qualquer
+        palavra que cruze a junção
+        """
+        width = 2 * max(len(keyword) for keyword in self.keywords)
+        fields = [pd.Series(np.asarray(field, dtype=object)).fillna('nan').astype(str) for field in fields]
+        windows = []
+        before = fields[0].str[-width:]
+        for position in range(1, len(fields)):
+            after = fields[position].str[:width]
+            for following in fields[position + 1:]:
+                after = (after + separator + following.str[:width]).str[:width]
+            windows.append(before + separator + after)
+            before = (before + separator + fields[position]).str[-width:]
+        return windows
+
+    def group_counts(self, *fields, separator=None):
+        """
+        Matriz (n_textos, n_grupos) com o número de palavras distintas de
+        cada grupo em cada texto.
+
+        Com vários campos (ex.: título e descrição), cada campo é buscado
+        separadamente e uma palavra conta uma vez se aparecer em qualquer
+        um deles, como em `palavra in titulo or palavra in descricao` nas
+        regras heurísticas; como os campos se repetem de forma independente
+        entre os anúncios, cada texto distinto é normalizado uma vez.
+
+        Sem `separator`, uma palavra que só existe na junção de dois campos
+        (ex.: título terminando em 'nota' e descrição começando em 'fiscal')
+        não conta. Com `separator`, o resultado é o da busca no texto
+        concatenado (campos unidos por `separator`): os trechos em volta de
+        cada junção também são buscados.
+        """
+        found = self.presence(fields[0])
+        for field in fields[1:]:
+            found |= self.presence(field)
+        if separator is not None and len(fields) > 1 and self.keywords:
+            for window in self.junctions(fields, separator):
+                found |= self.presence(window)
+        return found.astype(np.int64) @ self.membership
+
+    def group_count(self, *fields, group, separator=None):
+        """Número de palavras distintas de `group` em cada texto"""
+        return self.group_counts(*fields, separator=separator)[:, self.group_names.index(group)]
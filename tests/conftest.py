@@ -0,0 +1,50 @@
+import os
+import sys
+import logging
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+# Os módulos usam caminhos relativos à raiz do projeto (data/, logs/)
+os.chdir(ROOT)
+os.makedirs('logs', exist_ok=True)
+
+
+@pytest.fixture(scope='session', autouse=True)
+def log_temporario(tmp_path_factory):
+    """
+    Log dos testes em um diretório temporário: com um handler já na raiz,
+    o logging.basicConfig dos módulos (FileHandler em logs/) não faz nada
+    """
+    handler = logging.FileHandler(tmp_path_factory.mktemp('logs') / 'testes.log', encoding='utf-8')
+    root = logging.getLogger()
+    root.addHandler(handler)
+    yield handler.baseFilename
+    root.removeHandler(handler)
+    handler.close()
+
+
+@pytest.fixture(scope='session')
+def base_dados(tmp_path_factory):
+    """base_dados.csv tipada, com o cache Parquet em um diretório temporário"""
+    from ingestao import carregar_base_dados
+    return carregar_base_dados('data/base_dados.csv', cache_dir=str(tmp_path_factory.mktemp('cache')))
+
+
+@pytest.fixture(scope='session')
+def classificador(base_dados):
+    """Classificador treinado com a base, sem passar pelo catálogo (como classificador_ia.main)"""
+    from classificador_ia import PiracyDetectionClassifier
+    classifier = PiracyDetectionClassifier()
+    classifier.treinar_modelo(base_dados.copy())
+    return classifier
+
+
+@pytest.fixture(scope='session')
+def modelo_compilado(classificador, tmp_path_factory):
+    """Diretório com o classificador exportado para o avaliador NumPy"""
+    from floresta_numpy import exportar_modelo
+    out_dir = str(tmp_path_factory.mktemp('modelo_compilado'))
+    exportar_modelo(classificador, out_dir)
+    return out_dir
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+from datetime import datetime
+from armazenamento import ProductStore
+from esquema import compactar
+
+PRIMEIRA = pd.DataFrame({
+    'marketplace': ['amazon', 'amazon', 'mercadolivre', 'amazon'],
+    'product_id': ['B0AAA', 'B0BBB', 'MLB1', None],
+    'title': ['Cartucho HP 667 Preto', 'Toner compatível', 'Cartucho HP 664', 'Sem chave'],
+    'url': ['https://amazon.com.br/dp/B0AAA?ref=x', None, 'https://mercadolivre.com.br/MLB1', None],
+    'seller': ['HP Brasil', 'Loja X', 'nan', 'Loja X'],
+    'seller_detailed': [None, None, None, None],
+    'price': [69.9, 20.0, 74.9, 10.0],
+    'scraped_at': ['2026-10-01 10:00:00'] * 4,
+    'ai_prediction': ['ORIGINAL', 'SUSPEITO', 'COMPATIVEL', 'SUSPEITO'],
+    'ai_confidence': [0.9, 0.8, 0.6, 0.7],
+    'risk_score': [0, 5, 2, 4],
+    'risk_level': ['BAIXO', 'ALTO', 'MÉDIO', 'ALTO']
+})
+
+SEGUNDA = pd.DataFrame({
+    'marketplace': ['amazon', 'amazon'],
+    'product_id': ['B0AAA', 'B0AAA'],
+    'title': ['Cartucho HP 667 Preto Original', None],
+    'seller': ['HP Brasil', 'Loja X'],
+    'seller_detailed': [None, 'Loja Y'],
+    'price': [59.9, 30.0],
+    'price_detailed': [np.nan, 29.9],
+    'scraped_at': ['2026-10-02 10:00:00'] * 2,
+    'ai_prediction': ['ORIGINAL', 'SUSPEITO'],
+    'ai_confidence': [0.95, 0.85],
+    'risk_score': [0, 6],
+    'risk_level': ['BAIXO', 'ALTO']
+})
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ProductStore(str(tmp_path / 'produtos.sqlite'))
+    store.salvar_execucao(PRIMEIRA, run_id='r1', model_version='m1', run_at=datetime(2026, 10, 1, 10))
+    store.salvar_execucao(compactar(SEGUNDA.copy()), run_id='r2', model_version='m2', run_at=datetime(2026, 10, 2, 10))
+    yield store
+    store.close()
+
+
+def test_chaves_e_contagens(store):
+    # Linha sem product_id, asin e URL não é gravada; vendedor 'nan' não vira vendedor
+    assert ProductStore.product_keys(PRIMEIRA) == ['amazon:B0AAA', 'amazon:B0BBB', 'mercadolivre:MLB1', None]
+    assert store.contagens() == {'products': 3, 'sellers': 3, 'offers': 3, 'observations': 5, 'predictions': 5}
+
+
+def test_produto_atualizado_sem_perder_campos(store):
+    product = store.query("SELECT * FROM products WHERE product_key = 'amazon:B0AAA'").iloc[0]
+    # Título novo substitui o antigo; título ausente (None) não apaga
+    assert product['title'] == 'Cartucho HP 667 Preto Original'
+    assert product['asin'] == 'B0AAA'
+    assert product['first_seen'] == '2026-10-01 10:00:00' and product['last_seen'] == '2026-10-02 10:00:00'
+
+
+def test_ofertas_por_vendedor(store):
+    # Vendedor da página de detalhes tem precedência sobre o da listagem
+    assert store.ofertas_vendedor('Loja X')['product_key'].tolist() == ['amazon:B0BBB']
+    ofertas = store.ofertas_vendedor('Loja Y')
+    assert ofertas['product_key'].tolist() == ['amazon:B0AAA'] and ofertas['last_price'].tolist() == [29.9]
+
+    hp = store.ofertas_vendedor('HP Brasil').iloc[0]
+    # Último preço da oferta (o float32 do esquema volta a 59.9) e a última predição gravada do produto
+    assert hp['last_price'] == 59.9
+    assert hp['first_seen'] == '2026-10-01 10:00:00' and hp['last_seen'] == '2026-10-02 10:00:00'
+    assert hp['ai_prediction'] == 'SUSPEITO'
+
+
+def test_historico_de_precos(store):
+    historico = store.historico_precos(asin='B0AAA')
+    assert historico['run_id'].tolist() == ['r1', 'r2', 'r2']
+    assert historico['seller'].tolist() == ['HP Brasil', 'HP Brasil', 'Loja Y']
+    assert historico['price'].tolist() == [69.9, 59.9, 29.9]
+    assert store.observacoes(since='2026-10-02')['run_id'].unique().tolist() == ['r2']
+    with pytest.raises(ValueError):
+        store.historico_precos()
+
+
+def test_predicoes_por_execucao(store):
+    assert store.ultima_execucao() == 'r2'
+    primeira = store.resultados_execucao('r1')
+    assert primeira['title'].tolist() == ['Cartucho HP 667 Preto Original', 'Toner compatível', 'Cartucho HP 664']
+    assert primeira['seller'].isna().tolist() == [False, False, True]
+    assert primeira['risk_level'].tolist() == ['BAIXO', 'ALTO', 'MÉDIO']
+
+    versions = store.query("SELECT run_id, model_version, COUNT(*) AS n FROM predictions GROUP BY run_id ORDER BY run_id")
+    assert versions.values.tolist() == [['r1', 'm1', 3], ['r2', 'm2', 2]]
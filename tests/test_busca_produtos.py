@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+from armazenamento import ProductStore
+from busca_produtos import buscar, montar_consulta, radical
+
+PRODUTOS = pd.DataFrame({
+    'marketplace': ['amazon', 'amazon', 'mercadolivre'],
+    'product_id': ['B01', 'B02', 'MLB3'],
+    'title': ['Cartucho Recarregável HP 664', 'Cartuchos compatíveis HP 667 (kit)', 'Toner genérico'],
+    'description': ['Tinta para impressão', 'Kit com 2 unidades', 'Não é original'],
+    'seller': ['TecShop', 'Loja Ação', 'TecShop'],
+    'price': [49.9, 30.0, 80.0],
+    'risk_level': ['BAIXO', 'ALTO', 'MÉDIO'],
+    'ai_prediction': ['ORIGINAL', 'SUSPEITO', 'COMPATIVEL']
+})
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ProductStore(str(tmp_path / 'produtos.sqlite'))
+    store.salvar_execucao(PRODUTOS, run_id='r1')
+    yield store
+    store.close()
+
+
+def _ids(store, texto, **kwargs):
+    return sorted(buscar(store, texto, **kwargs)['product_key'].str.split(':').str[1])
+
+
+@pytest.mark.parametrize('texto', ['recarregável', 'recarregavel', 'RECARREGÁVEL', 'impressao', 'impressão'])
+def test_acentos_e_maiusculas_ignorados(store, texto):
+    assert _ids(store, texto) == ['B01']
+
+
+def test_plural_encontra_singular(store):
+    assert radical('recarregaveis') == 'recarregav' and radical('cartuchos') == 'cartucho'
+    # Radical curto demais: a palavra é buscada inteira
+    assert radical('kits') == 'kits' and radical('hps') == 'hps'
+    assert _ids(store, 'recarregáveis') == ['B01']
+    assert _ids(store, 'cartuchos') == ['B01', 'B02']
+    assert _ids(store, 'cartucho') == ['B01', 'B02']
+    assert _ids(store, 'cartuchos compativeis') == ['B02']
+
+
+def test_frase_exclusao_e_coluna(store):
+    assert _ids(store, '"tinta para impressao"') == ['B01']
+    assert _ids(store, '"impressao para tinta"') == []
+    assert _ids(store, 'cartucho -kit') == ['B01']
+    assert _ids(store, 'seller:tecshop') == ['B01', 'MLB3']
+    assert _ids(store, 'seller:acao') == ['B02']
+    assert _ids(store, 'tecshop', risk_levels=['MÉDIO']) == ['MLB3']
+
+
+@pytest.mark.parametrize('texto', [
+    'HP AND OR NOT', '(kit)', 'cartucho*', '"kit', 'kit"', 'NEAR(hp kit)', 'hp ^kit', 'title:', 'x:kit', 'hp + kit -',
+    "d'água", 'cartucho; DROP TABLE products'
+])
+def test_caracteres_de_sintaxe_fts_na_busca(store, texto):
+    # A busca nunca repassa operadores do FTS5: só palavras entre aspas
+    query = montar_consulta(texto)
+    store.buscar(query)
+    assert store.contagens()['products'] == 3
+
+
+def test_busca_sem_palavras(store):
+    for texto in ['', '()', '-kit', '"" *']:
+        with pytest.raises(ValueError):
+            montar_consulta(texto)
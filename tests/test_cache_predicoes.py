@@ -0,0 +1,88 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import pytest
+import catalogo
+import ingestao
+from cache_predicoes import PredictionCache
+from esquema import probability_columns
+
+ANUNCIOS = pd.DataFrame({
+    'title': ['Cartucho HP 667 Preto', 'Cartucho HP 667 Preto', 'Toner compatível'],
+    'description': ['Original lacrado', 'Original lacrado', 'Genérico'],
+    'seller': ['HP', 'HP', 'Loja'],
+    'price': [69.9, 69.9, 20.0]
+})
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = PredictionCache(str(tmp_path / 'cache.sqlite'))
+    yield cache
+    cache.close()
+
+
+def test_faltas_acertos_e_versoes(cache):
+    keys, cached, misses = cache.lookup(ANUNCIOS, 'v1')
+    # Linhas repetidas têm a mesma chave e são pontuadas uma vez só
+    assert keys[0] == keys[1] != keys[2]
+    assert cached == {} and misses.tolist() == [0, 2]
+
+    probabilities = [[0.9, 0.1], [0.2, 0.8]]
+    cache.put_many([keys[0], keys[2]], 'v1', ['ORIGINAL', 'SUSPEITO'], [0.9, 0.8], probabilities)
+    _, cached, misses = cache.lookup(ANUNCIOS, 'v1')
+    assert len(misses) == 0
+    assert cached[keys[2]] == ('SUSPEITO', 0.8, [0.2, 0.8])
+    assert cache.stats()['hits'] == 3 and cache.stats()['misses'] == 3
+
+    # Outra versão ou um campo alterado geram chaves novas
+    assert len(cache.lookup(ANUNCIOS, 'v2')[2]) == 2
+    alterado = ANUNCIOS.assign(price=[69.9, 59.9, 20.0])
+    assert cache.lookup(alterado, 'v1')[2].tolist() == [1]
+
+    assert cache.remover_versoes_antigas('v2') == 2
+    assert cache.get_many(keys) == {}
+
+
+def test_prever_com_cache_igual_ao_modelo(cache, classificador, base_dados):
+    esperado = classificador.prever(base_dados.copy())
+    classificador.cache = cache
+    try:
+        primeiro = classificador.prever(base_dados.copy())
+        segundo = classificador.prever(base_dados.copy())
+    finally:
+        classificador.cache = None
+
+    assert cache.stats()['hits'] == len(base_dados)
+    columns = probability_columns(esperado)
+    for df in (primeiro, segundo):
+        assert (df['ai_prediction'] == esperado['ai_prediction']).all()
+        assert np.allclose(df[columns].to_numpy(), esperado[columns].to_numpy(), rtol=1e-12, atol=0)
+
+
+def test_editar_catalogo_invalida_o_cache(cache, classificador, tmp_path, monkeypatch):
+    catalog_file = tmp_path / 'catalogo_teste.csv'
+    shutil.copy('data/catalogo.csv', catalog_file)
+    monkeypatch.setattr(catalogo, 'carregar_catalogo',
+                        lambda path: ingestao.carregar_catalogo(path, cache_dir=str(tmp_path / 'ingestao')))
+    monkeypatch.setattr(classificador.feature_builder, 'catalog_file', str(catalog_file))
+    monkeypatch.setattr(classificador, 'cache', cache)
+
+    anuncios = ANUNCIOS.copy()
+    classificador.prever(anuncios.copy())
+    version = classificador.prediction_version()
+    assert version.startswith(f"{classificador.model_version}+catalogo.")
+    assert len(cache.lookup(anuncios, version)[2]) == 0
+
+    # Preço sugerido do cartucho 667 Preto muda: as predições em cache não valem mais
+    text = catalog_file.read_text(encoding='utf-8')
+    assert 'Preto,120,"69,9"' in text
+    catalog_file.write_text(text.replace('Preto,120,"69,9"', 'Preto,120,"35,0"'), encoding='utf-8')
+    # mtime distinto mesmo se a escrita cair no mesmo tique do relógio do sistema de arquivos
+    stat = os.stat(catalog_file)
+    os.utime(catalog_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert classificador.prediction_version() != version
+    misses = cache.misses
+    classificador.prever(anuncios.copy())
+    assert cache.misses - misses == len(anuncios)
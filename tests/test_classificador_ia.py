@@ -0,0 +1,22 @@
+import os
+import numpy as np
+from classificador_ia import PiracyDetectionClassifier
+from esquema import probability_columns
+
+
+def test_salvar_substitui_o_arquivo_sem_afetar_quem_ja_carregou(classificador, base_dados, tmp_path):
+    filename = str(tmp_path / 'modelo.pkl')
+    classificador.save_model(filename)
+    carregado = PiracyDetectionClassifier()
+    carregado.load_model(filename)
+    inode = os.stat(filename).st_ino
+
+    # Regravar cria um arquivo novo; o modelo mapeado continua lendo o antigo
+    classificador.save_model(filename)
+    assert os.stat(filename).st_ino != inode
+    assert os.listdir(tmp_path) == ['modelo.pkl']
+
+    esperado = classificador.prever(base_dados.copy())
+    previsto = carregado.prever(base_dados.copy())
+    columns = probability_columns(esperado)
+    assert np.array_equal(previsto[columns].to_numpy(), esperado[columns].to_numpy())
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from classificador_incremental import IncrementalPiracyDetectionClassifier
+from esquema import probability_columns
+
+
+def _probabilidades(classifier, df):
+    scored = classifier.prever(df.copy())
+    return scored[probability_columns(scored)].to_numpy()
+
+
+def test_paridade_com_o_modo_em_lote(base_dados):
+    result = IncrementalPiracyDetectionClassifier().verificar_paridade(base_dados.copy(), tolerance=0.05)
+    assert set(result) == {'batch_accuracy', 'incremental_accuracy', 'gap', 'within_tolerance'}
+    assert result['gap'] == pytest.approx(result['batch_accuracy'] - result['incremental_accuracy'])
+    assert result['within_tolerance']
+    assert result['incremental_accuracy'] >= 0.7
+
+
+def test_atualizar_salvar_e_carregar(base_dados, tmp_path):
+    df = base_dados.copy()
+    first, second = df.iloc[:60], df.iloc[60:]
+    filename = str(tmp_path / 'modelo_incremental.pkl')
+
+    classifier = IncrementalPiracyDetectionClassifier(chunksize=16)
+    assert classifier.atualizar_modelo(first) == len(first)
+    classifier.save_model(filename)
+
+    loaded = IncrementalPiracyDetectionClassifier(chunksize=16)
+    loaded.load_model(filename)
+    assert loaded.model_version == classifier.model_version
+    assert loaded.n_samples_seen == len(first)
+    assert np.array_equal(_probabilidades(loaded, df), _probabilidades(classifier, df))
+
+    # O modelo carregado continua o aprendizado do mesmo ponto
+    version = loaded.model_version
+    classifier.atualizar_modelo(second)
+    loaded.atualizar_modelo(second)
+    assert loaded.n_samples_seen == len(df)
+    assert loaded.model_version != version
+    assert np.array_equal(_probabilidades(loaded, df), _probabilidades(classifier, df))
+
+
+def test_modelo_em_lote_nao_carrega_como_incremental(classificador, tmp_path):
+    filename = str(tmp_path / 'modelo.pkl')
+    classificador.save_model(filename)
+    with pytest.raises(ValueError):
+        IncrementalPiracyDetectionClassifier().load_model(filename)
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+from deduplicacao import NearDuplicateDetector, propagar_predicoes
+
+
+def _anuncios_repetidos(base_dados):
+    """Cada anúncio da base aparece três vezes: mesmo vendedor, outro vendedor e sem vendedor"""
+    original = base_dados.head(20).reset_index(drop=True)
+    same = original.copy()
+    other = original.copy()
+    other['seller'] = 'Outra Loja ' + other.index.astype(str)
+    missing = original.copy()
+    missing['seller'] = np.nan
+    return original, same, other, missing
+
+
+def test_predicao_nao_passa_entre_vendedores(base_dados, classificador):
+    parts = _anuncios_repetidos(base_dados)
+    df = pd.concat(parts, ignore_index=True)
+    df['seller'] = df['seller'].astype(object)
+
+    propagated = propagar_predicoes(df.copy(), classificador, NearDuplicateDetector())
+    n = len(parts[0])
+    source = propagated['prediction_source'].to_numpy()
+
+    # Cópias de outro vendedor ou sem vendedor são sempre classificadas pelo modelo
+    assert (source[2 * n:] == 'modelo').all()
+    copied = source == 'grupo'
+    assert copied.any()
+    seller = propagated['seller'].astype(str).str.lower().to_numpy()
+    cluster_id = propagated['cluster_id'].to_numpy()
+    assert (seller[copied] == seller[cluster_id[copied]]).all()
+
+    full = classificador.prever(df.copy())
+    assert (full['ai_prediction'].to_numpy() == propagated['ai_prediction'].to_numpy())[2 * n:].all()
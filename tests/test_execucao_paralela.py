@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from execucao_paralela import ParallelScorer, verificar_paridade, STAGES
+from risco import RiskAnalyzer
+from esquema import probability_columns
+
+
+@pytest.fixture
+def scorer(modelo_compilado):
+    scorer = ParallelScorer(modelo_compilado, n_workers=2, block_rows=17, risk_analyzer=RiskAnalyzer())
+    yield scorer
+    scorer.close()
+
+
+def test_workers_iguais_ao_processo_atual(scorer, base_dados):
+    df = base_dados.copy()
+    # Grupos de anúncios quase idênticos alimentam a regra cloned_listing
+    df['cluster_size'] = np.where(np.arange(len(df)) % 2 == 0, 4, 1)
+
+    mismatches = verificar_paridade(scorer, df, STAGES)
+
+    assert mismatches.pop('max_proba_diff') == 0.0
+    assert mismatches == {column: 0 for column in mismatches}
+    assert 'risk_cloned_listing' in mismatches
+
+
+def test_cluster_size_chega_aos_workers(scorer, base_dados):
+    df = base_dados.copy()
+    df['cluster_size'] = 4
+    scored = scorer.processar(df, ['prediction', 'risk'])
+    assert (scored['risk_cloned_listing'] == 1).all()
+
+
+def test_classificador_pontua_pelos_workers(scorer, classificador, base_dados):
+    esperado = classificador.prever(base_dados.copy())
+    classificador.scorer = scorer
+    try:
+        paralelo = classificador.prever(base_dados.copy())
+    finally:
+        classificador.scorer = None
+    assert scorer.worker_memory
+
+    columns = probability_columns(esperado)
+    assert np.array_equal(paralelo[columns].to_numpy(), esperado[columns].to_numpy())
+    assert (paralelo['ai_prediction'] == esperado['ai_prediction']).all()
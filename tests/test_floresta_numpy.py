@@ -0,0 +1,47 @@
+import os
+import numpy as np
+import pytest
+from floresta_numpy import CompiledPiracyModel, exportar_modelo, CURRENT_FILE, KEEP_VERSIONS
+from esquema import probability_columns
+
+
+@pytest.fixture
+def anuncios(base_dados):
+    # Texto ausente, vazio e repetido entre linhas exercita a tokenização por valor distinto
+    df = base_dados.copy()
+    df.loc[df.index[:5], 'description'] = np.nan
+    df.loc[df.index[5:10], 'seller'] = ''
+    df.loc[df.index[10:20], 'title'] = df['title'].iloc[0]
+    return df
+
+
+@pytest.mark.parametrize('block_size', [7, 100000])
+def test_probabilidades_iguais_ao_sklearn(modelo_compilado, classificador, anuncios, block_size):
+    esperado = classificador.prever(anuncios.copy())
+    compilado = CompiledPiracyModel(modelo_compilado, block_size=block_size).prever(anuncios.copy())
+
+    columns = probability_columns(esperado)
+    assert columns and probability_columns(compilado) == columns
+    assert np.array_equal(compilado[columns].to_numpy(), esperado[columns].to_numpy())
+    assert (compilado['ai_prediction'].to_numpy() == esperado['ai_prediction'].to_numpy()).all()
+    assert np.array_equal(compilado['ai_confidence'].to_numpy(), esperado['ai_confidence'].to_numpy())
+
+
+def test_reexportar_nao_altera_o_modelo_aberto(classificador, anuncios, tmp_path):
+    out_dir = str(tmp_path / 'modelo')
+    exportar_modelo(classificador, out_dir)
+    aberto = CompiledPiracyModel(out_dir)
+    esperado = aberto.predict_proba(anuncios)
+
+    # A versão aberta continua intacta após uma nova exportação; a segunda
+    # remove a mais antiga
+    exportar_modelo(classificador, out_dir)
+    assert CompiledPiracyModel(out_dir).model_dir != aberto.model_dir
+    assert os.path.isdir(aberto.model_dir)
+    assert np.array_equal(aberto.predict_proba(anuncios), esperado)
+
+    exportar_modelo(classificador, out_dir)
+    versions = [name for name in os.listdir(out_dir) if name != CURRENT_FILE]
+    assert len(versions) == KEEP_VERSIONS
+    assert not os.path.exists(aberto.model_dir)
+    assert np.array_equal(CompiledPiracyModel(out_dir).predict_proba(anuncios), esperado)
@@ -0,0 +1,100 @@
+import os
+import json
+import pytest
+import ingestao
+from ingestao import IngestCache
+
+SCHEMA = {'id': 'int64', 'price': 'float64', 'title': 'str'}
+
+
+@pytest.fixture
+def csv(tmp_path):
+    path = tmp_path / 'base.csv'
+    path.write_text("id,price,title\n1,10.5,Cartucho\n2,20.0,Toner\n", encoding='utf-8')
+    return str(path)
+
+
+@pytest.fixture
+def leituras(monkeypatch):
+    """Conta as leituras do CSV e os cálculos de hash"""
+    calls = {'csv': 0, 'hash': 0}
+    ler_csv, file_hash = ingestao.ler_csv, ingestao._file_hash
+
+    def contar_csv(*args, **kwargs):
+        calls['csv'] += 1
+        return ler_csv(*args, **kwargs)
+
+    def contar_hash(path):
+        calls['hash'] += 1
+        return file_hash(path)
+
+    monkeypatch.setattr(ingestao, 'ler_csv', contar_csv)
+    monkeypatch.setattr(ingestao, '_file_hash', contar_hash)
+    return calls
+
+
+def _mtime_posterior(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5 * 10 ** 9))
+
+
+def test_cache_reaproveitado_sem_reler_o_csv(tmp_path, csv, leituras):
+    cache = IngestCache(str(tmp_path / 'cache'))
+    first = cache.load(csv, SCHEMA)
+    assert leituras['csv'] == 1
+
+    hashes = leituras['hash']
+    again = cache.load(csv, SCHEMA)
+    assert leituras['csv'] == 1
+    # mtime e tamanho iguais: nem o hash é calculado
+    assert leituras['hash'] == hashes
+    assert again.equals(first)
+
+
+def test_touch_sem_mudanca_confirma_pelo_hash(tmp_path, csv, leituras):
+    cache = IngestCache(str(tmp_path / 'cache'))
+    cache.load(csv, SCHEMA)
+    _mtime_posterior(csv)
+
+    hashes = leituras['hash']
+    cache.load(csv, SCHEMA)
+    assert leituras['csv'] == 1
+    assert leituras['hash'] > hashes
+
+    # O mtime novo fica registrado: a próxima leitura não recalcula o hash
+    _, meta_path = cache.paths(csv)
+    with open(meta_path, encoding='utf-8') as f:
+        assert json.load(f)['mtime'] == os.stat(csv).st_mtime
+    hashes = leituras['hash']
+    cache.load(csv, SCHEMA)
+    assert leituras['hash'] == hashes
+
+
+@pytest.mark.parametrize('content', [
+    "id,price,title\n1,10.5,Cartucho\n2,99.0,Toner\n",     # mesmo tamanho
+    "id,price,title\n1,10.5,Cartucho\n2,20.0,Toner\n3,5.0,Tinta\n"
+])
+def test_conteudo_alterado_reconverte(tmp_path, csv, leituras, content):
+    cache = IngestCache(str(tmp_path / 'cache'))
+    cache.load(csv, SCHEMA)
+    with open(csv, 'w', encoding='utf-8') as f:
+        f.write(content)
+    _mtime_posterior(csv)
+
+    df = cache.load(csv, SCHEMA)
+    assert leituras['csv'] == 2
+    assert df['price'].tolist() == ingestao.ler_csv(csv, SCHEMA)['price'].tolist()
+
+
+def test_mudanca_de_esquema_reconverte(tmp_path, csv, leituras, monkeypatch):
+    cache = IngestCache(str(tmp_path / 'cache'))
+    assert cache.load(csv, SCHEMA)['price'].dtype == 'float64'
+
+    df = cache.load(csv, {**SCHEMA, 'price': 'str'})
+    assert leituras['csv'] == 2
+    assert df['price'].tolist() == ['10.5', '20.0']
+
+    # Mudar as conversões (INGEST_VERSION) também invalida o cache
+    monkeypatch.setattr(ingestao, 'INGEST_VERSION', ingestao.INGEST_VERSION + 1)
+    cache.load(csv, {**SCHEMA, 'price': 'str'})
+    assert leituras['csv'] == 3
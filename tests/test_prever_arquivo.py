@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+
+def _entrada_com_tipos_variaveis(base_dados):
+    """Colunas cujo tipo inferido pelo pandas muda entre o 1º e o 2º bloco de 30 linhas"""
+    df = base_dados.head(60).copy()
+    df['observacao'] = [np.nan] * 30 + ['revisar'] * 30
+    df['lote'] = list(range(30)) + [1.5] * 30
+    df['codigo'] = list(range(30)) + ['A1'] * 30
+    return df
+
+
+def test_parquet_com_tipos_variaveis_entre_blocos(classificador, base_dados, tmp_path):
+    df = _entrada_com_tipos_variaveis(base_dados)
+    source = tmp_path / 'entrada.csv'
+    df.to_csv(source, index=False)
+
+    for output in [tmp_path / 'saida.parquet', tmp_path / 'saida_csv.csv']:
+        assert classificador.prever_arquivo(str(source), str(output), chunksize=30) == 60
+
+    scored = pq.read_table(tmp_path / 'saida.parquet')
+    assert scored.num_rows == 60
+    assert str(scored.schema.field('price').type) == 'double'
+    assert scored.column('lote').to_pylist()[29:31] == ['29.0', '1.5']
+    assert scored.column('observacao').to_pylist() == [None] * 30 + ['revisar'] * 30
+    assert scored.column('codigo').to_pylist()[29:31] == ['29', 'A1']
+
+    expected = pd.read_csv(tmp_path / 'saida_csv.csv')
+    np.testing.assert_array_equal(scored.column('ai_prediction').to_numpy(zero_copy_only=False), expected['ai_prediction'])
+    np.testing.assert_allclose(scored.column('ai_confidence').to_numpy(), expected['ai_confidence'])
+
+
+def test_parquet_de_entrada_mantem_os_tipos(classificador, base_dados, tmp_path):
+    source = tmp_path / 'entrada.parquet'
+    base_dados.head(60).to_parquet(source, index=False)
+    output = tmp_path / 'saida.parquet'
+    classificador.prever_arquivo(str(source), str(output), chunksize=25)
+
+    input_schema = pq.read_schema(source)
+    output_schema = pq.read_schema(output)
+    for name in input_schema.names:
+        assert output_schema.field(name).type == input_schema.field(name).type
+    assert pq.read_table(output).num_rows == 60
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+from catalogo import load_catalog_index
+from features_produto import NumericFeatureBuilder, FEATURE_COLUMNS
+
+RATIO = FEATURE_COLUMNS.index('price_ratio')
+
+
+def test_price_ratio_igual_com_e_sem_attach(base_dados):
+    builder = NumericFeatureBuilder()
+    attached = load_catalog_index('data/catalogo.csv').attach(base_dados.copy())
+    raw = builder.build(base_dados.copy())
+    np.testing.assert_array_equal(raw, builder.build(attached))
+    # O catálogo associa parte dos anúncios: a razão não é constante
+    assert (raw[:, RATIO] != 1.0).any()
+
+
+def test_predicao_igual_no_treino_e_no_arquivo(classificador, base_dados, tmp_path):
+    attached = load_catalog_index('data/catalogo.csv').attach(base_dados.copy())
+    expected = classificador.prever(attached)
+
+    source = tmp_path / 'entrada.csv'
+    output = tmp_path / 'saida.csv'
+    base_dados.to_csv(source, index=False)
+    classificador.prever_arquivo(str(source), str(output), chunksize=30)
+    scored = pd.read_csv(output)
+
+    np.testing.assert_array_equal(scored['ai_prediction'], expected['ai_prediction'].to_numpy())
+    np.testing.assert_allclose(scored['ai_confidence'], expected['ai_confidence'], rtol=1e-9)
+
+
+def test_sem_catalogo_razao_neutra(base_dados):
+    builder = NumericFeatureBuilder(catalog_file='inexistente.csv')
+    assert (builder.build(base_dados.copy())[:, RATIO] == 1.0).all()
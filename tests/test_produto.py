@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ingestao import parse_price, aplicar_esquema, CATALOGO_SCHEMA
+from catalogo import parse_prices
+from produto import ProductRecord, records_from_frame, records_to_frame, records_from_arrow, records_to_arrow
+
+PRECOS = [
+    ('1.234', 1234.0), ('1.234,9', 1234.9), ('R$ 1.234,90', 1234.9), ('79,90', 79.9), ('79.9', 79.9),
+    ('105.63', 105.63), ('12.345.678', 12345678.0), (' 49 ', 49.0), (49, 49.0), (29.99, 29.99),
+    ('abc', None), ('', None), (None, None), (np.nan, None), (True, None)
+]
+
+BRUTOS = [
+    {'marketplace': 'amazon', 'product_id': 'B01', 'title': 'Cartucho', 'price': '1.234', 'rating': '4,5',
+     'review_count': '1.906', 'seller': 'nan', 'seller_detailed': 'HP Brasil', 'scraped_at': '2026-10-01 10:00:00'},
+    {'marketplace': 'mercadolivre', 'product_id': 'MLB1', 'title': 'Toner', 'price': 'R$ 79,90',
+     'price_detailed': '69,90', 'seller': 'Loja', 'specifications': {'Cor': 'Preto'}, 'scraped_at': '2026-10-01 10:00:00'}
+]
+
+
+@pytest.mark.parametrize('texto, esperado', PRECOS)
+def test_parse_price(texto, esperado):
+    assert parse_price(texto) == esperado
+
+
+def test_catalogo_e_ingestao_usam_o_mesmo_parser():
+    textos = pd.Series([texto for texto, _ in PRECOS if isinstance(texto, str)], dtype=object)
+    esperado = [parse_price(texto) for texto in textos]
+    for resultado in (parse_prices(textos), aplicar_esquema(pd.DataFrame({'Preço Sugerido': textos}), CATALOGO_SCHEMA)['Preço Sugerido']):
+        assert [None if np.isnan(value) else value for value in resultado] == esperado
+
+
+def test_records_from_frame_normaliza_como_from_raw():
+    esperado = [ProductRecord.from_raw(product) for product in BRUTOS]
+    assert [record.price for record in esperado] == [1234.0, 69.9]
+    assert esperado[0].seller == 'HP Brasil' and esperado[0].review_count == 1906 and esperado[0].rating == 4.5
+    assert esperado[1].specifications == '{"Cor": "Preto"}'
+
+    df = pd.DataFrame(BRUTOS)
+    assert records_from_frame(df) == esperado
+    # Mesmo resultado com tudo como texto (CSV lido com dtype=object)
+    texto = pd.DataFrame(BRUTOS[:1], dtype=object).astype(str)
+    assert records_from_frame(texto) == esperado[:1]
+
+
+def test_ida_e_volta_sem_mudar_os_registros():
+    records = [ProductRecord.from_raw(product) for product in BRUTOS]
+    assert records_from_frame(records_to_frame(records)) == records
+    assert records_from_arrow(records_to_arrow(records)) == records
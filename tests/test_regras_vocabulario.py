@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+import pytest
+import vocabulario
+from vocabulario import VOCABULARIES, KeywordMatcher, fold_text
+from regras_heuristicas import HeuristicLabeler
+from features_produto import NumericFeatureBuilder, FEATURE_COLUMNS
+
+# Anúncios com os casos de borda das regras: acentos, palavras sobrepostas
+# ('novo' / 'novo lacrado'), palavra que cruza título e descrição, vendedor
+# ausente e preço nos limites
+CASOS = pd.DataFrame({
+    'title': ['Cartucho HP 664 COMPATIVEL', 'Toner novo lacrado', 'Cartucho com nota', 'Tinta genérica',
+              'Cartucho Original HP', np.nan, 'Kit não original', 'Cartucho remanufactured cópia'],
+    'description': ['compatível com HP', 'Produto novo com garantia e nota fiscal', 'fiscal e garantia', '',
+                    'Cartucho original com certificado de autenticidade, lacrado na caixa', 'Descrição curta',
+                    np.nan, 'Genérico'],
+    'seller': ['Loja Genérica', 'Amazon.com.br', 'HP Brasil', 'Vendedor Externo', np.nan, 'Marketplace',
+               'terceiros', 'Oficial'],
+    'price': [29.99, 200.0, 30.0, 200.01, 0.0, np.nan, 15.5, 250.0],
+    'suggested_price': [50.0, 180.0, 0.0, 100.0, 80.0, 60.0, 20.0, 125.0]
+})
+
+
+def _palavras(group):
+    """Palavras de um grupo normalizadas, sem repetição (como no KeywordMatcher)"""
+    return list(dict.fromkeys(fold_text(word) for word in VOCABULARIES[group]))
+
+
+def rotulo_por_linha(row):
+    """Regras heurísticas por linha (o antigo apply_heuristic_rules), com texto normalizado"""
+    title = fold_text(row.get('title', ''))
+    description = fold_text(row.get('description', ''))
+    seller = fold_text(row.get('seller', ''))
+    price = row.get('price', 0)
+
+    score = 0
+    for keyword in _palavras('suspicious_keywords'):
+        if keyword in title or keyword in description:
+            score += 2
+    for keyword in _palavras('original_keywords'):
+        if keyword in title or keyword in description:
+            score -= 1
+    if any(trusted in seller for trusted in _palavras('trusted_sellers')):
+        score -= 1
+    elif any(suspicious in seller for suspicious in _palavras('suspicious_sellers')):
+        score += 2
+    if price and not np.isnan(price) and price < 30:
+        score += 1
+    elif price and not np.isnan(price) and price > 200:
+        score += 0.5
+    if len(str(row.get('description', ''))) < 50:
+        score += 1
+
+    if score >= 2:
+        return 'SUSPEITO'
+    if score <= -1:
+        return 'ORIGINAL'
+    return 'COMPATIVEL'
+
+
+def features_por_linha(row):
+    """Features por linha (o antigo create_features), com texto normalizado"""
+    title = str(row.get('title', ''))
+    description = str(row.get('description', ''))
+    seller = str(row.get('seller', ''))
+    price = row.get('price', 0)
+    price = 0 if np.isnan(price) else price
+    suggested_price = row.get('suggested_price', 0)
+    text = fold_text(f"{title} {description} {seller}")
+    folded_seller = fold_text(seller)
+
+    if any(word in folded_seller for word in _palavras('trusted_seller_words')):
+        trust = 1.0
+    elif any(word in folded_seller for word in _palavras('suspicious_seller_words')):
+        trust = 0.0
+    else:
+        trust = 0.5
+    return [
+        price,
+        len(title),
+        len(description),
+        1 if price else 0,
+        # Preços em float32, como em PRODUCT_SCHEMA
+        float(np.float32(price)) / float(np.float32(suggested_price)) if price and suggested_price else 1.0,
+        len(text.split()),
+        sum(1 for word in _palavras('suspicious_words') if word in text),
+        sum(1 for word in _palavras('original_words') if word in text),
+        trust
+    ]
+
+
+@pytest.fixture(params=['regex', 'ahocorasick'])
+def motor(request, monkeypatch):
+    """Roda o teste com o autômato do pyahocorasick e com as expressões regulares"""
+    if request.param == 'regex':
+        monkeypatch.setattr(vocabulario, 'ahocorasick', None)
+    elif vocabulario.ahocorasick is None:
+        pytest.skip("pyahocorasick não instalado")
+    return request.param
+
+
+@pytest.fixture
+def anuncios(base_dados):
+    df = pd.concat([base_dados[CASOS.columns.drop('suggested_price')].astype(object), CASOS], ignore_index=True)
+    df['suggested_price'] = df['suggested_price'].fillna(90.0)
+    df['catalog_pn'] = None
+    return df
+
+
+def test_rotulos_iguais_as_regras_por_linha(motor, anuncios):
+    esperado = anuncios.apply(rotulo_por_linha, axis=1).to_numpy()
+    assert (HeuristicLabeler().label(anuncios) == esperado).all()
+
+
+def test_features_iguais_ao_calculo_por_linha(motor, anuncios):
+    esperado = np.array(anuncios.apply(features_por_linha, axis=1).tolist(), dtype=np.float32)
+    features = NumericFeatureBuilder(catalog_file=None).build(anuncios)
+    for column, name in enumerate(FEATURE_COLUMNS):
+        assert np.array_equal(features[:, column], esperado[:, column]), name
+
+
+def test_palavra_entre_campos(motor):
+    matcher = KeywordMatcher(['original_words'])
+    title, description = pd.Series(['Cartucho com nota']), pd.Series(['fiscal inclusa'])
+    # Por campo (regras heurísticas) a palavra não existe; no texto concatenado, sim
+    assert matcher.group_count(title, description, group='original_words')[0] == 0
+    assert matcher.group_count(title, description, separator=' ', group='original_words')[0] == 1
+    assert matcher.group_count(title + ' ' + description, group='original_words')[0] == 1
@@ -0,0 +1,83 @@
+import json
+import threading
+import http.client
+import pytest
+from servico_predicao import MicroBatcher, PendingRequest, InvalidProductError, coerce_product, create_server
+
+PRODUTO = {'title': 'Cartucho HP 667 Preto Original', 'seller': 'HP', 'price': 79.9}
+
+
+class ClassificadorComFalha:
+    """Classificador que falha quando o lote contém um título 'falha'"""
+
+    def __init__(self, classifier):
+        self.classifier = classifier
+        self.model = classifier.model
+        self.cache = None
+
+    def prever(self, df):
+        if (df['title'] == 'falha').any():
+            raise RuntimeError("falha no modelo")
+        return self.classifier.prever(df)
+
+
+@pytest.fixture
+def batcher(classificador):
+    batcher = MicroBatcher(ClassificadorComFalha(classificador), max_delay_ms=50)
+    yield batcher
+    batcher.stop()
+
+
+def test_produto_malformado_recusado(batcher):
+    with pytest.raises(InvalidProductError):
+        batcher.submit([{'price': [1, 2]}])
+    with pytest.raises(InvalidProductError):
+        batcher.submit([PRODUTO, {'title': {'a': 1}}])
+    assert coerce_product({'price': '79.9', 'title': 667, 'extra': [1]}) == {'title': '667', 'price': 79.9}
+    assert batcher.queue.qsize() == 0
+
+
+def test_erro_de_um_pedido_nao_afeta_o_lote(batcher):
+    batch = [PendingRequest([PRODUTO]), PendingRequest([{'title': 'falha'}]), PendingRequest([PRODUTO, PRODUTO])]
+    batcher.process_batch(batch)
+
+    assert batch[1].error is not None and batch[1].result is None
+    assert batch[0].error is None and len(batch[0].result) == 1
+    assert batch[2].error is None and len(batch[2].result) == 2
+    assert batch[0].result[0] == batch[2].result[0]
+    assert batcher.stats()['errors'] == 1
+
+
+@pytest.fixture
+def post(classificador):
+    """POST /predict em um servidor de teste (porta livre); retorna (status, corpo)"""
+    batcher = MicroBatcher(classificador, max_delay_ms=1)
+    server = create_server(batcher, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def post(payload):
+        connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=30)
+        connection.request('POST', '/predict', json.dumps(payload))
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+
+    yield post
+    server.shutdown()
+    server.server_close()
+    batcher.stop()
+
+
+def test_http_responde_400_para_produto_invalido(post):
+    status, body = post({'products': [PRODUTO, {'price': [1, 2]}]})
+    assert status == 400 and 'price' in body['error']
+    status, body = post({'product': PRODUTO})
+    assert status == 200 and len(body['predictions']) == 1
+
+
+@pytest.mark.parametrize('payload', [3, 'x', None, True, [3], []])
+def test_http_responde_400_para_json_que_nao_e_objeto(post, payload):
+    status, body = post(payload)
+    assert status == 400 and body['error']
+    # O servidor continua atendendo depois do erro
+    assert post([PRODUTO])[0] == 200